@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+
+# Written by the nf-core/funcscan team, released under the MIT license.
+
+"""
+Persistent cache of AMP predictions per protein, shared between samples and runs.
+
+Protein based AMP predictors (AMPlify, ampir) score every protein on its own,
+so the prediction of a protein sequence can be reused for every sample and run
+in which it occurs. Predictions are keyed by a hash of the protein sequence and
+a settings string with the tool, its version and its parameters.
+
+`lookup` hashes the proteins of all samples and writes the distinct proteins
+that are not yet in the cache to batches of FASTA files, with the hash as
+sequence name, to be run through the predictors. `store` adds the predictions
+of these batches to the cache (proteins without an output row are stored as
+such) and then rebuilds the prediction table of every sample from the cache,
+in the order and with the sequence names of its FAA file, as if the tool had
+been run on the sample itself.
+
+The cache is a SQLite database, `<cache_dir>/amp_predictions.sqlite`.
+"""
+
+import argparse
+import gzip
+import hashlib
+import os
+import sqlite3
+import sys
+
+tool_version = "1.0.0"
+
+# Per tool: column with the sequence name, how the tool derives the name from the FASTA header, the file
+# name of its per-sample table and, for ampir, of the FASTA file of the proteins in the table
+tools = {
+    "amplify": {"id_column": "Sequence_ID", "id_rule": "first_word", "suffix": ".tsv", "faa_suffix": None},
+    "ampir": {"id_column": "seq_name", "id_rule": "header", "suffix": ".ampir.tsv", "faa_suffix": ".ampir.faa"},
+}
+
+stats_cols = ["tool", "samples", "proteins", "distinct_proteins", "cached", "missing"]
+
+
+def open_file(path):
+    """
+    Open a plain or gzipped file for text reading, detected by magic bytes rather than file extension.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, "rt")
+    return open(path)
+
+
+def read_fasta(path):
+    """
+    Yield (header without '>', sequence) of a FASTA file.
+    """
+    header, sequence = None, []
+    with open_file(path) as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith(">"):
+                if header is not None:
+                    yield header, "".join(sequence)
+                header, sequence = line[1:], []
+            elif header is not None:
+                sequence.append(line.strip())
+    if header is not None:
+        yield header, "".join(sequence)
+
+
+def protein_hash(sequence):
+    return hashlib.blake2b(sequence.encode(), digest_size=16).hexdigest()
+
+
+def sequence_name(header, rule):
+    if rule == "first_word":
+        return header.split()[0] if header.split() else ""
+    return header
+
+
+def connect(cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    con = sqlite3.connect(os.path.join(cache_dir, "amp_predictions.sqlite"), timeout=600)
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS predictions (settings TEXT, hash TEXT, row TEXT, PRIMARY KEY (settings, hash)) "
+        "WITHOUT ROWID"
+    )
+    con.execute("CREATE TABLE IF NOT EXISTS headers (settings TEXT PRIMARY KEY, header TEXT)")
+    return con
+
+
+def cached_rows(con, settings, hashes):
+    """
+    {hash: row or None} of the hashes found in the cache, row None if the tool reported nothing for the protein.
+    """
+    con.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (hash TEXT PRIMARY KEY)")
+    con.execute("DELETE FROM wanted")
+    con.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((h,) for h in hashes))
+    return dict(
+        con.execute(
+            "SELECT p.hash, p.row FROM predictions p JOIN wanted w ON w.hash = p.hash WHERE p.settings = ?",
+            (settings,),
+        )
+    )
+
+
+def lookup(cache_dir, samples, faas, tool_settings, batch_size, outdir):
+    distinct = set()
+    proteins = 0
+    for faa in faas:
+        for header, sequence in read_fasta(faa):
+            distinct.add(protein_hash(sequence))
+            proteins += 1
+
+    con = connect(cache_dir)
+    os.makedirs(outdir, exist_ok=True)
+    stats = []
+    for tool, settings in tool_settings:
+        missing = distinct - set(cached_rows(con, settings, distinct))
+
+        # Second pass over the inputs, so that only hashes are held in memory
+        written = set()
+        batch, out = 0, None
+        for faa in faas:
+            for header, sequence in read_fasta(faa):
+                key = protein_hash(sequence)
+                if key not in missing or key in written:
+                    continue
+                if out is None or len(written) % batch_size == 0:
+                    if out is not None:
+                        out.close()
+                    out = open(
+                        os.path.join(outdir, "{tool}.missing_{n:06d}.faa".format(tool=tool, n=batch)),
+                        "w",
+                    )
+                    batch += 1
+                out.write(">{key}\n{sequence}\n".format(key=key, sequence=sequence))
+                written.add(key)
+        if out is not None:
+            out.close()
+
+        stats.append([tool, len(samples), proteins, len(distinct), len(distinct) - len(missing), len(missing)])
+        print(
+            "AMP prediction cache, {tool}: {cached} of {n} distinct proteins cached, {missing} in {batches} batches "
+            "to predict".format(
+                tool=tool, cached=len(distinct) - len(missing), n=len(distinct), missing=len(missing), batches=batch
+            )
+        )
+    con.close()
+
+    with open("amp_prediction_cache.stats.tsv", "w") as f:
+        f.write("\t".join(stats_cols) + "\n")
+        for row in stats:
+            f.write("\t".join(str(value) for value in row) + "\n")
+
+
+def batch_tool(path):
+    """
+    Tool of a batch FASTA or of a prediction table of a batch, from its file name.
+    """
+    name = os.path.basename(path)
+    if ".missing_" not in name:
+        sys.exit("{path} is not named after a batch written by lookup".format(path=path))
+    return name.split(".missing_")[0]
+
+
+def read_table(path):
+    # Split lines as they are, the tables are written without quoting
+    with open_file(path) as f:
+        lines = [line.rstrip("\n").split("\t") for line in f if line.strip()]
+    if not lines:
+        return None, []
+    return lines[0], lines[1:]
+
+
+def store(cache_dir, tool_settings, missing, predictions):
+    con = connect(cache_dir)
+    settings_of = dict(tool_settings)
+
+    predicted = {tool: set() for tool in settings_of}
+    for path in missing:
+        predicted[batch_tool(path)].update(header for header, _ in read_fasta(path))
+
+    rows = {tool: {} for tool in settings_of}
+    for path in predictions:
+        tool = batch_tool(path)
+        header, table = read_table(path)
+        if header is None:
+            continue
+        id_index = header.index(tools[tool]["id_column"])
+        with con:
+            con.execute("INSERT OR REPLACE INTO headers VALUES (?, ?)", (settings_of[tool], "\t".join(header)))
+        for row in table:
+            key = row[id_index]
+            row[id_index] = ""
+            rows[tool][key] = "\t".join(row)
+
+    for tool, hashes in predicted.items():
+        with con:
+            con.executemany(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)",
+                ((settings_of[tool], key, rows[tool].get(key)) for key in hashes),
+            )
+        print(
+            "Stored {n} proteins ({hits} with a prediction) of {tool} in the AMP prediction cache".format(
+                n=len(hashes), hits=sum(1 for key in hashes if key in rows[tool]), tool=tool
+            )
+        )
+    con.close()
+
+
+def rebuild(cache_dir, samples, faas, tool_settings, outdir):
+    """
+    Write the prediction table of every sample and tool from the cache.
+    """
+    con = connect(cache_dir)
+    for tool, settings in tool_settings:
+        spec = tools[tool]
+        header = con.execute("SELECT header FROM headers WHERE settings = ?", (settings,)).fetchone()
+        for sample, faa in zip(samples, faas):
+            entries = [(header_line, protein_hash(sequence)) for header_line, sequence in read_fasta(faa)]
+            cached = cached_rows(con, settings, {key for _, key in entries})
+            absent = [key for _, key in entries if key not in cached]
+            if absent:
+                sys.exit(
+                    "{n} proteins of {sample} are missing from the cache for {tool}, e.g. {key}".format(
+                        n=len(absent), sample=sample, tool=tool, key=absent[0]
+                    )
+                )
+            if header is None and any(cached[key] is not None for _, key in entries):
+                sys.exit("The cache has no table header for {tool}".format(tool=tool))
+
+            sample_dir = os.path.join(outdir, tool, sample)
+            os.makedirs(sample_dir, exist_ok=True)
+            with open(os.path.join(sample_dir, sample + spec["suffix"]), "w") as out:
+                if header is not None:
+                    columns = header[0].split("\t")
+                    id_index = columns.index(spec["id_column"])
+                    out.write(header[0] + "\n")
+                for header_line, key in entries:
+                    row = cached[key]
+                    if row is None:
+                        continue
+                    fields = row.split("\t")
+                    fields[id_index] = sequence_name(header_line, spec["id_rule"])
+                    out.write("\t".join(fields) + "\n")
+
+            if spec["faa_suffix"]:
+                # Proteins with a prediction, in the single-line FASTA format of the tool
+                with open(os.path.join(sample_dir, sample + spec["faa_suffix"]), "w") as out:
+                    for header_line, sequence in read_fasta(faa):
+                        if cached[protein_hash(sequence)] is not None:
+                            out.write(">{name}\n{sequence}\n".format(name=header_line, sequence=sequence))
+    con.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="amp_prediction_cache", description="Persistent cache of AMP predictions per protein."
+    )
+    parser.add_argument("-v", "--version", help="show version number and exit", action="store_true")
+    subparsers = parser.add_subparsers(dest="command")
+
+    def add_common(subparser):
+        subparser.add_argument("-c", "--cache_dir", metavar="PATH", required=True, help="cache directory")
+        subparser.add_argument(
+            "-i", "--faa", metavar="PATH", nargs="+", required=True, help="FAA files, may be gzipped"
+        )
+        subparser.add_argument(
+            "-s", "--samples", metavar="NAME", nargs="+", required=True, help="sample names, in the order of --faa"
+        )
+        subparser.add_argument("-t", "--tools", metavar="TOOL", nargs="+", required=True, choices=sorted(tools))
+        subparser.add_argument(
+            "-k", "--settings", metavar="STRING", nargs="+", required=True, help="settings per tool, order of --tools"
+        )
+
+    lookup_parser = subparsers.add_parser("lookup", help="write the proteins missing from the cache")
+    add_common(lookup_parser)
+    lookup_parser.add_argument(
+        "-b", "--batch_size", metavar="INT", type=int, default=100000, help="proteins per batch (default: 100000)"
+    )
+    lookup_parser.add_argument("-o", "--outdir", metavar="PATH", default="missing", help="directory for the batches")
+
+    store_parser = subparsers.add_parser("store", help="add predictions and rebuild the tables of all samples")
+    add_common(store_parser)
+    store_parser.add_argument("-m", "--missing", metavar="PATH", nargs="*", default=[], help="batches of lookup")
+    store_parser.add_argument(
+        "-p", "--predictions", metavar="PATH", nargs="*", default=[], help="prediction tables of the batches"
+    )
+    store_parser.add_argument("-o", "--outdir", metavar="PATH", default=".", help="directory for the tables")
+
+    args = parser.parse_args()
+
+    if args.version:
+        print("amp_prediction_cache {version}".format(version=tool_version))
+        sys.exit(0)
+    if args.command not in ("lookup", "store"):
+        parser.error("a command (lookup or store) is required")
+    if len(args.faa) != len(args.samples):
+        parser.error("--faa and --samples must have the same number of values")
+    if len(args.tools) != len(args.settings):
+        parser.error("--tools and --settings must have the same number of values")
+    tool_settings = list(zip(args.tools, args.settings))
+
+    if args.command == "lookup":
+        lookup(args.cache_dir, args.samples, args.faa, tool_settings, args.batch_size, args.outdir)
+    else:
+        store(args.cache_dir, tool_settings, args.missing, args.predictions)
+        rebuild(args.cache_dir, args.samples, args.faa, tool_settings, args.outdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+# Written by the nf-core/funcscan team, released under the MIT license.
+
+"""
+Merge the per-sample AMPcombi summaries into one BGZF-compressed CSV with a
+per-sample index.
+
+`merge` streams the CSV files, in the order given, into BGZF blocks (the block
+gzip format of bgzip/htslib, readable by `gzip -d`, `zcat` and `bgzip -d`).
+The header is written once, in its own blocks, and every sample starts a new
+block. The index lists, per sample, the compressed byte range of its rows and
+the corresponding BGZF virtual offset, so that the rows of one sample can be
+read by decompressing only its own byte range, e.g. with `query`, or:
+
+    tail -c +$((start + 1)) summary.csv.gz | head -c $((end - start)) | gzip -d
+"""
+
+import argparse
+import struct
+import sys
+import zlib
+
+tool_version = "1.0.0"
+
+index_cols = ["sample", "rows", "start", "end", "virtual_offset"]
+
+# Maximum uncompressed size of a BGZF block, as used by htslib
+block_size = 0xFF00
+
+# Empty block that marks the end of a BGZF file
+bgzf_eof = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+
+class BgzfWriter:
+    """
+    Write BGZF blocks to a binary file and keep track of the compressed offset.
+    """
+
+    def __init__(self, handle, level=6):
+        self.handle = handle
+        self.level = level
+        self.buffer = bytearray()
+        self.offset = 0
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= block_size:
+            self._write_block(bytes(self.buffer[:block_size]))
+            del self.buffer[:block_size]
+
+    def flush(self):
+        """
+        Write the buffered data as a block, so that the next data starts a new block at `offset`.
+        """
+        if self.buffer:
+            self._write_block(bytes(self.buffer))
+            self.buffer = bytearray()
+
+    def close(self):
+        self.flush()
+        self.handle.write(bgzf_eof)
+        self.offset += len(bgzf_eof)
+
+    def _write_block(self, data):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        # gzip header with the BC extra subfield holding the total block size - 1
+        header = struct.pack("<BBBBIBBHBBHH", 31, 139, 8, 4, 0, 0, 255, 6, 66, 67, 2, len(compressed) + 25)
+        footer = struct.pack("<II", zlib.crc32(data) & 0xFFFFFFFF, len(data))
+        self.handle.write(header + compressed + footer)
+        self.offset += len(header) + len(compressed) + len(footer)
+
+
+def merge(samples, summaries, output, index):
+    header = None
+    entries = []
+
+    with open(output, "wb") as handle:
+        writer = BgzfWriter(handle)
+
+        for sample, summary in zip(samples, summaries):
+            rows = 0
+            with open(summary, "rb") as f:
+                first = f.readline()
+                if first:
+                    if not first.endswith(b"\n"):
+                        first += b"\n"
+                    if header is None:
+                        header = first
+                        writer.write(header)
+                        writer.flush()
+                    elif first != header:
+                        sys.exit(
+                            "Header of {summary} differs from the header of the first summary".format(summary=summary)
+                        )
+                start = writer.offset
+                for line in f:
+                    if not line.strip():
+                        continue
+                    if not line.endswith(b"\n"):
+                        line += b"\n"
+                    writer.write(line)
+                    rows += 1
+                writer.flush()
+            entries.append([sample, rows, start, writer.offset, start << 16])
+
+        writer.close()
+
+    with open(index, "w") as f:
+        f.write("\t".join(index_cols) + "\n")
+        for entry in entries:
+            f.write("\t".join(str(value) for value in entry) + "\n")
+
+    print(
+        "Merged {rows} rows of {n} samples".format(rows=sum(entry[1] for entry in entries), n=len(entries)),
+        file=sys.stderr,
+    )
+
+
+def read_range(path, start, end):
+    """
+    Decompress the BGZF blocks in the compressed byte range [start, end).
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    out = bytearray()
+    while data:
+        decompressor = zlib.decompressobj(31)
+        out += decompressor.decompress(data)
+        data = decompressor.unused_data
+    return bytes(out)
+
+
+def query(summary, index, sample, header=True):
+    with open(index) as f:
+        cols = f.readline().rstrip("\n").split("\t")
+        entries = [dict(zip(cols, line.rstrip("\n").split("\t"))) for line in f]
+
+    match = [entry for entry in entries if entry["sample"] == sample]
+    if not match:
+        sys.exit("Sample {sample} not found in {index}".format(sample=sample, index=index))
+
+    out = sys.stdout.buffer
+    if header and entries:
+        # The header blocks precede the first sample
+        out.write(read_range(summary, 0, int(entries[0]["start"])))
+    out.write(read_range(summary, int(match[0]["start"]), int(match[0]["end"])))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="ampcombi_merge", description="Merge AMPcombi summaries into an indexed BGZF-compressed CSV."
+    )
+    parser.add_argument("-v", "--version", help="show version number and exit", action="store_true")
+    subparsers = parser.add_subparsers(dest="command")
+
+    merge_parser = subparsers.add_parser("merge", help="merge per-sample summaries")
+    merge_parser.add_argument(
+        "-i", "--input", metavar="PATH", nargs="+", required=True, help="AMPcombi summary CSV files"
+    )
+    merge_parser.add_argument(
+        "-s", "--samples", metavar="NAME", nargs="+", required=True, help="sample names, in the order of --input"
+    )
+    merge_parser.add_argument(
+        "-o", "--prefix", metavar="PREFIX", default="ampcombi_complete_summary", help="prefix of the outputs"
+    )
+
+    query_parser = subparsers.add_parser("query", help="write the rows of one sample of a merged summary")
+    query_parser.add_argument("-i", "--input", metavar="PATH", required=True, help="merged summary (.csv.gz)")
+    query_parser.add_argument("-x", "--index", metavar="PATH", required=True, help="index of the merged summary")
+    query_parser.add_argument("-s", "--sample", metavar="NAME", required=True, help="sample to write")
+    query_parser.add_argument("-n", "--no_header", action="store_true", help="do not write the header line")
+
+    args = parser.parse_args()
+
+    if args.version:
+        print("ampcombi_merge {version}".format(version=tool_version))
+        sys.exit(0)
+
+    if args.command == "merge":
+        if len(args.input) != len(args.samples):
+            parser.error("--input and --samples must have the same number of values")
+        merge(args.samples, args.input, args.prefix + ".csv.gz", args.prefix + ".index.tsv")
+    elif args.command == "query":
+        query(args.input, args.index, args.sample, not args.no_header)
+    else:
+        parser.error("a command (merge or query) is required")
+
+
+if __name__ == "__main__":
+    main()
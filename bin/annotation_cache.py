@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+# Written by the nf-core/funcscan team, released under the MIT license.
+
+"""
+Persistent cache of annotation results, shared between pipeline runs.
+
+An entry is keyed by the content of the (decompressed) input FASTA, the sample
+name, the annotation tool and its version and the annotation parameters, which
+are passed as one settings string. `lookup` restores the annotation files of an
+entry, `store` adds the files of a newly annotated sample and then evicts the
+least recently used entries until the cache is below its maximum size.
+
+Layout of the cache directory:
+
+    <cache_dir>/entries/<key[:2]>/<key>/   annotation files and entry.json
+    <cache_dir>/tmp/                        entries being written
+    <cache_dir>/.lock                       shared lock for lookups, exclusive for eviction
+
+The modification time of `entry.json` is the last use of an entry.
+"""
+
+import argparse
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from contextlib import contextmanager
+
+tool_version = "1.0.0"
+
+report_cols = ["sample", "key", "status", "files", "size"]
+
+
+def open_file(path):
+    """
+    Open a plain or gzipped file for binary reading, detected by magic bytes rather than file extension.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def cache_key(fasta, sample, settings):
+    """
+    Hash of the decompressed FASTA content, sample name and annotation settings.
+    """
+    content = hashlib.blake2b(digest_size=32)
+    with open_file(fasta) as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            content.update(chunk)
+
+    key = hashlib.blake2b(digest_size=20)
+    for part in [content.hexdigest(), sample, settings]:
+        key.update(part.encode() + b"\0")
+    return key.hexdigest()
+
+
+def entry_dir(cache_dir, key):
+    return os.path.join(cache_dir, "entries", key[:2], key)
+
+
+@contextmanager
+def cache_lock(cache_dir, exclusive):
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, ".lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def write_report(prefix, sample, key, status, files, size):
+    # The status is part of the file name, so that the pipeline can route misses to annotation
+    with open("{prefix}.annotation_cache.{status}.tsv".format(prefix=prefix, status=status), "w") as f:
+        f.write("\t".join(report_cols) + "\n")
+        f.write("\t".join([sample, key, status, str(files), str(size)]) + "\n")
+
+
+def read_report(path):
+    with open(path) as f:
+        header = f.readline().rstrip("\n").split("\t")
+        return dict(zip(header, f.readline().rstrip("\n").split("\t")))
+
+
+def lookup(cache_dir, fasta, sample, settings, prefix, outdir):
+    key = cache_key(fasta, sample, settings)
+    entry = entry_dir(cache_dir, key)
+
+    with cache_lock(cache_dir, exclusive=False):
+        metadata = os.path.join(entry, "entry.json")
+        if not os.path.isfile(metadata):
+            write_report(prefix, sample, key, "miss", 0, 0)
+            print("Annotation cache miss for {sample} ({key})".format(sample=sample, key=key))
+            return
+
+        with open(metadata) as f:
+            files = json.load(f)["files"]
+        os.makedirs(outdir, exist_ok=True)
+        for name in files:
+            shutil.copyfile(os.path.join(entry, name), os.path.join(outdir, name))
+        os.utime(metadata)
+
+    size = sum(os.path.getsize(os.path.join(outdir, name)) for name in files)
+    write_report(prefix, sample, key, "hit", len(files), size)
+    print("Annotation cache hit for {sample} ({key}), restored {n} files".format(sample=sample, key=key, n=len(files)))
+
+
+def entries(cache_dir):
+    """
+    Yield (last use, size, path) of all complete entries.
+    """
+    root = os.path.join(cache_dir, "entries")
+    if not os.path.isdir(root):
+        return
+    for shard in os.listdir(root):
+        for key in os.listdir(os.path.join(root, shard)):
+            path = os.path.join(root, shard, key)
+            metadata = os.path.join(path, "entry.json")
+            if not os.path.isfile(metadata):
+                continue
+            with open(metadata) as f:
+                size = json.load(f)["size"]
+            yield os.path.getmtime(metadata), size, path
+
+
+def evict(cache_dir, max_size, keep):
+    """
+    Remove the least recently used entries until the cache is not larger than max_size bytes.
+    """
+    current = sorted(entries(cache_dir))
+    total = sum(size for _, size, _ in current)
+    evicted = 0
+    for _, size, path in current:
+        if total <= max_size:
+            break
+        if path == keep:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        evicted += 1
+    return evicted, total
+
+
+def store(cache_dir, report, files, settings, max_size):
+    entry_info = read_report(report)
+    key = entry_info["key"]
+    entry = entry_dir(cache_dir, key)
+
+    names = [os.path.basename(path) for path in files]
+    if len(set(names)) != len(names):
+        sys.exit("Annotation files to cache must have distinct names: {names}".format(names=", ".join(names)))
+
+    # Write to a temporary directory first, so that lookups never see a partial entry
+    tmp = os.path.join(cache_dir, "tmp", "{key}.{pid}".format(key=key, pid=os.getpid()))
+    os.makedirs(tmp, exist_ok=True)
+    size = 0
+    for path, name in zip(files, names):
+        shutil.copyfile(path, os.path.join(tmp, name))
+        size += os.path.getsize(path)
+    with open(os.path.join(tmp, "entry.json"), "w") as f:
+        json.dump(
+            {
+                "sample": entry_info["sample"],
+                "settings": settings,
+                "files": names,
+                "size": size,
+                "created": int(time.time()),
+            },
+            f,
+            indent=2,
+        )
+
+    with cache_lock(cache_dir, exclusive=True):
+        if os.path.isdir(entry):
+            # Stored by a concurrent run in the meantime
+            shutil.rmtree(tmp, ignore_errors=True)
+        else:
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            os.rename(tmp, entry)
+        evicted, total = evict(cache_dir, max_size, keep=entry)
+
+    print(
+        "Stored {n} files ({size} bytes) of {sample} in the annotation cache, evicted {evicted} entries, "
+        "cache size {total} bytes".format(
+            n=len(names), size=size, sample=entry_info["sample"], evicted=evicted, total=total
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="annotation_cache", description="Persistent cache of annotation results.")
+    parser.add_argument("-v", "--version", help="show version number and exit", action="store_true")
+    subparsers = parser.add_subparsers(dest="command")
+
+    lookup_parser = subparsers.add_parser("lookup", help="restore the annotation of a FASTA file from the cache")
+    lookup_parser.add_argument("-c", "--cache_dir", metavar="PATH", required=True, help="cache directory")
+    lookup_parser.add_argument("-i", "--fasta", metavar="PATH", required=True, help="input FASTA, may be gzipped")
+    lookup_parser.add_argument("-s", "--sample", metavar="NAME", required=True, help="sample name")
+    lookup_parser.add_argument(
+        "-k", "--settings", metavar="STRING", required=True, help="annotation tool, version and parameters"
+    )
+    lookup_parser.add_argument("-p", "--prefix", metavar="PREFIX", required=True, help="prefix of the report")
+    lookup_parser.add_argument(
+        "-o", "--outdir", metavar="PATH", default="restored", help="directory for restored files (default: restored)"
+    )
+
+    store_parser = subparsers.add_parser("store", help="add the annotation of a FASTA file to the cache")
+    store_parser.add_argument("-c", "--cache_dir", metavar="PATH", required=True, help="cache directory")
+    store_parser.add_argument("-r", "--report", metavar="PATH", required=True, help="miss report written by lookup")
+    store_parser.add_argument(
+        "-k", "--settings", metavar="STRING", required=True, help="annotation tool, version and parameters"
+    )
+    store_parser.add_argument(
+        "-m",
+        "--max_size",
+        metavar="GB",
+        type=float,
+        default=100,
+        help="maximum cache size in GB, least recently used entries are evicted (default: 100)",
+    )
+    store_parser.add_argument("files", metavar="FILE", nargs="+", help="annotation files to cache")
+
+    args = parser.parse_args()
+
+    if args.version:
+        print("annotation_cache {version}".format(version=tool_version))
+        sys.exit(0)
+
+    if args.command == "lookup":
+        lookup(args.cache_dir, args.fasta, args.sample, args.settings, args.prefix, args.outdir)
+    elif args.command == "store":
+        store(args.cache_dir, args.report, args.files, args.settings, int(args.max_size * 1024**3))
+    else:
+        parser.error("a command (lookup or store) is required")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+# Written by the nf-core/funcscan team, released under the MIT license.
+
+"""
+Store the downloaded antiSMASH database and installation directory in a cache shared between pipeline runs.
+
+An entry is keyed by the antiSMASH version and the URLs of the css, detection
+and modules tarballs, which pin a commit of nf-core/test-datasets. The key is
+computed by the pipeline (`WorkflowFuncscan.antismashDatabaseCacheEntry`),
+which also looks entries up before deciding whether to download the databases.
+
+Layout of the cache directory:
+
+    <cache_dir>/<key>/antismash_db/    database directory
+    <cache_dir>/<key>/antismash_dir/   installation directory
+    <cache_dir>/<key>/entry.json       settings, tarball checksums and creation time, written last
+    <cache_dir>/tmp/                   entries being written
+
+An entry is complete once `entry.json` exists. Entries are moved into place
+with one rename, so that concurrent runs never see a partial entry.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+tool_version = "1.0.0"
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store(cache_dir, key, settings, database, directory, tarballs):
+    entry = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(entry, "entry.json")):
+        print("antiSMASH databases are already cached as {key}".format(key=key), file=sys.stderr)
+        return
+
+    os.makedirs(os.path.join(cache_dir, "tmp"), exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=os.path.join(cache_dir, "tmp"), prefix=key + ".")
+    try:
+        # Follow the links of staged inputs, the cache must not point into work directories
+        shutil.copytree(database, os.path.join(tmp, "antismash_db"))
+        shutil.copytree(directory, os.path.join(tmp, "antismash_dir"))
+        with open(os.path.join(tmp, "entry.json"), "w") as f:
+            json.dump(
+                {
+                    "key": key,
+                    "settings": settings,
+                    "tarballs": {os.path.basename(path): file_digest(path) for path in tarballs},
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                },
+                f,
+                indent=4,
+            )
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            # Stored by a concurrent run
+            if not os.path.exists(os.path.join(entry, "entry.json")):
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("Cached antiSMASH databases as {key}".format(key=key), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="antismash_database_cache",
+        description="Store the antiSMASH database and installation directory in a cache shared between runs.",
+    )
+    parser.add_argument("-v", "--version", help="show version number and exit", action="store_true")
+    parser.add_argument("--cache_dir", metavar="PATH", help="cache directory")
+    parser.add_argument("--key", metavar="KEY", help="cache key, computed by the pipeline")
+    parser.add_argument("--settings", metavar="STR", help="antiSMASH version and tarball URLs the key is computed from")
+    parser.add_argument("--database", metavar="PATH", help="antiSMASH database directory")
+    parser.add_argument("--directory", metavar="PATH", help="antiSMASH installation directory")
+    parser.add_argument("tarballs", metavar="TARBALL", nargs="*", help="css, detection and modules tarballs")
+    args = parser.parse_args()
+
+    if args.version:
+        print("antismash_database_cache {version}".format(version=tool_version))
+        sys.exit(0)
+    if not all([args.cache_dir, args.key, args.settings, args.database, args.directory]):
+        parser.error("--cache_dir, --key, --settings, --database and --directory are required")
+
+    store(args.cache_dir, args.key, args.settings, args.database, args.directory, args.tarballs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+
+# Written by the nf-core/funcscan team, released under the MIT license.
+
+"""
+Fit the input size scaling coefficients of resource requests (see conf/resources.config) to earlier runs.
+
+Reads Nextflow trace files (`pipeline_info/execution_trace_*.txt`) and the
+contig statistics of the same runs (`reports/contig_stats/*.contig_stats.tsv`
+and, with BGC sharding, `*.shard_stats.tsv`). Tasks are matched to statistics by
+their tag, i.e. sample or shard ID. For every process, peak memory (GB) and run
+time (hours) are fitted by least squares as
+
+    intercept + per_mbp * total contig length in Mbp + per_kcontigs * number of contigs / 1000
+
+with non-negative coefficients, multiplied by a safety margin. The result is
+written as a Nextflow config file that can be passed with `-c` together with
+`--resource_scaling`.
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+from collections import defaultdict
+
+tool_version = "1.0.0"
+
+default_processes = [
+    "BAKTA_BAKTA",
+    "PROKKA",
+    "ANTISMASH_ANTISMASHLITE",
+    "DEEPBGC_PIPELINE",
+    "GECCO_RUN",
+    "AMPCOMBI",
+]
+
+# Selectors of processes whose coefficients also apply to other aliases, as in conf/base.config
+process_selectors = {
+    "DEEPBGC_PIPELINE": "'DEEPBGC_PIPELINE|DEEPBGC_PIPELINE_BATCH'",
+}
+
+features = ["intercept", "per_mbp", "per_kcontigs"]
+
+memory_units = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3, "TB": 1024**4}
+time_units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_memory(value):
+    """
+    Bytes of a trace memory value, either raw (`trace.raw = true`) or human readable such as `1.2 GB`.
+    """
+    value = value.strip()
+    if value in ("", "-"):
+        return None
+    match = re.fullmatch(r"([\d.]+)\s*([KMGT]?B)?", value)
+    if not match:
+        return None
+    return float(match.group(1)) * memory_units[match.group(2) or "B"]
+
+
+def parse_time(value):
+    """
+    Seconds of a trace duration, either raw milliseconds or human readable such as `1h 2m 3s`.
+    """
+    value = value.strip()
+    if value in ("", "-"):
+        return None
+    if re.fullmatch(r"\d+", value):
+        return int(value) / 1000
+    parts = re.findall(r"([\d.]+)(ms|s|m|h|d)", value)
+    if not parts:
+        return None
+    return sum(float(number) * time_units[unit] for number, unit in parts)
+
+
+def read_stats(paths):
+    """
+    Return {sample or shard ID: (total length, contigs)} of contig and shard statistics files.
+    """
+    stats = {}
+    for path in paths:
+        with open(path) as f:
+            for row in csv.DictReader(f, delimiter="\t"):
+                if "sample" in row:
+                    name = row["sample"]
+                else:
+                    name = os.path.splitext(os.path.basename(row["file"]))[0]
+                stats[name] = (int(row["total_length"]), int(row["contigs"]))
+    return stats
+
+
+def read_traces(paths, processes):
+    """
+    Yield (process, tag, peak memory in bytes, run time in seconds) of completed tasks.
+    """
+    for path in paths:
+        with open(path) as f:
+            for row in csv.DictReader(f, delimiter="\t"):
+                if row.get("status") not in ("COMPLETED", "CACHED"):
+                    continue
+                match = re.fullmatch(r"(\S+?)(?: \((.*)\))?", row["name"])
+                process = match.group(1).split(":")[-1]
+                if process not in processes:
+                    continue
+                tag = row.get("tag") or match.group(2)
+                memory = parse_memory(row.get("peak_rss", ""))
+                time = parse_time(row.get("realtime", ""))
+                if tag and memory is not None and time is not None:
+                    yield process, tag, memory, time
+
+
+def solve(matrix, vector):
+    """
+    Solve a small linear system by Gaussian elimination, None if it is singular.
+    """
+    n = len(vector)
+    a = [row[:] + [value] for row, value in zip(matrix, vector)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        if abs(a[pivot][col]) < 1e-12:
+            return None
+        a[col], a[pivot] = a[pivot], a[col]
+        for r in range(n):
+            if r != col:
+                factor = a[r][col] / a[col][col]
+                a[r] = [x - factor * y for x, y in zip(a[r], a[col])]
+    return [a[i][n] / a[i][i] for i in range(n)]
+
+
+def fit(rows, values):
+    """
+    Non-negative least squares fit of values to rows of features, by dropping features with negative
+    coefficients or a singular system and fitting again. The intercept is always kept.
+    """
+    active = list(range(len(features)))
+    while True:
+        xtx = [[sum(row[i] * row[j] for row in rows) for j in active] for i in active]
+        xty = [sum(row[i] * y for row, y in zip(rows, values)) for i in active]
+        solution = solve(xtx, xty)
+        if solution is None:
+            drop = active[-1]
+        else:
+            negative = [i for i, c in zip(active, solution) if c < 0 and i != 0]
+            if not negative:
+                coefficients = [0.0] * len(features)
+                for i, c in zip(active, solution):
+                    coefficients[i] = max(c, 0.0)
+                return coefficients
+            drop = negative[0]
+        if drop == 0:
+            return [max(values), 0.0, 0.0]
+        active.remove(drop)
+
+
+def r_squared(rows, values, coefficients):
+    mean = sum(values) / len(values)
+    total = sum((y - mean) ** 2 for y in values)
+    residual = sum((y - sum(c * x for c, x in zip(coefficients, row))) ** 2 for row, y in zip(rows, values))
+    return 1 - residual / total if total else 1.0
+
+
+def calibrate(traces, stats, processes, margin, min_tasks):
+    observations = defaultdict(list)
+    unmatched = 0
+    for process, tag, memory, time in read_traces(traces, processes):
+        if tag not in stats:
+            unmatched += 1
+            continue
+        total_length, contigs = stats[tag]
+        row = [1.0, total_length / 1e6, contigs / 1e3]
+        observations[process].append((row, memory / 1024**3, time / 3600))
+
+    if unmatched:
+        print("Skipped {n} tasks without contig statistics".format(n=unmatched), file=sys.stderr)
+
+    fits = {}
+    for process in processes:
+        points = observations.get(process, [])
+        if len(points) < min_tasks:
+            print(
+                "Skipped {process}: {n} tasks, at least {min} required".format(
+                    process=process, n=len(points), min=min_tasks
+                ),
+                file=sys.stderr,
+            )
+            continue
+        rows = [p[0] for p in points]
+        fits[process] = {}
+        for index, resource in [(1, "memory"), (2, "time")]:
+            values = [p[index] for p in points]
+            coefficients = fit(rows, values)
+            print(
+                "{process} {resource}: {n} tasks, R^2 {r2:.3f}".format(
+                    process=process, resource=resource, n=len(points), r2=r_squared(rows, values, coefficients)
+                ),
+                file=sys.stderr,
+            )
+            fits[process][resource] = [c * margin for c in coefficients]
+    return fits
+
+
+def write_config(fits, path):
+    with open(path, "w") as out:
+        out.write(
+            "// Written by calibrate_resources.py {version}, use with --resource_scaling\n\n".format(
+                version=tool_version
+            )
+        )
+        out.write("process {\n")
+        for process, resources in fits.items():
+            out.write(
+                "\n    withName: {selector} {{\n        ext.resource_scaling = [\n".format(
+                    selector=process_selectors.get(process, process)
+                )
+            )
+            lines = []
+            for resource in ["memory", "time"]:
+                terms = ", ".join(
+                    "{name}: {value:.4f}".format(name=name, value=value)
+                    for name, value in zip(features, resources[resource])
+                )
+                lines.append("            {resource:<6} : [ {terms} ]".format(resource=resource, terms=terms))
+            out.write(",\n".join(lines) + "\n        ]\n    }\n")
+        out.write("}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="calibrate_resources",
+        description="Fit input size scaling coefficients of resource requests to Nextflow trace files.",
+    )
+    parser.add_argument("-v", "--version", help="show version number and exit", action="store_true")
+    parser.add_argument("-t", "--trace", metavar="PATH", nargs="+", help="Nextflow trace files")
+    parser.add_argument(
+        "-s", "--stats", metavar="PATH", nargs="+", help="contig_stats.tsv and shard_stats.tsv files of the same runs"
+    )
+    parser.add_argument(
+        "-p",
+        "--processes",
+        metavar="NAME",
+        nargs="+",
+        default=default_processes,
+        help="processes to fit (default: {processes})".format(processes=" ".join(default_processes)),
+    )
+    parser.add_argument(
+        "-m",
+        "--margin",
+        metavar="FLOAT",
+        type=float,
+        default=1.25,
+        help="factor applied to the fitted coefficients (default: 1.25)",
+    )
+    parser.add_argument(
+        "-n", "--min_tasks", metavar="INT", type=int, default=5, help="minimum tasks per process (default: 5)"
+    )
+    parser.add_argument(
+        "-o", "--output", metavar="PATH", default="resources_calibrated.config", help="output config file"
+    )
+    args = parser.parse_args()
+
+    if args.version:
+        print("calibrate_resources {version}".format(version=tool_version))
+        sys.exit(0)
+    if not args.trace or not args.stats:
+        parser.error("--trace and --stats are required")
+
+    fits = calibrate(args.trace, read_stats(args.stats), args.processes, args.margin, args.min_tasks)
+    if not fits:
+        sys.exit("No process had enough tasks with contig statistics to fit")
+    write_config(fits, args.output)
+
+
+if __name__ == "__main__":
+    main()
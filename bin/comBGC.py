@@ -3,8 +3,15 @@
 from Bio import SeqIO
 import pandas as pd
 import argparse
+import gzip
+import heapq
+import io
+import math
+import mmap
+import multiprocessing
 import os
 import re
+import tempfile
 
 """
 ===============================================================================
@@ -32,7 +39,7 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-tool_version = "0.6.1"
+tool_version = "0.10.0"
 welcome = """\
                 ........................
                     * comBGC v.{version} *
@@ -60,10 +67,24 @@ parser.add_argument(
     help="""path(s) to the required output file(s) of antiSMASH, DeepBGC and/or GECCO
 these can be:
 - antiSMASH: <sample name>.gbk and (optional) knownclusterblast/ directory
+             or the <contig>_c<number>.txt files within it
 - DeepBGC:   <sample name>.bgc.tsv
 - GECCO:     <sample name>.clusters.tsv
-Note: Please provide files from a single sample only. If you would like to
-summarize multiple samples, please see the --antismash_multiple_samples flag.""",
+Several files per tool may be given if they are shards of the same sample
+(see --sample). Note: Please provide files from a single sample only. If you
+would like to summarize multiple samples, please see the
+--antismash_multiple_samples flag.""",
+)
+parser.add_argument(
+    "-s",
+    "--sample",
+    metavar="NAME",
+    dest="sample",
+    nargs="?",
+    help="""sample name to report for all input files, e.g. when the input files
+are the results of several shards of one sample. Default: derived from
+the input file names""",
+    type=str,
 )
 parser.add_argument(
     "-o",
@@ -85,6 +106,26 @@ parser.add_argument(
 sample). Can only be used if --input is not specified.""",
     type=str,
 )
+parser.add_argument(
+    "-t",
+    "--threads",
+    metavar="INT",
+    dest="threads",
+    help="""number of processes to parse a plain (not gzipped) antiSMASH GBK
+file with, records are split by byte offset. Default: 1""",
+    type=int,
+    default=1,
+)
+parser.add_argument(
+    "-m",
+    "--streaming",
+    dest="streaming",
+    help="""write the summary with bounded memory: the results of every sample
+and tool are sorted and written to a temporary file as soon as they are
+parsed, and the files are merged into the summary. Peak memory is then
+bounded by the largest sample instead of all samples""",
+    action="store_true",
+)
 parser.add_argument("-vv", "--verbose", help="increase output verbosity", action="store_true")
 parser.add_argument("-v", "--version", help="show version number and exit", action="store_true")
 
@@ -94,13 +135,40 @@ args = parser.parse_args()
 # Assign input arguments to variables
 input = args.input
 dir_antismash = args.antismash_multiple_samples
+sample_name = args.sample
 outdir = args.outdir
 verbose = args.verbose
+threads = args.threads
+streaming = args.streaming
 version = args.version
 
 if version:
     exit("comBGC {version}".format(version=tool_version))
 
+
+def open_file(path):
+    """
+    Open a plain or gzipped text file, detected by magic bytes rather than file extension.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, "rt")
+    return open(path)
+
+
+def plain_name(path):
+    """
+    File name without a trailing .gz, used to recognise the output type of gzipped inputs.
+    """
+    return path[:-3] if path.endswith(".gz") else path
+
+
+# Per-region GBK files of antiSMASH repeat the records of the summary GBK
+antismash_region_gbk = re.compile(r"\.region\d+\.gbk$")
+# knownclusterblast TXT files are named after the contig and cluster number
+antismash_kcb_txt = re.compile(r"_c\d+\.txt$")
+
 input_antismash = []
 input_deepbgc = []
 input_gecco = []
@@ -108,8 +176,11 @@ input_gecco = []
 # Assign input files to respective tools
 if input:
     for path in input:
-        if path.endswith(".gbk"):
-            with open(path) as infile:
+        name = plain_name(path)
+        if name.endswith(".gbk"):
+            if antismash_region_gbk.search(name):
+                continue
+            with open_file(path) as infile:
                 for line in infile:
                     if re.search("##GECCO-Data-START##", line):
                         input_gecco.append(path)
@@ -117,11 +188,11 @@ if input:
                     elif re.search("##antiSMASH-Data-START##", line):
                         input_antismash.append(path)
                         break
-        elif path.endswith("bgc.tsv"):
-            input_deepbgc = path
-        elif path.endswith("clusters.tsv"):
+        elif name.endswith("bgc.tsv"):
+            input_deepbgc.append(path)
+        elif name.endswith("clusters.tsv"):
             input_gecco.append(path)
-        elif path.endswith("knownclusterblast/"):
+        elif name.rstrip("/").endswith("knownclusterblast") or antismash_kcb_txt.search(name):
             input_antismash.append(path)
 
 if input and dir_antismash:
@@ -129,6 +200,9 @@ if input and dir_antismash:
         "The flags --input and --antismash_multiple_samples are mutually exclusive.\nPlease use only one of them (or see --help for how to use)."
     )
 
+if sample_name and dir_antismash:
+    exit("The flag --sample can only be used together with --input (or see --help for how to use).")
+
 # Make sure that at least one input argument is given
 if not (input_antismash or input_gecco or input_deepbgc or dir_antismash):
     exit("Please specify at least one input file (i.e. output from antismash, deepbgc, or gecco) or see --help")
@@ -137,6 +211,23 @@ if not (input_antismash or input_gecco or input_deepbgc or dir_antismash):
 # ANTISMASH FUNCTIONS
 ########################
 
+antismash_sum_cols = [
+    "Sample_ID",
+    "Prediction_tool",
+    "Contig_ID",
+    "Product_class",
+    "BGC_probability",
+    "BGC_complete",
+    "BGC_start",
+    "BGC_end",
+    "BGC_length",
+    "CDS_ID",
+    "CDS_count",
+    "PFAM_domains",
+    "MIBiG_ID",
+    "InterPro_ID",
+]
+
 
 def prepare_multisample_input_antismash(antismash_dir):
     """
@@ -161,7 +252,7 @@ def parse_knownclusterblast(kcb_file_path):
     Extract MIBiG IDs from knownclusterblast TXT file.
     """
 
-    with open(kcb_file_path) as kcb_file:
+    with open_file(kcb_file_path) as kcb_file:
         hits = 0
         MIBiG_IDs = []
 
@@ -184,164 +275,225 @@ def antismash_workflow(antismash_paths):
     - Return data frame with aggregated info.
     """
 
-    antismash_sum_cols = [
-        "Sample_ID",
-        "Prediction_tool",
-        "Contig_ID",
-        "Product_class",
-        "BGC_probability",
-        "BGC_complete",
-        "BGC_start",
-        "BGC_end",
-        "BGC_length",
-        "CDS_ID",
-        "CDS_count",
-        "PFAM_domains",
-        "MIBiG_ID",
-        "InterPro_ID",
-    ]
     antismash_out = pd.DataFrame(columns=antismash_sum_cols)
 
-    CDS_ID = []
-    CDS_count = 0
-
-    # Distinguish input files (i.e. GBK file and "knownclusterblast" folder)
-    kcb_path = []
+    # Distinguish input files (i.e. GBK files and "knownclusterblast" folders or files)
+    # knownclusterblast files are looked up by name, which is unique per contig, so
+    # the files of several shards of a sample can be pooled
+    gbk_paths = []
+    kcb_files = {}
     for path in antismash_paths:
-        if re.search("knownclusterblast", path):
-            kcb_path = re.search(".*knownclusterblast.*", path).group()
+        if os.path.isdir(path):
+            for file in os.listdir(path):
+                if file.startswith("c") and plain_name(file).endswith(".txt"):
+                    kcb_files[plain_name(file)] = os.path.join(path, file)
+        elif re.search("knownclusterblast", path) or antismash_kcb_txt.search(plain_name(path)):
+            kcb_files[plain_name(os.path.basename(path))] = path
         else:
-            gbk_path = path
+            gbk_paths.append(path)
+
+    for gbk_path in gbk_paths:
+        antismash_out = pd.concat([antismash_out, antismash_gbk_workflow(gbk_path, kcb_files)], ignore_index=True)
+
+    return antismash_out
 
-    kcb_files = []
-    if kcb_path:
-        kcb_files = [file for file in os.listdir(kcb_path) if file.startswith("c") and file.endswith(".txt")]
+
+def antismash_gbk_workflow(gbk_path, kcb_files):
+    """
+    Create data frame with the BGCs of a single antiSMASH summary GBK file.
+    Records (contigs) are independent, so with --threads the records of a
+    plain GBK file are parsed in parallel and the rows merged in file order.
+    """
 
     # Aggregate information
-    Sample_ID = gbk_path.split("/")[-1].split(".gbk")[-2]  # Assuming file name equals sample name
+    Sample_ID = sample_name or gbk_path.split("/")[-1].split(".gbk")[-2]  # Assuming file name equals sample name
+    if verbose:
+        print("\nParsing antiSMASH file(s): " + gbk_path + "\n... ", end="")
+
+    if threads > 1 and not is_gzipped(gbk_path):
+        chunks = gbk_record_chunks(gbk_path, threads)
+        with multiprocessing.get_context("fork").Pool(threads) as pool:
+            chunk_rows = pool.starmap(
+                antismash_chunk_rows, [(gbk_path, start, end, Sample_ID, kcb_files) for start, end in chunks]
+            )
+        rows = [row for chunk in chunk_rows for row in chunk]
+    else:
+        rows = []
+        with open_file(gbk_path) as gbk:
+            for record in SeqIO.parse(gbk, "genbank"):  # GBK records are contigs in this case
+                rows += antismash_record_rows(record, Sample_ID, kcb_files)
+
     if verbose:
-        print("\nParsing antiSMASH file(s): " + Sample_ID + "\n... ", end="")
-
-    with open(gbk_path) as gbk:
-        for record in SeqIO.parse(gbk, "genbank"):  # GBK records are contigs in this case
-            # Initiate variables per contig
-            cluster_num = 1
-            antismash_out_line = {}
-            Contig_ID = record.id
-            Product_class = ""
-            BGC_complete = ""
-            BGC_start = ""
-            BGC_end = ""
-            BGC_length = ""
-            PFAM_domains = []
-            MIBiG_ID = "NA"
-
-            for feature in record.features:
-                # Extract relevant infos from the first protocluster feature from the contig record
-                if feature.type == "protocluster":
-                    if (
-                        antismash_out_line
-                    ):  # If there is more than 1 BGC per contig, reset the output line for new BGC. Assuming that BGCs do not overlap.
-                        if not CDS_ID:
-                            CDS_ID = ["NA"]
-                        antismash_out_line = {  # Create dictionary of BGC info
-                            "Sample_ID": Sample_ID,
-                            "Prediction_tool": "antiSMASH",
-                            "Contig_ID": Contig_ID,
-                            "Product_class": ";".join(Product_class),
-                            "BGC_probability": "NA",
-                            "BGC_complete": BGC_complete,
-                            "BGC_start": BGC_start,
-                            "BGC_end": BGC_end,
-                            "BGC_length": BGC_length,
-                            "CDS_ID": ";".join(CDS_ID),
-                            "CDS_count": CDS_count,
-                            "PFAM_domains": ";".join(PFAM_domains),
-                            "MIBiG_ID": MIBiG_ID,
-                            "InterPro_ID": "NA",
-                        }
-                        antismash_out_line = pd.DataFrame([antismash_out_line])
-                        antismash_out = pd.concat([antismash_out, antismash_out_line], ignore_index=True)
-                        antismash_out_line = {}
-
-                        # Reset variables per BGC
-                        CDS_ID = []
-                        CDS_count = 0
-                        PFAM_domains = []
-
-                    # Extract all the BGC info
-                    Product_class = feature.qualifiers["product"]
-                    for i in range(len(Product_class)):
-                        Product_class[i] = (
-                            Product_class[i][0].upper() + Product_class[i][1:]
-                        )  # Make first letters uppercase, e.g. lassopeptide -> Lassopeptide
-
-                    if feature.qualifiers["contig_edge"] == ["True"]:
-                        BGC_complete = "No"
-                    elif feature.qualifiers["contig_edge"] == ["False"]:
-                        BGC_complete = "Yes"
-
-                    BGC_start = feature.location.start + 1  # +1 because zero-based start position
-                    BGC_end = feature.location.end
-                    BGC_length = feature.location.end - feature.location.start + 1
-
-                    # If there are knownclusterblast files for the BGC, get MIBiG IDs of their homologs
-                    if kcb_files:
-                        print(kcb_files)
-                        kcb_file = "{}_c{}.txt".format(
-                            record.id, str(cluster_num)
-                        )  # Check if this filename is among the knownclusterblast files
-                        if kcb_file in kcb_files:
-                            MIBiG_IDs = ";".join(parse_knownclusterblast(os.path.join(kcb_path, kcb_file)))
-                            if MIBiG_IDs != "":
-                                MIBiG_ID = MIBiG_IDs
-                            cluster_num += 1
-
-                # Count functional CDSs (no pseudogenes) and get the PFAM annotation
-                elif (
-                    feature.type == "CDS" and "translation" in feature.qualifiers.keys() and BGC_start != ""
-                ):  # Make sure not to count pseudogenes (which would have no "translation tag") and count no CDSs before first BGC
-                    if feature.location.end <= BGC_end:  # Make sure CDS is within the current BGC region
-                        if "locus_tag" in feature.qualifiers:
-                            CDS_ID.append(feature.qualifiers["locus_tag"][0])
-                        CDS_count += 1
-                        if "sec_met_domain" in feature.qualifiers.keys():
-                            for PFAM_domain in feature.qualifiers["sec_met_domain"]:
-                                PFAM_domain_name = re.search("(.+) \(E-value", PFAM_domain).group(1)
-                                PFAM_domains.append(PFAM_domain_name)
-
-            # Create dictionary of BGC info
-            if not CDS_ID:
-                CDS_ID = ["NA"]
-            antismash_out_line = {
-                "Sample_ID": Sample_ID,
-                "Prediction_tool": "antiSMASH",
-                "Contig_ID": Contig_ID,
-                "Product_class": ";".join(Product_class),
-                "BGC_probability": "NA",
-                "BGC_complete": BGC_complete,
-                "BGC_start": BGC_start,
-                "BGC_end": BGC_end,
-                "BGC_length": BGC_length,
-                "CDS_ID": ";".join(CDS_ID),
-                "CDS_count": CDS_count,
-                "PFAM_domains": ";".join(PFAM_domains),
-                "MIBiG_ID": MIBiG_ID,
-                "InterPro_ID": "NA",
-            }
-
-            if BGC_start != "":  # Only keep records with BGCs
-                antismash_out_line = pd.DataFrame([antismash_out_line])
-                antismash_out = pd.concat([antismash_out, antismash_out_line], ignore_index=True)
+        print("Done.")
+    return pd.DataFrame(rows, columns=antismash_sum_cols)
+
+
+def is_gzipped(path):
+    with open(path, "rb") as f:
+        return f.read(2) == b"\x1f\x8b"
+
+
+def gbk_record_chunks(gbk_path, n_workers):
+    """
+    Split a GBK file into byte ranges of whole records, found by the `LOCUS` line that starts
+    every record (the previous record ends with `//`). Several ranges of at most 64 MB per
+    worker balance the load.
+    """
+    with open(gbk_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            starts = [0] if mm[:5] == b"LOCUS" else []
+            pos = mm.find(b"\nLOCUS")
+            while pos != -1:
+                starts.append(pos + 1)
+                pos = mm.find(b"\nLOCUS", pos + 1)
+
+    if not starts:
+        return []
+    # Bounded, as every worker holds its current range in memory
+    chunk_size = min(max(size // (n_workers * 4), 1), 64 * 1024**2)
+    chunks = []
+    chunk_start = starts[0]
+    for start in starts[1:]:
+        if start - chunk_start >= chunk_size:
+            chunks.append((chunk_start, start))
+            chunk_start = start
+    chunks.append((chunk_start, size))
+    return chunks
+
+
+def antismash_chunk_rows(gbk_path, start, end, Sample_ID, kcb_files):
+    """
+    BGC rows of the records in a byte range of a GBK file.
+    """
+    with open(gbk_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            text = mm[start:end].decode()
+    rows = []
+    for record in SeqIO.parse(io.StringIO(text), "genbank"):
+        rows += antismash_record_rows(record, Sample_ID, kcb_files)
+    return rows
+
+
+def antismash_record_rows(record, Sample_ID, kcb_files):
+    """
+    BGC rows of a single antiSMASH GBK record (contig). knownclusterblast files are
+    numbered per contig (<contig>_c<number>.txt), so a record can be processed on its own.
+    """
+
+    rows = []
+
+    # Initiate variables per contig
+    cluster_num = 1
+    antismash_out_line = {}
+    Contig_ID = record.id
+    Product_class = ""
+    BGC_complete = ""
+    BGC_start = ""
+    BGC_end = ""
+    BGC_length = ""
+    CDS_ID = []
+    CDS_count = 0
+    PFAM_domains = []
+    MIBiG_ID = "NA"
+
+    for feature in record.features:
+        # Extract relevant infos from the first protocluster feature from the contig record
+        if feature.type == "protocluster":
+            if (
+                antismash_out_line
+            ):  # If there is more than 1 BGC per contig, reset the output line for new BGC. Assuming that BGCs do not overlap.
+                if not CDS_ID:
+                    CDS_ID = ["NA"]
+                antismash_out_line = {  # Create dictionary of BGC info
+                    "Sample_ID": Sample_ID,
+                    "Prediction_tool": "antiSMASH",
+                    "Contig_ID": Contig_ID,
+                    "Product_class": ";".join(Product_class),
+                    "BGC_probability": "NA",
+                    "BGC_complete": BGC_complete,
+                    "BGC_start": BGC_start,
+                    "BGC_end": BGC_end,
+                    "BGC_length": BGC_length,
+                    "CDS_ID": ";".join(CDS_ID),
+                    "CDS_count": CDS_count,
+                    "PFAM_domains": ";".join(PFAM_domains),
+                    "MIBiG_ID": MIBiG_ID,
+                    "InterPro_ID": "NA",
+                }
+                rows.append(antismash_out_line)
+                antismash_out_line = {}
 
                 # Reset variables per BGC
                 CDS_ID = []
                 CDS_count = 0
                 PFAM_domains = []
 
-    if verbose:
-        print("Done.")
-    return antismash_out
+            # Extract all the BGC info
+            Product_class = feature.qualifiers["product"]
+            for i in range(len(Product_class)):
+                Product_class[i] = (
+                    Product_class[i][0].upper() + Product_class[i][1:]
+                )  # Make first letters uppercase, e.g. lassopeptide -> Lassopeptide
+
+            if feature.qualifiers["contig_edge"] == ["True"]:
+                BGC_complete = "No"
+            elif feature.qualifiers["contig_edge"] == ["False"]:
+                BGC_complete = "Yes"
+
+            BGC_start = feature.location.start + 1  # +1 because zero-based start position
+            BGC_end = feature.location.end
+            BGC_length = feature.location.end - feature.location.start + 1
+
+            # If there are knownclusterblast files for the BGC, get MIBiG IDs of their homologs
+            if kcb_files:
+                kcb_file = "{}_c{}.txt".format(
+                    record.id, str(cluster_num)
+                )  # Check if this filename is among the knownclusterblast files
+                if kcb_file in kcb_files:
+                    MIBiG_IDs = ";".join(parse_knownclusterblast(kcb_files[kcb_file]))
+                    if MIBiG_IDs != "":
+                        MIBiG_ID = MIBiG_IDs
+                    cluster_num += 1
+
+        # Count functional CDSs (no pseudogenes) and get the PFAM annotation
+        elif (
+            feature.type == "CDS" and "translation" in feature.qualifiers.keys() and BGC_start != ""
+        ):  # Make sure not to count pseudogenes (which would have no "translation tag") and count no CDSs before first BGC
+            if feature.location.end <= BGC_end:  # Make sure CDS is within the current BGC region
+                if "locus_tag" in feature.qualifiers:
+                    CDS_ID.append(feature.qualifiers["locus_tag"][0])
+                CDS_count += 1
+                if "sec_met_domain" in feature.qualifiers.keys():
+                    for PFAM_domain in feature.qualifiers["sec_met_domain"]:
+                        PFAM_domain_name = re.search("(.+) \(E-value", PFAM_domain).group(1)
+                        PFAM_domains.append(PFAM_domain_name)
+
+    if BGC_start != "":  # Only keep records with BGCs
+        # Create dictionary of BGC info
+        if not CDS_ID:
+            CDS_ID = ["NA"]
+        antismash_out_line = {
+            "Sample_ID": Sample_ID,
+            "Prediction_tool": "antiSMASH",
+            "Contig_ID": Contig_ID,
+            "Product_class": ";".join(Product_class),
+            "BGC_probability": "NA",
+            "BGC_complete": BGC_complete,
+            "BGC_start": BGC_start,
+            "BGC_end": BGC_end,
+            "BGC_length": BGC_length,
+            "CDS_ID": ";".join(CDS_ID),
+            "CDS_count": CDS_count,
+            "PFAM_domains": ";".join(PFAM_domains),
+            "MIBiG_ID": MIBiG_ID,
+            "InterPro_ID": "NA",
+        }
+        rows.append(antismash_out_line)
+
+    return rows
 
 
 ########################
@@ -349,9 +501,9 @@ def antismash_workflow(antismash_paths):
 ########################
 
 
-def deepbgc_workflow(deepbgc_path):
+def deepbgc_workflow(deepbgc_paths):
     """
-    Create data frame with aggregated deepBGC output.
+    Create data frame with aggregated deepBGC output of one or more BGC TSV files.
     """
 
     if verbose:
@@ -406,22 +558,27 @@ def deepbgc_workflow(deepbgc_path):
         "bio_pfam_ids",
     ]
 
-    # Grab deepBGC sample ID
-    sample = os.path.basename(deepbgc_path).rsplit(".bgc", 1)[0]
-
     # Initiate dataframe
     deepbgc_out = pd.DataFrame(columns=deepbgc_sum_cols)
 
-    # Add relevant deepBGC output columns per BGC
-    deepbgc_df = pd.read_csv(deepbgc_path, sep="\t").drop(deepbgc_unused_cols, axis=1).rename(columns=deepbgc_map_dict)
-    deepbgc_df["Sample_ID"] = sample
-    deepbgc_df["Prediction_tool"] = "deepBGC"
-    deepbgc_df["BGC_complete"] = "NA"
-    deepbgc_df["MIBiG_ID"] = "NA"
-    deepbgc_df["InterPro_ID"] = "NA"
-
-    # Concatenate data frame to out w/o common index column (e.g. sample_id) due to duplicate row names
-    deepbgc_out = pd.concat([deepbgc_out, deepbgc_df], ignore_index=True, sort=False)
+    for deepbgc_path in deepbgc_paths:
+        # Grab deepBGC sample ID
+        sample = sample_name or os.path.basename(deepbgc_path).rsplit(".bgc", 1)[0]
+
+        # Add relevant deepBGC output columns per BGC
+        deepbgc_df = (
+            pd.read_csv(open_file(deepbgc_path), sep="\t")
+            .drop(deepbgc_unused_cols, axis=1)
+            .rename(columns=deepbgc_map_dict)
+        )
+        deepbgc_df["Sample_ID"] = sample
+        deepbgc_df["Prediction_tool"] = "deepBGC"
+        deepbgc_df["BGC_complete"] = "NA"
+        deepbgc_df["MIBiG_ID"] = "NA"
+        deepbgc_df["InterPro_ID"] = "NA"
+
+        # Concatenate data frame to out w/o common index column (e.g. sample_id) due to duplicate row names
+        deepbgc_out = pd.concat([deepbgc_out, deepbgc_df], ignore_index=True, sort=False)
 
     # Return data frame with ordered columns
     deepbgc_out = deepbgc_out[deepbgc_sum_cols]
@@ -440,7 +597,7 @@ def getInterProID(gbk_path):
     Retrieve InterPro IDs from GECCO GBK file.
     """
 
-    with open(gbk_path) as gbk:
+    with open_file(gbk_path) as gbk:
         ip_ids = []
         id_pattern = 'InterPro\:(.*)"'
 
@@ -497,24 +654,28 @@ def gecco_workflow(gecco_paths):
         "nrp_probability",
     ]
 
-    tsv_path = ""
+    tsv_paths = []
     gbk_paths = []
 
     for path in gecco_paths:
-        if path.endswith(".tsv"):
-            tsv_path = path
+        if plain_name(path).endswith(".tsv"):
+            tsv_paths.append(path)
         else:
             gbk_paths.append(path)
 
     # Initiate dataframe
     gecco_out = pd.DataFrame(columns=summary_cols)
 
-    # Add sample information
-    sample = tsv_path.split("/")[-1].split(".")[0]
-    gecco_df = pd.read_csv(tsv_path, sep="\t").drop(unused_cols, axis=1).rename(columns=map_dict)
+    # Add sample information, cluster IDs are unique across shards of a sample as they contain the contig ID
+    gecco_dfs = []
+    for tsv_path in tsv_paths:
+        sample = sample_name or tsv_path.split("/")[-1].split(".")[0]
+        gecco_df = pd.read_csv(open_file(tsv_path), sep="\t").drop(unused_cols, axis=1).rename(columns=map_dict)
+        gecco_df["Sample_ID"] = sample
+        gecco_dfs.append(gecco_df)
+    gecco_df = pd.concat(gecco_dfs, ignore_index=True)
 
     # Fill columns (1 row per BGC)
-    gecco_df["Sample_ID"] = sample
     gecco_df["BGC_length"] = gecco_df["BGC_end"] - gecco_df["BGC_start"]
     gecco_df["CDS_count"] = [
         len(gecco_df["CDS_ID"].iloc[i].split(";")) for i in range(0, gecco_df.shape[0])
@@ -545,6 +706,97 @@ def gecco_workflow(gecco_paths):
     return gecco_out
 
 
+########################
+# STREAMING OUTPUT
+########################
+
+summary_sort_cols = ["Sample_ID", "Contig_ID", "BGC_start", "BGC_length", "Prediction_tool"]
+
+# Maximum number of temporary files merged at once
+merge_fan_in = 256
+
+
+def spill_run(df, tmpdir, runs):
+    """
+    Sort the rows of one sample or tool and write them to a temporary run file, without header.
+    The sort is stable, so that rows with equal keys keep their order as in the in-memory summary.
+    """
+    if df.empty:
+        return
+    df = df.sort_values(by=summary_sort_cols, axis=0, kind="mergesort")
+    path = os.path.join(tmpdir, "run_{n:06d}.tsv".format(n=len(runs)))
+    df.to_csv(path, sep="\t", index=False, header=False)
+    runs.append(path)
+
+
+def summary_line_key(line):
+    """
+    Sort key of a summary line, numbers compared as numbers and missing values last as in pandas.
+    """
+    fields = line.rstrip("\n").split("\t")
+
+    def number(value):
+        try:
+            value = float(value)
+        except ValueError:
+            return (True, 0.0)
+        return (math.isnan(value), value)
+
+    return (fields[0], fields[2], number(fields[6]), number(fields[8]), fields[1])
+
+
+def merge_runs(runs, out):
+    """
+    k-way merge of sorted run files, ties are taken from earlier runs first.
+    """
+    files = [open(run) for run in runs]
+    try:
+        out.writelines(heapq.merge(*files, key=summary_line_key))
+    finally:
+        for f in files:
+            f.close()
+
+
+def write_summary_streaming(tools_provided, outfile):
+    """
+    Parse the input sample by sample and tool by tool, spill every result as a sorted run
+    and merge the runs into the summary. The order of runs equals the order of the
+    in-memory summary (antiSMASH, deepBGC, GECCO), so the output is the same.
+    """
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(outfile) or ".") as tmpdir:
+        runs = []
+        for tool in tools_provided.keys():
+            if tool == "antiSMASH":
+                if dir_antismash:
+                    for sample_paths in prepare_multisample_input_antismash(dir_antismash):
+                        spill_run(antismash_workflow(sample_paths), tmpdir, runs)
+                else:
+                    spill_run(antismash_workflow(input_antismash), tmpdir, runs)
+            elif tool == "deepBGC":
+                for deepbgc_path in input_deepbgc:
+                    spill_run(deepbgc_workflow([deepbgc_path]), tmpdir, runs)
+            elif tool == "GECCO":
+                spill_run(gecco_workflow(input_gecco), tmpdir, runs)
+
+        # Merge in rounds if there are more runs than files that should be open at once
+        merge_round = 0
+        while len(runs) > merge_fan_in:
+            merge_round += 1
+            merged = []
+            for i in range(0, len(runs), merge_fan_in):
+                path = os.path.join(tmpdir, "merged_{r}_{n:06d}.tsv".format(r=merge_round, n=len(merged)))
+                with open(path, "w") as out:
+                    merge_runs(runs[i : i + merge_fan_in], out)
+                merged.append(path)
+            for run in runs:
+                os.remove(run)
+            runs = merged
+
+        with open(outfile, "w") as out:
+            out.write("\t".join(antismash_sum_cols) + "\n")
+            merge_runs(runs, out)
+
+
 ########################
 # MAIN
 ########################
@@ -567,33 +819,35 @@ if __name__ == "__main__":
         print(welcome)
         print("\nYou provided input for: " + ", ".join(tools_provided.keys()))
 
-    # Aggregate BGC information into data frame
-    summary_antismash = pd.DataFrame()
-    summary_deepbgc = pd.DataFrame()
-    summary_gecco = pd.DataFrame()
-
-    for tool in tools_provided.keys():
-        if tool == "antiSMASH":
-            if dir_antismash:
-                antismash_paths = prepare_multisample_input_antismash(dir_antismash)
-                for input_antismash in antismash_paths:
-                    summary_antismash_temp = antismash_workflow(input_antismash)
-                    summary_antismash = pd.concat([summary_antismash, summary_antismash_temp])
-            else:
-                summary_antismash = antismash_workflow(input_antismash)
-        elif tool == "deepBGC":
-            summary_deepbgc = deepbgc_workflow(input_deepbgc)
-        elif tool == "GECCO":
-            summary_gecco = gecco_workflow(input_gecco)
-
-    # Summarize and sort data frame
-    summary_all = pd.concat([summary_antismash, summary_deepbgc, summary_gecco])
-    summary_all.sort_values(
-        by=["Sample_ID", "Contig_ID", "BGC_start", "BGC_length", "Prediction_tool"], axis=0, inplace=True
-    )
-
-    # Write results to TSV
     if not os.path.exists(outdir):
         os.makedirs(outdir)
-    summary_all.to_csv(os.path.join(outdir, "combgc_summary.tsv"), sep="\t", index=False)
+
+    if streaming:
+        write_summary_streaming(tools_provided, os.path.join(outdir, "combgc_summary.tsv"))
+    else:
+        # Aggregate BGC information into data frame
+        summary_antismash = pd.DataFrame()
+        summary_deepbgc = pd.DataFrame()
+        summary_gecco = pd.DataFrame()
+
+        for tool in tools_provided.keys():
+            if tool == "antiSMASH":
+                if dir_antismash:
+                    antismash_paths = prepare_multisample_input_antismash(dir_antismash)
+                    for input_antismash in antismash_paths:
+                        summary_antismash_temp = antismash_workflow(input_antismash)
+                        summary_antismash = pd.concat([summary_antismash, summary_antismash_temp])
+                else:
+                    summary_antismash = antismash_workflow(input_antismash)
+            elif tool == "deepBGC":
+                summary_deepbgc = deepbgc_workflow(input_deepbgc)
+            elif tool == "GECCO":
+                summary_gecco = gecco_workflow(input_gecco)
+
+        # Summarize and sort data frame
+        summary_all = pd.concat([summary_antismash, summary_deepbgc, summary_gecco])
+        summary_all.sort_values(by=summary_sort_cols, axis=0, inplace=True)
+
+        # Write results to TSV
+        summary_all.to_csv(os.path.join(outdir, "combgc_summary.tsv"), sep="\t", index=False)
     print("Your BGC summary file is: " + os.path.join(outdir, "combgc_summary.tsv"))
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+
+# Written by the nf-core/funcscan team, released under the MIT license.
+
+"""
+Annotate contigs that occur in several samples only once.
+
+`dedup` hashes every contig sequence of all samples, writes each distinct
+sequence once under a new ID (`u` and nine digits) to batches of about
+`--batch_size` bp, and records which sample contig maps to which distinct
+contig. `fanout` takes the gene predictions (FAA, FNA, GFF) of the batches and
+writes them back per sample, in the sample's contig order and with the
+sample's contig IDs, as if the sample had been annotated on its own.
+
+Only valid for annotation that treats every contig independently, i.e.
+Prodigal/Pyrodigal in metagenome mode.
+"""
+
+import argparse
+import gzip
+import hashlib
+import os
+import re
+import sys
+from collections import defaultdict
+
+tool_version = "1.0.0"
+
+map_cols = ["sample", "contig", "header", "unique_id", "batch"]
+stats_cols = [
+    "samples",
+    "contigs",
+    "unique_contigs",
+    "total_length",
+    "unique_length",
+    "dedup_ratio",
+    "saved_fraction",
+]
+
+
+def open_file(path, mode="rb"):
+    """
+    Open a plain or gzipped file, detected by magic bytes rather than file extension.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def fasta_records(path):
+    """
+    Yield (header, sequence lines) of every record of a FASTA file, header without `>` and line end.
+    """
+    header = None
+    lines = []
+    with open_file(path) as fasta:
+        for line in fasta:
+            if line.startswith(b">"):
+                if header is not None:
+                    yield header, lines
+                header = line[1:].rstrip(b"\r\n")
+                lines = []
+            elif header is not None:
+                lines.append(line)
+    if header is not None:
+        yield header, lines
+
+
+def unique_id(n):
+    return "u{n:09d}".format(n=n)
+
+
+def batch_name(prefix, n):
+    return "{prefix}_batch_{n:03d}".format(prefix=prefix, n=n)
+
+
+def dedup(samples, fastas, batch_size, prefix):
+    """
+    Write the distinct contigs of all samples to batches, the sample contig -> distinct contig map and statistics.
+    """
+    seen = {}
+    batch = 0
+    batch_length = 0
+    out = None
+    stats = defaultdict(int)
+
+    with open(prefix + ".contig_map.tsv", "w") as contig_map:
+        contig_map.write("\t".join(map_cols) + "\n")
+
+        for sample, fasta in zip(samples, fastas):
+            for header, lines in fasta_records(fasta):
+                sequence = b"".join(line.strip() for line in lines)
+                digest = hashlib.blake2b(sequence, digest_size=16).digest()
+
+                stats["contigs"] += 1
+                stats["total_length"] += len(sequence)
+
+                if digest not in seen:
+                    if out is None or (batch_length and batch_length + len(sequence) > batch_size):
+                        if out is not None:
+                            out.close()
+                        batch += 1
+                        batch_length = 0
+                        out = open(batch_name(prefix, batch) + ".fasta", "wb")
+                    seen[digest] = (unique_id(len(seen) + 1), batch_name(prefix, batch))
+                    out.write(b">" + seen[digest][0].encode() + b"\n")
+                    out.writelines(lines)
+                    batch_length += len(sequence)
+                    stats["unique_contigs"] += 1
+                    stats["unique_length"] += len(sequence)
+
+                header = header.decode().replace("\t", " ")
+                contig = header.split(maxsplit=1)[0] if header.strip() else ""
+                contig_map.write("\t".join([sample, contig, header, *seen[digest]]) + "\n")
+
+    if out is not None:
+        out.close()
+
+    stats["samples"] = len(samples)
+    stats["dedup_ratio"] = round(stats["total_length"] / stats["unique_length"], 4) if stats["unique_length"] else 1
+    stats["saved_fraction"] = (
+        round(1 - stats["unique_length"] / stats["total_length"], 4) if stats["total_length"] else 0
+    )
+
+    with open(prefix + ".dedup_stats.tsv", "w") as f:
+        f.write("\t".join(stats_cols) + "\n")
+        f.write("\t".join(str(stats[col]) for col in stats_cols) + "\n")
+
+    print(
+        "{unique} of {contigs} contigs ({unique_length} of {total_length} bp) are distinct, ratio {ratio}".format(
+            unique=stats["unique_contigs"],
+            contigs=stats["contigs"],
+            unique_length=stats["unique_length"],
+            total_length=stats["total_length"],
+            ratio=stats["dedup_ratio"],
+        )
+    )
+
+
+def read_sample_map(path, sample):
+    """
+    Return [(contig, header, unique ID, batch)] of one sample, in the order of its FASTA file.
+    """
+    contigs = []
+    with open(path) as f:
+        next(f)
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if fields[0] == sample:
+                contigs.append(tuple(fields[1:]))
+    return contigs
+
+
+def batch_of(path, batches):
+    """
+    Batch an annotation file belongs to, annotation files are named `<batch>.<extension>`.
+    """
+    name = os.path.basename(path)
+    for batch in batches:
+        if name.startswith(batch + "."):
+            return batch
+    return None
+
+
+def gene_blocks(paths, batches, needed):
+    """
+    Collect the FAA/FNA records of the needed distinct contigs, genes are named `<contig>_<n>`.
+    """
+    blocks = defaultdict(list)
+    for path in paths:
+        if batch_of(path, batches) is None:
+            continue
+        keep = False
+        with open_file(path, "rt") as f:
+            for line in f:
+                if line.startswith(">"):
+                    contig = line[1:].split(maxsplit=1)[0].rsplit("_", 1)[0]
+                    keep = contig in needed
+                if keep:
+                    blocks[contig].append(line)
+    return blocks
+
+
+def gff_blocks(paths, batches, needed):
+    """
+    Collect the GFF lines of the needed distinct contigs. Prodigal's `# Sequence Data`
+    line starts the block of a contig, its `# Model Data` line and features follow.
+
+    Returns the `##gff-version` line, whether it is repeated for every contig (as
+    Pyrodigal does) rather than written once per file, and the blocks.
+    """
+    blocks = defaultdict(list)
+    version = "##gff-version  3\n"
+    versions = 0
+    sequences = 0
+    for path in paths:
+        if batch_of(path, batches) is None:
+            continue
+        contig = None
+        with open_file(path, "rt") as f:
+            for line in f:
+                if line.startswith("##gff-version"):
+                    version = line
+                    versions += 1
+                    continue
+                if line.startswith("# Sequence Data:"):
+                    match = re.search(r'seqhdr="([^"\s]*)', line)
+                    contig = match.group(1) if match else None
+                    sequences += 1
+                elif not line.startswith("#") and line.strip():
+                    contig = line.split("\t", 1)[0]
+                if contig in needed:
+                    blocks[contig].append(line)
+    return version, versions > 1 and versions >= sequences, blocks
+
+
+def rename(line, unique, contig, header, ordinal):
+    """
+    Give a line of a distinct contig the ID, header and ordinal of the sample contig.
+    """
+    # Ordinals first, as the sample contig ID may itself look like an ordinal
+    line = re.sub(r"seqnum=\d+", "seqnum={n}".format(n=ordinal), line)
+    line = re.sub(r"ID=\d+_(\d+)", lambda m: "ID={n}_{gene}".format(n=ordinal, gene=m.group(1)), line)
+    line = re.sub(r'seqhdr="[^"]*"', lambda m: 'seqhdr="{header}"'.format(header=header), line)
+    return line.replace(unique, contig)
+
+
+def gzip_writer(path):
+    # Equivalent to `pigz -nm`, as used by the annotation modules
+    return gzip.GzipFile(filename="", mode="wb", fileobj=open(path, "wb"), mtime=0)
+
+
+def fanout(contig_map, sample, faa, fna, gff, prefix, full_header=False):
+    contigs = read_sample_map(contig_map, sample)
+    if not contigs:
+        sys.exit("Sample {sample} not found in {contig_map}".format(sample=sample, contig_map=contig_map))
+    needed = set(c[2] for c in contigs)
+    batches = sorted(set(c[3] for c in contigs))
+
+    outputs = [(faa, ".faa.gz"), (fna, ".fna.gz"), (gff, ".gff.gz")]
+    for paths, extension in outputs:
+        if not paths:
+            continue
+        if extension == ".gff.gz":
+            version, per_contig, blocks = gff_blocks(paths, batches, needed)
+        else:
+            version, per_contig, blocks = None, False, gene_blocks(paths, batches, needed)
+
+        out = gzip_writer(prefix + extension)
+        try:
+            if version is not None and not per_contig:
+                out.write(version.encode())
+            for ordinal, (contig, header, unique, _) in enumerate(contigs, start=1):
+                if per_contig:
+                    out.write(version.encode())
+                for line in blocks.get(unique, []):
+                    out.write(rename(line, unique, contig, header if full_header else contig, ordinal).encode())
+        finally:
+            fileobj = out.fileobj
+            out.close()
+            fileobj.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="contig_dedup", description="Annotate contigs shared between samples once and fan the results out."
+    )
+    parser.add_argument("-v", "--version", help="show version number and exit", action="store_true")
+    subparsers = parser.add_subparsers(dest="command")
+
+    dedup_parser = subparsers.add_parser("dedup", help="write the distinct contigs of all samples to batches")
+    dedup_parser.add_argument(
+        "-i", "--fasta", metavar="PATH", nargs="+", required=True, help="FASTA files, may be gzipped"
+    )
+    dedup_parser.add_argument(
+        "-s", "--samples", metavar="NAME", nargs="+", required=True, help="sample names, in the order of --fasta"
+    )
+    dedup_parser.add_argument(
+        "-b",
+        "--batch_size",
+        metavar="INT",
+        type=int,
+        default=50000000,
+        help="base pairs of distinct contigs per batch (default: 50000000)",
+    )
+    dedup_parser.add_argument("-o", "--prefix", metavar="PREFIX", default="dedup", help="prefix of the outputs")
+
+    fanout_parser = subparsers.add_parser("fanout", help="write the annotation of the batches back per sample")
+    fanout_parser.add_argument("-m", "--map", metavar="PATH", required=True, help="contig map written by dedup")
+    fanout_parser.add_argument("-s", "--sample", metavar="NAME", required=True, help="sample to write")
+    fanout_parser.add_argument(
+        "-a", "--faa", metavar="PATH", nargs="*", default=[], help="protein FASTA of the batches"
+    )
+    fanout_parser.add_argument("-n", "--fna", metavar="PATH", nargs="*", default=[], help="gene FASTA of the batches")
+    fanout_parser.add_argument("-g", "--gff", metavar="PATH", nargs="*", default=[], help="GFF of the batches")
+    fanout_parser.add_argument("-o", "--prefix", metavar="PREFIX", required=True, help="prefix of the outputs")
+    fanout_parser.add_argument(
+        "-f",
+        "--full_header",
+        action="store_true",
+        help="write the full FASTA header as GFF seqhdr, as Prodigal does (Pyrodigal writes the contig ID)",
+    )
+
+    args = parser.parse_args()
+
+    if args.version:
+        print("contig_dedup {version}".format(version=tool_version))
+        sys.exit(0)
+
+    if args.command == "dedup":
+        if len(args.fasta) != len(args.samples):
+            parser.error("--fasta and --samples must have the same number of values")
+        if len(set(args.samples)) != len(args.samples):
+            parser.error("sample names must be unique")
+        dedup(args.samples, args.fasta, args.batch_size, args.prefix)
+    elif args.command == "fanout":
+        fanout(args.map, args.sample, args.faa, args.fna, args.gff, args.prefix, args.full_header)
+    else:
+        parser.error("a command (dedup or fanout) is required")
+
+
+if __name__ == "__main__":
+    main()
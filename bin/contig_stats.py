@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+# Written by the nf-core/funcscan team, released under the MIT license.
+
+"""
+Compute contig length statistics of a (gzipped) FASTA file in a single
+streaming pass: number of contigs, total length, longest contig, N50 and a
+length histogram.
+
+Optionally, contigs shorter than a minimum length are dropped in the same pass
+and the remaining contigs are written to an uncompressed FASTA file. Statistics
+then describe the remaining contigs, the histogram always covers all input
+contigs.
+"""
+
+import argparse
+import gzip
+import os
+import sys
+from collections import Counter
+
+tool_version = "1.1.0"
+
+# Upper bounds (inclusive) of the length histogram bins, the last bin is open
+histogram_bins = [500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 500000, 1000000]
+
+stats_cols = [
+    "sample",
+    "contigs",
+    "total_length",
+    "longest_contig",
+    "n50",
+    "min_length",
+    "dropped_contigs",
+    "dropped_length",
+]
+
+
+def open_fasta(path):
+    """
+    Open plain or gzipped FASTA in binary mode, detected by magic bytes rather than file extension.
+    """
+    if path == "-":
+        return sys.stdin.buffer
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def contig_lengths(fasta, min_length=0, out=None):
+    """
+    Yield the length of every record of an open FASTA file.
+
+    If `out` is given, records of at least `min_length` bp are copied to it. Only
+    the record being read is held in memory.
+    """
+    length = None
+    record = []
+    for line in fasta:
+        if line.startswith(b">"):
+            if length is not None:
+                if out is not None and length >= min_length:
+                    out.writelines(record)
+                yield length
+            length = 0
+            record = []
+        elif length is not None:
+            length += len(line.rstrip())
+        if out is not None:
+            record.append(line)
+    if length is not None:
+        if out is not None and length >= min_length:
+            out.writelines(record)
+        yield length
+
+
+def compute_stats(lengths, min_length=0):
+    """
+    Aggregate contig lengths into summary statistics of the contigs of at least
+    `min_length` bp and a length histogram of all contigs.
+
+    Lengths are only kept as a length -> count tally, so memory is bounded by the
+    number of distinct contig lengths rather than the number of contigs.
+    """
+    all_lengths = Counter(lengths)
+    tally = Counter({length: count for length, count in all_lengths.items() if length >= min_length})
+
+    contigs = sum(tally.values())
+    total_length = sum(length * count for length, count in tally.items())
+
+    n50 = 0
+    cumulative = 0
+    for length in sorted(tally, reverse=True):
+        cumulative += length * tally[length]
+        if cumulative * 2 >= total_length:
+            n50 = length
+            break
+
+    histogram = Counter()
+    for length, count in all_lengths.items():
+        for upper in histogram_bins:
+            if length <= upper:
+                histogram[upper] += count
+                break
+        else:
+            histogram[None] += count
+
+    return {
+        "contigs": contigs,
+        "total_length": total_length,
+        "longest_contig": max(tally, default=0),
+        "n50": n50,
+        "min_length": min_length,
+        "dropped_contigs": sum(all_lengths.values()) - contigs,
+        "dropped_length": sum(length * count for length, count in all_lengths.items()) - total_length,
+    }, histogram
+
+
+def write_stats(sample, stats, histogram, prefix):
+    with open(prefix + ".contig_stats.tsv", "w") as out:
+        out.write("\t".join(stats_cols) + "\n")
+        out.write("\t".join(str(stats[col]) if col != "sample" else sample for col in stats_cols) + "\n")
+
+    with open(prefix + ".contig_length_histogram.tsv", "w") as out:
+        out.write("sample\tmin_length\tmax_length\tcontigs\n")
+        lower = 0
+        for upper in histogram_bins + [None]:
+            out.write(
+                "\t".join([sample, str(lower), "NA" if upper is None else str(upper), str(histogram[upper])]) + "\n"
+            )
+            lower = (upper or 0) + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="contig_stats", description="Single-pass contig length statistics of a (gzipped) FASTA file."
+    )
+    parser.add_argument(
+        "-i", "--input", metavar="PATH", dest="input", help="input FASTA, may be gzipped ('-' for stdin)"
+    )
+    parser.add_argument("-s", "--sample", metavar="NAME", dest="sample", help="sample name written to the output")
+    parser.add_argument("-o", "--prefix", metavar="PREFIX", dest="prefix", help="prefix of the output files")
+    parser.add_argument(
+        "-m",
+        "--min_length",
+        metavar="INT",
+        dest="min_length",
+        type=int,
+        default=0,
+        help="drop contigs shorter than this length (default: 0, keep all contigs)",
+    )
+    parser.add_argument(
+        "-f",
+        "--filtered",
+        metavar="PATH",
+        dest="filtered",
+        help="write the contigs passing --min_length to this uncompressed FASTA file",
+    )
+    parser.add_argument("-v", "--version", help="show version number and exit", action="store_true")
+    args = parser.parse_args()
+
+    if args.version:
+        print("contig_stats {version}".format(version=tool_version))
+        sys.exit(0)
+
+    if not (args.input and args.sample and args.prefix):
+        parser.error("--input, --sample and --prefix are required")
+
+    if args.filtered:
+        if os.path.dirname(args.filtered):
+            os.makedirs(os.path.dirname(args.filtered), exist_ok=True)
+        with open_fasta(args.input) as fasta, open(args.filtered, "wb") as out:
+            stats, histogram = compute_stats(contig_lengths(fasta, args.min_length, out), args.min_length)
+    else:
+        with open_fasta(args.input) as fasta:
+            stats, histogram = compute_stats(contig_lengths(fasta), args.min_length)
+
+    if stats["dropped_contigs"]:
+        print(
+            "Dropped {dropped} of {total} contigs ({length} bp) shorter than {min_length} bp".format(
+                dropped=stats["dropped_contigs"],
+                total=stats["contigs"] + stats["dropped_contigs"],
+                length=stats["dropped_length"],
+                min_length=args.min_length,
+            )
+        )
+
+    write_stats(args.sample, stats, histogram, args.prefix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,549 @@
+#!/usr/bin/env python3
+
+# Written by the nf-core/funcscan team, released under the MIT license.
+
+"""
+Fetch the reference databases of nf-core/funcscan once into a local store.
+
+Without local database paths, every run of the pipeline downloads the AMRFinderPlus,
+DeepARG, DeepBGC, Bakta, antiSMASH and DRAMP databases again. `fetch` downloads
+them once, in parallel, with the download commands of the tools themselves (run
+directly or in the containers of the pipeline modules) and with HTTP downloads
+that are verified against their SHA-256 checksum where one is given. How every
+database is obtained is described in a manifest, by default
+`assets/databases.json` of the pipeline.
+
+Every database is stored in `<store>/objects/<digest>`, named by the SHA-256
+digest of its content (file paths, contents and symbolic links), so that the
+same content is stored once and changes are detected by `verify`. The lockfile
+`<store>/funcscan-db.lock` records the version, digest, sources and fetch date
+of every database and the pipeline parameters (e.g. `--arg_amrfinderplus_db`)
+that it provides. The pipeline reads the lockfile when run with
+`--database_store <store>`, for every database parameter that is not given,
+and `resolve` writes these parameters as a params file for `-params-file`.
+`gc` removes objects that are no longer in the lockfile.
+"""
+
+import argparse
+import concurrent.futures
+import contextlib
+import datetime
+import fcntl
+import fnmatch
+import gzip
+import hashlib
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import urllib.request
+import zipfile
+
+tool_version = "1.0.0"
+
+lock_name = "funcscan-db.lock"
+lock_format = 1
+
+default_manifest = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "assets", "databases.json")
+
+chunk_size = 1024 * 1024
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def read_manifest(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def spec_digest(entry):
+    """
+    Digest of the manifest entry of a database, a database is fetched again when its entry changes.
+    """
+    return hashlib.sha256(json.dumps(entry, sort_keys=True).encode()).hexdigest()
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tree_digest(root):
+    """
+    SHA-256 digest of a directory: relative paths, file contents, executable bits and symbolic link targets.
+    """
+    digest = hashlib.sha256()
+    for directory, dirs, files in os.walk(root):
+        dirs.sort()
+        for name in sorted(dirs + files):
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root)
+            if os.path.islink(path):
+                digest.update("L\0{path}\0{target}\0".format(path=relative, target=os.readlink(path)).encode())
+            elif os.path.isdir(path):
+                digest.update("D\0{path}\0".format(path=relative).encode())
+            else:
+                executable = "x" if os.access(path, os.X_OK) else "-"
+                digest.update(
+                    "F\0{path}\0{x}\0{content}\0".format(
+                        path=relative, x=executable, content=file_digest(path)
+                    ).encode()
+                )
+        # Symbolic links to directories are recorded above and not followed
+        dirs[:] = [name for name in dirs if not os.path.islink(os.path.join(directory, name))]
+    return digest.hexdigest()
+
+
+class Store:
+    """
+    Content-addressed database store with a lockfile.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.objects = os.path.join(self.root, "objects")
+        self.tmp = os.path.join(self.root, "tmp")
+        self.lock_path = os.path.join(self.root, lock_name)
+        for directory in (self.objects, self.tmp):
+            os.makedirs(directory, exist_ok=True)
+
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        Exclusive access to the lockfile and objects, between processes sharing the store.
+        """
+        with open(os.path.join(self.root, ".mutex"), "w") as mutex:
+            fcntl.flock(mutex, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(mutex, fcntl.LOCK_UN)
+
+    def read_lock(self):
+        if not os.path.exists(self.lock_path):
+            return {"format": lock_format, "databases": {}}
+        with open(self.lock_path) as f:
+            lock = json.load(f)
+        if lock.get("format") != lock_format:
+            sys.exit("Unsupported lockfile format in {path}".format(path=self.lock_path))
+        return lock
+
+    def write_lock(self, lock):
+        handle, path = tempfile.mkstemp(dir=self.root, prefix=".lock.")
+        with os.fdopen(handle, "w") as f:
+            json.dump(lock, f, indent=4, sort_keys=True)
+            f.write("\n")
+        os.replace(path, self.lock_path)
+
+    def object_path(self, digest):
+        return os.path.join(self.objects, digest)
+
+    def add_object(self, staged):
+        """
+        Move a staged database into the store under its digest, or drop it if the same content is stored already.
+        """
+        digest = tree_digest(staged)
+        target = self.object_path(digest)
+        with self.locked():
+            if os.path.exists(target):
+                shutil.rmtree(staged)
+            else:
+                os.rename(staged, target)
+        return digest
+
+
+def download(url, path, sha256=None, retries=3):
+    """
+    Download url to path, verifying the SHA-256 checksum if given.
+    """
+    for attempt in range(1, retries + 1):
+        try:
+            digest = hashlib.sha256()
+            with urllib.request.urlopen(url, timeout=600) as response, open(path, "wb") as out:
+                for chunk in iter(lambda: response.read(chunk_size), b""):
+                    digest.update(chunk)
+                    out.write(chunk)
+            break
+        except OSError as error:
+            if attempt == retries:
+                raise RuntimeError("Download of {url} failed: {error}".format(url=url, error=error))
+            log("Download of {url} failed ({error}), retrying".format(url=url, error=error))
+            time.sleep(2**attempt)
+    if sha256 and digest.hexdigest() != sha256:
+        raise RuntimeError(
+            "Checksum of {url} is {found}, expected {expected}".format(
+                url=url, found=digest.hexdigest(), expected=sha256
+            )
+        )
+    return digest.hexdigest()
+
+
+def single_top_directory(names):
+    """
+    Name of the only top-level directory of archive members, or None.
+    """
+    tops = {name.strip("/").split("/")[0] for name in names if name.strip("/")}
+    if len(tops) == 1 and any("/" in name.strip("/") for name in names):
+        return tops.pop()
+    return None
+
+
+def safe_member(name, dest):
+    target = os.path.realpath(os.path.join(dest, name))
+    return target == os.path.realpath(dest) or target.startswith(os.path.realpath(dest) + os.sep)
+
+
+def unpack(archive, dest, kind, name):
+    """
+    Unpack an archive into dest. As the UNTAR module, a single top-level directory of the archive is stripped.
+    """
+    os.makedirs(dest, exist_ok=True)
+    if kind == "tar":
+        with tarfile.open(archive) as tar:
+            members = tar.getmembers()
+            top = single_top_directory([member.name for member in members])
+            for member in members:
+                if top:
+                    member.name = os.path.relpath(member.name.strip("/"), top)
+                    if member.name == ".":
+                        continue
+                if not safe_member(member.name, dest) or member.islnk() and not safe_member(member.linkname, dest):
+                    raise RuntimeError("Unsafe path in {archive}: {name}".format(archive=archive, name=member.name))
+                tar.extract(member, dest)
+    elif kind == "zip":
+        with zipfile.ZipFile(archive) as archive_zip:
+            top = single_top_directory(archive_zip.namelist())
+            for info in archive_zip.infolist():
+                target = os.path.relpath(info.filename.strip("/"), top) if top else info.filename
+                if target == ".":
+                    continue
+                if not safe_member(target, dest):
+                    raise RuntimeError("Unsafe path in {archive}: {name}".format(archive=archive, name=info.filename))
+                if info.is_dir():
+                    os.makedirs(os.path.join(dest, target), exist_ok=True)
+                    continue
+                os.makedirs(os.path.dirname(os.path.join(dest, target)), exist_ok=True)
+                with archive_zip.open(info) as source, open(os.path.join(dest, target), "wb") as out:
+                    shutil.copyfileobj(source, out, chunk_size)
+    elif kind == "gunzip":
+        with gzip.open(archive, "rb") as source, open(os.path.join(dest, name[: -len(".gz")]), "wb") as out:
+            shutil.copyfileobj(source, out, chunk_size)
+    else:
+        shutil.move(archive, os.path.join(dest, name))
+
+
+def run_command(command, engine, container, workdir, mounts):
+    """
+    Run a download command directly or in the container of the tool, with the work directory and mounts bound.
+    """
+    if engine == "none":
+        if mounts:
+            log(
+                "Mounts are only used with a container engine, the local installation must provide: "
+                + ", ".join(mounts)
+            )
+        args = ["bash", "-c", command]
+    elif engine == "docker":
+        args = ["docker", "run", "--rm", "-u", "{uid}:{gid}".format(uid=os.getuid(), gid=os.getgid())]
+        for source, target in [(workdir, workdir)] + list(mounts.items()):
+            args += ["-v", "{source}:{target}".format(source=source, target=target)]
+        args += ["-w", workdir, "-e", "HOME=" + workdir, container, "bash", "-c", command]
+    else:
+        binds = ",".join(
+            "{source}:{target}".format(source=s, target=t) for s, t in [(workdir, workdir)] + list(mounts.items())
+        )
+        args = [engine, "exec", "-B", binds, "--pwd", workdir, "docker://" + container, "bash", "-c", command]
+    result = subprocess.run(args, cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(
+            "Command failed with exit code {code}: {command}\n{output}".format(
+                code=result.returncode, command=" ".join(shlex.quote(arg) for arg in args), output=result.stdout[-5000:]
+            )
+        )
+
+
+def resolve_params(entry, out):
+    """
+    Paths of the pipeline parameters within a fetched database, patterns such as `db*` resolved to one entry.
+    """
+    resolved = {}
+    for param, pattern in entry.get("params", {}).items():
+        if pattern == ".":
+            resolved[param] = "."
+            continue
+        matches = sorted(name for name in os.listdir(out) if fnmatch.fnmatch(name, pattern))
+        if len(matches) != 1:
+            raise RuntimeError(
+                "Expected one entry matching {pattern} for --{param}, found: {found}".format(
+                    pattern=pattern, param=param, found=", ".join(matches) or "none"
+                )
+            )
+        resolved[param] = matches[0]
+    return resolved
+
+
+def fetch_database(store, name, entry, engine):
+    """
+    Fetch one database into the store, return its lockfile entry.
+    """
+    started = time.time()
+    workdir = tempfile.mkdtemp(dir=store.tmp, prefix=name + ".")
+    try:
+        tmp = os.path.join(workdir, "tmp")
+        out = os.path.join(workdir, "out")
+        os.makedirs(tmp)
+        os.makedirs(out)
+        # Without a command, the downloads are the database
+        download_root = tmp if entry.get("command") else out
+
+        downloads = []
+        for item in entry.get("downloads", []):
+            file_name = os.path.basename(item["url"].split("?")[0])
+            archive = os.path.join(tmp, "." + file_name)
+            log("{name}: downloading {url}".format(name=name, url=item["url"]))
+            checksum = download(item["url"], archive, item.get("sha256"))
+            unpack(archive, os.path.join(download_root, item.get("dest", "")), item.get("unpack", "none"), file_name)
+            if os.path.exists(archive):
+                os.remove(archive)
+            downloads.append({"url": item["url"], "sha256": checksum})
+
+        if entry.get("command"):
+            fields = {"tmp": tmp, "out": out, "bin": os.path.dirname(os.path.abspath(__file__))}
+            mounts = {os.path.join(tmp, source): target for source, target in entry.get("mounts", {}).items()}
+            log("{name}: running {command}".format(name=name, command=entry["command"].format(**fields)))
+            run_command(entry["command"].format(**fields), engine, entry.get("container"), workdir, mounts)
+
+        params = resolve_params(entry, out)
+        digest = store.add_object(out)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    log("{name}: stored as {digest} in {seconds:.0f} s".format(name=name, digest=digest, seconds=time.time() - started))
+    return {
+        "version": entry.get("version"),
+        "spec": spec_digest(entry),
+        "digest": "sha256:" + digest,
+        "path": os.path.join("objects", digest),
+        "params": params,
+        "downloads": downloads,
+        "fetched": datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+def is_current(store, lock, name, entry):
+    locked = lock["databases"].get(name)
+    return (
+        locked is not None
+        and locked["spec"] == spec_digest(entry)
+        and os.path.isdir(os.path.join(store.root, locked["path"]))
+    )
+
+
+def fetch(store, manifest, names, jobs, engine, update):
+    unknown = [name for name in names if name not in manifest]
+    if unknown:
+        sys.exit("Unknown databases: {names}, see `list`".format(names=", ".join(unknown)))
+    providers = {}
+    for name in names:
+        for param in manifest[name].get("params", {}):
+            providers.setdefault(param, []).append(name)
+    conflicts = {param: found for param, found in providers.items() if len(found) > 1}
+    if conflicts:
+        sys.exit(
+            "Databases provide the same parameter: "
+            + "; ".join("--{param}: {names}".format(param=p, names=", ".join(n)) for p, n in conflicts.items())
+        )
+
+    lock = store.read_lock()
+    todo = [name for name in names if update or not is_current(store, lock, name, manifest[name])]
+    for name in sorted(set(names) - set(todo)):
+        log("{name}: up to date ({digest})".format(name=name, digest=lock["databases"][name]["digest"]))
+
+    fetched, failed = {}, {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(fetch_database, store, name, manifest[name], engine): name for name in todo}
+        for future in concurrent.futures.as_completed(futures):
+            name = futures[future]
+            try:
+                fetched[name] = future.result()
+            except Exception as error:
+                failed[name] = error
+                log("{name}: failed: {error}".format(name=name, error=error))
+
+    with store.locked():
+        lock = store.read_lock()
+        for name, locked in fetched.items():
+            # A parameter is provided by one database, e.g. bakta or bakta-light
+            for other in list(lock["databases"]):
+                if other != name and set(lock["databases"][other]["params"]) & set(locked["params"]):
+                    log("{name} replaces {other} in the lockfile".format(name=name, other=other))
+                    del lock["databases"][other]
+            lock["databases"][name] = locked
+        store.write_lock(lock)
+
+    if failed:
+        sys.exit("Failed to fetch: {names}".format(names=", ".join(sorted(failed))))
+
+
+def verify(store, jobs):
+    lock = store.read_lock()
+
+    def check(item):
+        name, locked = item
+        path = os.path.join(store.root, locked["path"])
+        if not os.path.isdir(path):
+            return name, "missing"
+        found = "sha256:" + tree_digest(path)
+        return name, "ok" if found == locked["digest"] else "modified ({found})".format(found=found)
+
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+        for name, status in pool.map(check, sorted(lock["databases"].items())):
+            print("{name}\t{status}".format(name=name, status=status))
+            if status != "ok":
+                failed.append(name)
+    if failed:
+        sys.exit("Databases failed verification: {names}".format(names=", ".join(failed)))
+
+
+def resolve(store, output):
+    lock = store.read_lock()
+    params = {}
+    for name, locked in sorted(lock["databases"].items()):
+        for param, relative in locked["params"].items():
+            params[param] = os.path.normpath(os.path.join(store.root, locked["path"], relative))
+    text = json.dumps(params, indent=4, sort_keys=True) + "\n"
+    if output == "-":
+        sys.stdout.write(text)
+    else:
+        with open(output, "w") as f:
+            f.write(text)
+
+
+def list_databases(store, manifest):
+    lock = store.read_lock() if store else {"databases": {}}
+    print("\t".join(["name", "version", "status", "digest", "fetched", "params"]))
+    for name in sorted(set(manifest) | set(lock["databases"])):
+        locked = lock["databases"].get(name)
+        if name not in manifest:
+            status = "not in manifest"
+        elif locked is None:
+            status = "not fetched"
+        elif is_current(store, lock, name, manifest[name]):
+            status = "current"
+        else:
+            status = "outdated"
+        params = (locked or {}).get("params") or manifest.get(name, {}).get("params", {})
+        print(
+            "\t".join(
+                [
+                    name,
+                    str((locked or manifest.get(name, {})).get("version")),
+                    status,
+                    (locked or {}).get("digest", "-"),
+                    (locked or {}).get("fetched", "-"),
+                    ",".join(sorted(params)),
+                ]
+            )
+        )
+
+
+def gc(store):
+    with store.locked():
+        lock = store.read_lock()
+        used = {os.path.basename(locked["path"]) for locked in lock["databases"].values()}
+        for name in sorted(os.listdir(store.objects)):
+            if name not in used:
+                log("Removing unused object {name}".format(name=name))
+                shutil.rmtree(os.path.join(store.objects, name))
+        for name in os.listdir(store.tmp):
+            shutil.rmtree(os.path.join(store.tmp, name), ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="funcscan-db", description="Fetch the reference databases of nf-core/funcscan once into a local store."
+    )
+    parser.add_argument("-v", "--version", help="show version number and exit", action="store_true")
+    subparsers = parser.add_subparsers(dest="command")
+
+    def add_store(subparser, required=True):
+        subparser.add_argument("-s", "--store", metavar="PATH", required=required, help="store directory")
+
+    def add_manifest(subparser):
+        subparser.add_argument(
+            "-m",
+            "--manifest",
+            metavar="PATH",
+            default=default_manifest,
+            help="database manifest (default: %(default)s)",
+        )
+
+    list_parser = subparsers.add_parser("list", help="list the databases of the manifest and their status")
+    add_store(list_parser, required=False)
+    add_manifest(list_parser)
+
+    fetch_parser = subparsers.add_parser("fetch", help="fetch databases into the store")
+    add_store(fetch_parser)
+    add_manifest(fetch_parser)
+    fetch_parser.add_argument("databases", metavar="NAME", nargs="+", help="databases to fetch, see `list`")
+    fetch_parser.add_argument(
+        "-j", "--jobs", metavar="INT", type=int, default=4, help="databases fetched in parallel (default: 4)"
+    )
+    fetch_parser.add_argument(
+        "-e",
+        "--engine",
+        choices=["none", "docker", "singularity", "apptainer"],
+        default="none",
+        help="run the download commands directly (none) or in the tool containers (default: none)",
+    )
+    fetch_parser.add_argument(
+        "-u", "--update", action="store_true", help="fetch again even if the database is up to date"
+    )
+
+    verify_parser = subparsers.add_parser("verify", help="check the content of the databases against the lockfile")
+    add_store(verify_parser)
+    verify_parser.add_argument("-j", "--jobs", metavar="INT", type=int, default=4, help="databases checked in parallel")
+
+    resolve_parser = subparsers.add_parser("resolve", help="write the database parameters as a params file")
+    add_store(resolve_parser)
+    resolve_parser.add_argument("-o", "--output", metavar="PATH", default="-", help="params file (default: stdout)")
+
+    gc_parser = subparsers.add_parser("gc", help="remove objects that are not in the lockfile")
+    add_store(gc_parser)
+
+    args = parser.parse_args()
+
+    if args.version:
+        print("funcscan-db {version}".format(version=tool_version))
+        sys.exit(0)
+    if args.command is None:
+        parser.error("a command (list, fetch, verify, resolve or gc) is required")
+    if getattr(args, "jobs", 1) < 1:
+        parser.error("--jobs must be at least 1")
+
+    store = Store(args.store) if args.store else None
+    if args.command == "list":
+        list_databases(store, read_manifest(args.manifest))
+    elif args.command == "fetch":
+        fetch(store, read_manifest(args.manifest), args.databases, args.jobs, args.engine, args.update)
+    elif args.command == "verify":
+        verify(store, args.jobs)
+    elif args.command == "resolve":
+        resolve(store, args.output)
+    else:
+        gc(store)
+
+
+if __name__ == "__main__":
+    main()
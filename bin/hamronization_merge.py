@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+
+# Written by the nf-core/funcscan team, released under the MIT license.
+
+"""
+Merge hAMRonization reports into one summary with bounded memory.
+
+Does the same as `hamronize summarize` for the tsv and json formats: reports
+(JSON or TSV, as written by `hamronize <tool>`) are combined into one table with
+the hAMRonization columns, exact duplicate records are removed and records are
+sorted by input file name, tool and database name and version and gene symbol.
+Unlike `hamronize summarize`, reports are parsed by a process pool and never all
+held in memory: parsed records are buffered up to `--buffer_rows`, spilled as
+sorted runs to a temporary directory and combined by a k-way merge while the
+output is written.
+
+Output formats are tsv, json (one array of records), jsonl (one record per
+line) and parquet (requires pyarrow). With `--append`, the records of an
+existing summary in any of these formats are merged with the new reports;
+records of input files that also occur in the new reports are replaced.
+"""
+
+import argparse
+import csv
+import gzip
+import heapq
+import json
+import os
+import sys
+import tempfile
+from itertools import islice
+from multiprocessing import Pool
+
+tool_version = "1.0.0"
+
+# Fields of hAMRonizedResult (hAMRonization 1.1.1) in output order, with their types
+hamronization_fields = [
+    ("input_file_name", str),
+    ("gene_symbol", str),
+    ("gene_name", str),
+    ("reference_database_name", str),
+    ("reference_database_version", str),
+    ("reference_accession", str),
+    ("analysis_software_name", str),
+    ("analysis_software_version", str),
+    ("genetic_variation_type", str),
+    ("antimicrobial_agent", str),
+    ("coverage_percentage", float),
+    ("coverage_depth", float),
+    ("coverage_ratio", float),
+    ("drug_class", str),
+    ("input_gene_length", int),
+    ("input_gene_start", int),
+    ("input_gene_stop", int),
+    ("input_protein_length", int),
+    ("input_protein_start", int),
+    ("input_protein_stop", int),
+    ("input_sequence_id", str),
+    ("nucleotide_mutation", str),
+    ("nucleotide_mutation_interpretation", str),
+    ("predicted_phenotype", str),
+    ("predicted_phenotype_confidence_level", str),
+    ("amino_acid_mutation", str),
+    ("amino_acid_mutation_interpretation", str),
+    ("reference_gene_length", int),
+    ("reference_gene_start", int),
+    ("reference_gene_stop", int),
+    ("reference_protein_length", int),
+    ("reference_protein_start", int),
+    ("reference_protein_stop", int),
+    ("resistance_mechanism", str),
+    ("strand_orientation", str),
+    ("sequence_identity", float),
+]
+field_names = [name for name, _ in hamronization_fields]
+field_types = [kind for _, kind in hamronization_fields]
+
+# Sort order of `hamronize summarize`
+sort_fields = [
+    "input_file_name",
+    "analysis_software_name",
+    "analysis_software_version",
+    "reference_database_name",
+    "reference_database_version",
+    "gene_symbol",
+]
+sort_index = [field_names.index(name) for name in sort_fields]
+
+output_formats = ["tsv", "json", "jsonl", "parquet"]
+merge_fan_in = 256
+missing_values = {"", "NA", "NaN", "nan", "None"}
+
+
+def open_file(path, mode="rt"):
+    """
+    Open a plain or gzipped file, detected by magic bytes rather than file extension.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def typed(value, kind):
+    """
+    Value of a field in the type of hAMRonizedResult, None if missing. Unparseable numbers are kept as strings.
+    """
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, str):
+        if value in missing_values:
+            return None
+        if kind is str:
+            return value
+    try:
+        if kind is int:
+            return int(float(value))
+        return kind(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def to_row(record):
+    return [typed(record.get(name), kind) for name, kind in hamronization_fields]
+
+
+def sort_key(row):
+    # Missing values last, as pandas sorts NaN
+    return tuple((row[i] is None, "" if row[i] is None else str(row[i])) for i in sort_index)
+
+
+def report_type(path):
+    """
+    json, tsv or None for an empty report, as `hamronize summarize` detects it.
+    """
+    with open_file(path) as f:
+        first = f.read(1)
+        if first in ("{", "["):
+            return "json"
+        f.seek(0)
+        reader = csv.reader(f, delimiter="\t")
+        try:
+            if len(next(reader)) == len(next(reader)) > 1:
+                return "tsv"
+        except StopIteration:
+            return None
+    return "tsv"
+
+
+def read_records(path, kind=None):
+    """
+    Yield the records of a hAMRonization report or summary (json, jsonl, tsv or parquet) as dicts.
+    """
+    if kind is None:
+        kind = "parquet" if path.endswith(".parquet") else report_type(path)
+    if kind is None:
+        print("Warning: {path} report is empty".format(path=path), file=sys.stderr)
+        return
+    if kind == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+        return
+    with open_file(path) as f:
+        if kind == "tsv":
+            yield from csv.DictReader(f, delimiter="\t")
+            return
+        first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            yield from json.load(f)
+            return
+        # JSON lines, or a single record over several lines
+        try:
+            yield json.loads(f.readline())
+        except json.JSONDecodeError:
+            f.seek(0)
+            yield json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def parse_report(path):
+    """
+    Rows of one report, run in a worker process.
+    """
+    return [to_row(record) for record in read_records(path)]
+
+
+########################
+# RUNS
+########################
+
+
+class RunSpiller:
+    """
+    Buffer rows and write them as sorted runs of JSON lines to a temporary directory.
+    """
+
+    def __init__(self, tmpdir, buffer_rows):
+        self.tmpdir = tmpdir
+        self.buffer_rows = buffer_rows
+        self.buffer = []
+        self.runs = []
+        self.rows = 0
+
+    def add(self, rows):
+        self.buffer += rows
+        self.rows += len(rows)
+        if len(self.buffer) >= self.buffer_rows:
+            self.spill()
+
+    def spill(self):
+        if not self.buffer:
+            return
+        self.buffer.sort(key=sort_key)
+        path = os.path.join(self.tmpdir, "run_{n:06d}.jsonl".format(n=len(self.runs)))
+        with open(path, "w") as out:
+            for row in self.buffer:
+                out.write(json.dumps(row) + "\n")
+        self.runs.append(path)
+        self.buffer = []
+
+
+def read_run(path):
+    with open(path) as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def merge_runs(runs, tmpdir):
+    """
+    Yield the rows of all runs in sort order, merging in rounds if there are more runs than merge_fan_in.
+    """
+    merge_round = 0
+    while len(runs) > merge_fan_in:
+        merge_round += 1
+        merged = []
+        for i in range(0, len(runs), merge_fan_in):
+            path = os.path.join(tmpdir, "merged_{r}_{n:06d}.jsonl".format(r=merge_round, n=len(merged)))
+            with open(path, "w") as out:
+                for row in heapq.merge(*[read_run(run) for run in runs[i : i + merge_fan_in]], key=sort_key):
+                    out.write(json.dumps(row) + "\n")
+            merged.append(path)
+        for run in runs:
+            os.remove(run)
+        runs = merged
+    yield from heapq.merge(*[read_run(run) for run in runs], key=sort_key)
+
+
+def distinct(rows):
+    """
+    Drop exact duplicates. Duplicates share the sort key, so only rows of the current key are remembered.
+    """
+    current_key = None
+    seen = set()
+    for row in rows:
+        key = sort_key(row)
+        if key != current_key:
+            current_key = key
+            seen = set()
+        fingerprint = json.dumps(row)
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+        yield row
+
+
+########################
+# WRITERS
+########################
+
+
+class TsvWriter:
+    def __init__(self, path):
+        self.out = open(path, "w", newline="")
+        self.writer = csv.writer(self.out, delimiter="\t", lineterminator="\n")
+        self.writer.writerow(field_names)
+
+    def write(self, row):
+        self.writer.writerow(["" if value is None else value for value in row])
+
+    def close(self):
+        self.out.close()
+
+
+class JsonWriter:
+    def __init__(self, path):
+        self.out = open(path, "w")
+        self.out.write("[")
+        self.first = True
+
+    def write(self, row):
+        if not self.first:
+            self.out.write(",")
+        self.first = False
+        self.out.write(json.dumps(dict(zip(field_names, row))))
+
+    def close(self):
+        self.out.write("]")
+        self.out.close()
+
+
+class JsonlWriter:
+    def __init__(self, path):
+        self.out = open(path, "w")
+
+    def write(self, row):
+        self.out.write(json.dumps(dict(zip(field_names, row))) + "\n")
+
+    def close(self):
+        self.out.close()
+
+
+class ParquetWriter:
+    """
+    Write rows in row groups of `group_rows`, numeric fields typed as in hAMRonizedResult.
+    """
+
+    def __init__(self, path, group_rows=100000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("Parquet output requires pyarrow, which is not installed")
+        self.pa = pa
+        types = {str: pa.string(), int: pa.int64(), float: pa.float64()}
+        self.schema = pa.schema([(name, types[kind]) for name, kind in hamronization_fields])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.group_rows = group_rows
+        self.buffer = []
+
+    def write(self, row):
+        self.buffer.append(row)
+        if len(self.buffer) >= self.group_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        columns = list(zip(*self.buffer))
+        self.writer.write_table(self.pa.Table.from_arrays([list(column) for column in columns], schema=self.schema))
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+writers = {"tsv": TsvWriter, "json": JsonWriter, "jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+
+########################
+# MAIN
+########################
+
+
+def merge(reports, output, output_format, append, threads, buffer_rows, window):
+    spill_dir = os.path.dirname(os.path.abspath(output))
+    with tempfile.TemporaryDirectory(prefix="hamronization_merge_", dir=spill_dir) as tmpdir:
+        spiller = RunSpiller(tmpdir, buffer_rows)
+        new_inputs = set()
+
+        # Reports are handed to the pool in windows, so that finished results do not pile up
+        # in memory while the main process spills
+        with Pool(threads) as pool:
+            paths = iter(reports)
+            while True:
+                chunk = list(islice(paths, window))
+                if not chunk:
+                    break
+                for rows in pool.imap(parse_report, chunk, chunksize=max(1, len(chunk) // (threads * 4))):
+                    new_inputs.update(row[0] for row in rows)
+                    spiller.add(rows)
+
+        existing = 0
+        if append:
+            for record in read_records(append):
+                row = to_row(record)
+                if row[0] in new_inputs:
+                    continue
+                spiller.add([row])
+                existing += 1
+        spiller.spill()
+
+        # Write to a temporary file first, the existing summary may be the output itself
+        tmp_output = os.path.join(tmpdir, "summary." + output_format)
+        writer = writers[output_format](tmp_output)
+        written = 0
+        for row in distinct(merge_runs(spiller.runs, tmpdir)):
+            writer.write(row)
+            written += 1
+        writer.close()
+        os.replace(tmp_output, output)
+
+    removed = spiller.rows - written
+    if removed > 0:
+        print("Warning: {n} duplicate records removed".format(n=removed), file=sys.stderr)
+    print(
+        "Written {n} reports{append} with a combined {rows} unique results to {output}".format(
+            n=len(reports),
+            append=" and {existing} records of {path}".format(existing=existing, path=append) if append else "",
+            rows=written,
+            output=output,
+        ),
+        file=sys.stderr,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="hamronization_merge",
+        description="Merge hAMRonization reports into one summary in parallel and with bounded memory.",
+    )
+    parser.add_argument("-v", "--version", help="show version number and exit", action="store_true")
+    parser.add_argument("reports", metavar="REPORT", nargs="*", help="hAMRonization reports (json or tsv)")
+    parser.add_argument(
+        "-l", "--report_list", metavar="PATH", help="file with one report path per line, for very many reports"
+    )
+    parser.add_argument(
+        "-t", "--format", metavar="FORMAT", choices=output_formats, default="tsv", help="tsv, json, jsonl or parquet"
+    )
+    parser.add_argument("-o", "--output", metavar="PATH", required=False, help="summary to write")
+    parser.add_argument(
+        "-a",
+        "--append",
+        metavar="PATH",
+        help="existing summary to merge with the reports, records of input files in the reports are replaced",
+    )
+    parser.add_argument("-p", "--threads", metavar="INT", type=int, default=1, help="parser processes (default: 1)")
+    parser.add_argument(
+        "-b",
+        "--buffer_rows",
+        metavar="INT",
+        type=int,
+        default=500000,
+        help="records held in memory before they are spilled as a sorted run (default: 500000)",
+    )
+    parser.add_argument(
+        "-w", "--window", metavar="INT", type=int, default=1024, help="reports handed to the pool at once"
+    )
+    args = parser.parse_args()
+
+    if args.version:
+        print("hamronization_merge {version}".format(version=tool_version))
+        sys.exit(0)
+
+    reports = list(args.reports)
+    if args.report_list:
+        with open(args.report_list) as f:
+            reports += [line.strip() for line in f if line.strip()]
+    if not reports and not args.append:
+        parser.error("no reports given")
+    if not args.output:
+        parser.error("--output is required")
+    for report in reports:
+        if not os.path.exists(report):
+            sys.exit("{report} cannot be found".format(report=report))
+
+    if args.format == "parquet" or (args.append or "").endswith(".parquet"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            sys.exit("Parquet input and output require pyarrow, which is not installed")
+
+    merge(reports, args.output, args.format, args.append, args.threads, args.buffer_rows, args.window)
+
+
+if __name__ == "__main__":
+    main()
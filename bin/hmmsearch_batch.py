@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+# Written by the nf-core/funcscan team, released under the MIT license.
+
+"""
+Run one hmmsearch per sample against a whole set of HMM files instead of one
+hmmsearch per sample and HMM file.
+
+`concat` merges the HMM files into one, refusing model names that occur in
+more than one file, and writes a table mapping each model name to the ID of
+the file it came from. `split` takes the outputs of hmmsearch against the
+merged file (text output and optionally --tblout, --domtblout and -A) and
+writes them back per HMM file, named `<prefix>_<file ID>.<extension>.gz` as if
+hmmsearch had been run once per HMM file.
+"""
+
+import argparse
+import gzip
+import os
+import re
+import sys
+from collections import OrderedDict
+
+tool_version = "1.0.0"
+
+models_cols = ["name", "hmm_id", "file"]
+
+# Query name column of hmmsearch tabular outputs
+query_column = {"tbl": 2, "domtbl": 3}
+
+
+def open_file(path, mode="rt"):
+    """
+    Open a plain or gzipped file, detected by magic bytes rather than file extension.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def hmm_id(path):
+    """
+    ID of an HMM file as used for output names: the file name without `.hmm` or `.hmm.gz`.
+    """
+    name = os.path.basename(path)
+    for extension in (".hmm.gz", ".hmm"):
+        if name.endswith(extension):
+            return name[: -len(extension)]
+    return name
+
+
+def concat_models(hmm_paths, out_path, models_path):
+    """
+    Write all models of `hmm_paths` to `out_path` and the model name -> file ID table to `models_path`.
+    """
+    owners = OrderedDict()
+    collisions = []
+
+    with open(out_path, "w") as out:
+        for path in hmm_paths:
+            with open_file(path) as hmm:
+                for line in hmm:
+                    if line.startswith("NAME "):
+                        name = line.split()[1]
+                        if name in owners and owners[name][0] != hmm_id(path):
+                            collisions.append(
+                                "{name} ({first}, {second})".format(
+                                    name=name, first=owners[name][1], second=os.path.basename(path)
+                                )
+                            )
+                        owners.setdefault(name, (hmm_id(path), os.path.basename(path)))
+                    out.write(line)
+
+    if collisions:
+        sys.exit(
+            "Model names occur in more than one HMM file, results could not be assigned to a file: "
+            + ", ".join(collisions)
+        )
+
+    with open(models_path, "w") as out:
+        out.write("\t".join(models_cols) + "\n")
+        for name, (file_id, file_name) in owners.items():
+            out.write("\t".join([name, file_id, file_name]) + "\n")
+
+
+def read_models(models_path):
+    """
+    Read the model table into {model name: file ID} and {file ID: file name}.
+    """
+    models = {}
+    files = OrderedDict()
+    with open(models_path) as f:
+        next(f)
+        for line in f:
+            name, file_id, file_name = line.rstrip("\n").split("\t")
+            models[name] = file_id
+            files.setdefault(file_id, file_name)
+    return models, files
+
+
+class Outputs:
+    """
+    One gzipped output file per HMM file ID for a given file type.
+
+    Names of the batched files in comment lines are replaced by the names of the
+    per-file outputs, as they would appear in separate hmmsearch runs.
+    """
+
+    def __init__(self, prefix, extension, files, renames):
+        self.extension = extension
+        self.renames = renames
+        self.handles = OrderedDict()
+        for file_id in files:
+            path = "{prefix}_{file_id}.{extension}.gz".format(prefix=prefix, file_id=file_id, extension=extension)
+            # Equivalent to `gzip --no-name`, as used by the per-file hmmsearch module
+            self.handles[file_id] = gzip.GzipFile(filename="", mode="wb", fileobj=open(path, "wb"), mtime=0)
+
+    def write(self, file_id, line):
+        if line.startswith("#"):
+            for old, new in self.renames(file_id).items():
+                line = line.replace(old, new)
+        self.handles[file_id].write(line.encode())
+
+    def write_all(self, line):
+        for file_id in self.handles:
+            self.write(file_id, line)
+
+    def close(self):
+        for handle in self.handles.values():
+            fileobj = handle.fileobj
+            handle.close()
+            fileobj.close()
+
+
+def split_text(path, models, outputs):
+    """
+    Split the main hmmsearch output: the preamble and the closing `[ok]` go to
+    every file, each `Query:` block up to its `//` to the file of its model.
+    """
+    current = None
+    with open_file(path) as f:
+        for line in f:
+            if line.startswith("Query:"):
+                current = models[line.split()[1]]
+            if current is None:
+                outputs.write_all(line)
+            else:
+                outputs.write(current, line)
+                if line.startswith("//"):
+                    current = None
+
+
+def split_table(path, models, outputs, column):
+    """
+    Split --tblout/--domtblout output by query name, comment lines go to every file.
+    """
+    with open_file(path) as f:
+        for line in f:
+            if line.startswith("#"):
+                outputs.write_all(line)
+            else:
+                outputs.write(models[line.split()[column]], line)
+
+
+def split_alignment(path, models, outputs):
+    """
+    Split -A output, one Stockholm alignment per query named by its `#=GF ID` line.
+    """
+    block = []
+    with open_file(path) as f:
+        for line in f:
+            block.append(line)
+            if line.startswith("//"):
+                name = next(l.split()[2] for l in block if l.startswith("#=GF ID"))
+                for l in block:
+                    outputs.write(models[name], l)
+                block = []
+
+
+def split_results(result_paths, models_path, prefix):
+    models, files = read_models(models_path)
+
+    for path in result_paths:
+        name = os.path.basename(path)
+        match = re.match(r"(.+)\.(txt|tbl|domtbl|sto)(?:\.gz)?$", name)
+        if not match:
+            sys.exit("Unrecognised hmmsearch output file: {name}".format(name=name))
+        batch_prefix, extension = match.groups()
+
+        def renames(file_id, batch_prefix=batch_prefix):
+            file_prefix = "{prefix}_{file_id}".format(prefix=prefix, file_id=file_id)
+            names = {
+                "{batch}.{ext}".format(batch=batch_prefix, ext=ext): "{file}.{ext}".format(file=file_prefix, ext=ext)
+                for ext in ("domtbl", "tbl", "txt", "sto")
+            }
+            names["batch_models.hmm"] = files[file_id]
+            return names
+
+        outputs = Outputs(prefix, extension, files, renames)
+        try:
+            if extension == "txt":
+                split_text(path, models, outputs)
+            elif extension == "sto":
+                split_alignment(path, models, outputs)
+            else:
+                split_table(path, models, outputs, query_column[extension])
+        finally:
+            outputs.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="hmmsearch_batch", description="Batch hmmsearch over a set of HMM files and split the results per file."
+    )
+    parser.add_argument("-v", "--version", help="show version number and exit", action="store_true")
+    subparsers = parser.add_subparsers(dest="command")
+
+    concat = subparsers.add_parser("concat", help="merge HMM files into batch_models.hmm")
+    concat.add_argument("hmms", metavar="HMM", nargs="+", help="HMM files, may be gzipped")
+    concat.add_argument(
+        "-m", "--models", metavar="PATH", dest="models", default="batch_models.tsv", help="model table to write"
+    )
+
+    split = subparsers.add_parser("split", help="split hmmsearch outputs against batch_models.hmm per HMM file")
+    split.add_argument("results", metavar="RESULT", nargs="+", help="hmmsearch output files (.txt/.tbl/.domtbl/.sto)")
+    split.add_argument("-m", "--models", metavar="PATH", dest="models", required=True, help="model table of concat")
+    split.add_argument("-o", "--prefix", metavar="PREFIX", dest="prefix", required=True, help="prefix of the outputs")
+
+    args = parser.parse_args()
+
+    if args.version:
+        print("hmmsearch_batch {version}".format(version=tool_version))
+        sys.exit(0)
+
+    if args.command == "concat":
+        concat_models(args.hmms, "batch_models.hmm", args.models)
+    elif args.command == "split":
+        split_results(args.results, args.models, args.prefix)
+    else:
+        parser.error("a command (concat or split) is required")
+
+
+if __name__ == "__main__":
+    main()
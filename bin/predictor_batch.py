@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+
+# Written by the nf-core/funcscan team, released under the MIT license.
+
+"""
+Run sequence predictors on batches of samples and split the results back per sample.
+
+DeepBGC, DeepARG and AMPlify load a model and database on every start, which for
+small samples takes longer than the prediction itself. `concat` writes the FASTA
+files of several samples to one batch FASTA, prefixing every sequence name with
+a tag of its sample (`FSB<n>_`), and a tag table. `split` takes the outputs of
+the predictor run on the batch and writes those of one sample, named as if the
+predictor had been run on the sample itself:
+
+- text tables: leading lines without a tag are the header and are written for
+  every sample, other lines are assigned to the sample of their first tag and
+  lines without a tag follow the preceding line
+- GenBank files: records are assigned to the sample of their first tag, the
+  LOCUS line and wrapped qualifier and DEFINITION lines are laid out again after
+  removing the tag, as Biopython writes them
+- JSON files: entries of the top-level `records` list are assigned to the sample
+  of their first tag
+- files without the batch name as prefix (e.g. LOG.txt) are copied as they are
+
+Tags are removed from all assigned content. Binary outputs cannot be split and
+are skipped. Only valid for predictors that treat every sequence independently.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import sys
+
+tool_version = "1.0.0"
+
+tag_cols = ["tag", "sample", "stem"]
+
+tag_pattern = re.compile(r"FSB(\d+)_")
+
+binary_suffixes = (".daa", ".png", ".pdf", ".gz")
+
+# Layout of GenBank files as written by Biopython
+max_width = 80
+qualifier_indent = 21
+header_width = 68
+
+
+def open_file(path, mode="rt"):
+    """
+    Open a plain or gzipped file, detected by magic bytes rather than file extension.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def make_tag(n):
+    return "FSB{n}_".format(n=n)
+
+
+def concat(samples, stems, fastas, output, tags):
+    with open(output, "w") as out:
+        for n, (sample, fasta) in enumerate(zip(samples, fastas), start=1):
+            tag = make_tag(n)
+            with open_file(fasta) as f:
+                for line in f:
+                    if line.startswith(">"):
+                        if tag_pattern.search(line):
+                            sys.exit(
+                                "Sequence name in {fasta} contains a batch tag (FSB<n>_): {line}".format(
+                                    fasta=fasta, line=line.strip()
+                                )
+                            )
+                        line = ">" + tag + line[1:]
+                    if not line.endswith("\n"):
+                        line += "\n"
+                    out.write(line)
+
+    with open(tags, "w") as f:
+        f.write("\t".join(tag_cols) + "\n")
+        for n, (sample, stem) in enumerate(zip(samples, stems), start=1):
+            f.write("\t".join([make_tag(n), sample, stem]) + "\n")
+
+    print("Wrote {n} samples to {output}".format(n=len(samples), output=output), file=sys.stderr)
+
+
+def read_tags(path):
+    with open(path) as f:
+        cols = f.readline().rstrip("\n").split("\t")
+        return [dict(zip(cols, line.rstrip("\n").split("\t"))) for line in f if line.strip()]
+
+
+def first_tag(text):
+    match = tag_pattern.search(text)
+    return match.group(0) if match else None
+
+
+def split_text(path, tag):
+    """
+    Lines of a text table that belong to the sample of `tag`, with the tag removed.
+    """
+    lines = []
+    header = True
+    owner = None
+    with open_file(path) as f:
+        for line in f:
+            found = first_tag(line)
+            if found is None and header:
+                lines.append(line)
+                continue
+            header = False
+            if found is not None:
+                owner = found
+            if owner == tag:
+                lines.append(line.replace(tag, ""))
+    return lines
+
+
+def genbank_records(path):
+    record = []
+    with open_file(path) as f:
+        for line in f:
+            record.append(line)
+            if line.startswith("//"):
+                yield record
+                record = []
+    if any(line.strip() for line in record):
+        yield record
+
+
+def locus_line(line):
+    """
+    LOCUS line with the name and length columns laid out as Biopython writes them.
+    """
+    match = re.match(r"LOCUS {7}(\S+) +(\d+) (.*)$", line, re.S)
+    if not match:
+        return line
+    locus, length, rest = match.groups()
+    if len(locus) > 16 and len(length) > (11 - (len(locus) - 16)):
+        name_length = locus + " " + length
+    else:
+        name_length = length.rjust(28)
+        name_length = locus + name_length[len(locus) :]
+    return "LOCUS       {name_length} {rest}".format(name_length=name_length, rest=rest)
+
+
+def wrap_qualifier(line):
+    """
+    Lines of a feature qualifier wrapped as Biopython writes them.
+    """
+    lines = []
+    indent = " " * qualifier_indent
+    while line.lstrip():
+        if len(line) <= max_width:
+            lines.append(line + "\n")
+            break
+        for index in range(min(len(line) - 1, max_width), qualifier_indent + 1, -1):
+            if line[index] == " ":
+                break
+        if line[index] != " ":
+            index = max_width
+        lines.append(line[:index] + "\n")
+        line = indent + line[index:].lstrip()
+    return lines
+
+
+def wrap_header(keyword, text):
+    """
+    Lines of a header entry such as DEFINITION wrapped as Biopython writes them.
+    """
+    words = text.split()
+    lines, current = [], ""
+    for word in words:
+        if current and len(current) + 1 + len(word) > header_width:
+            lines.append(current)
+            current = word
+        else:
+            current = (current + " " + word).strip()
+    lines.append(current)
+    return [
+        "{keyword:<12}{text}\n".format(keyword=keyword if i == 0 else "", text=text) for i, text in enumerate(lines)
+    ]
+
+
+def untag_record(record, tag):
+    """
+    Lines of a GenBank record with the tag removed, re-wrapping the entries that contained it.
+    """
+    # Group the lines into entries: a header or qualifier line with its continuation lines
+    entries = []
+    in_features = False
+    for line in record:
+        if line.startswith("FEATURES"):
+            in_features = True
+        elif line.startswith("ORIGIN") or line.startswith("CONTIG"):
+            in_features = False
+        is_qualifier = in_features and line.startswith(" " * qualifier_indent)
+        continues = entries and (
+            (is_qualifier and not line[qualifier_indent:].startswith("/") and entries[-1][0] == "qualifier")
+            or (not in_features and line.startswith(" " * 12) and entries[-1][0] == "header")
+        )
+        if continues:
+            entries[-1][1].append(line)
+        elif is_qualifier:
+            entries.append(("qualifier", [line]))
+        elif not in_features and re.match(r"[A-Z]+ ", line) and not line.startswith("LOCUS"):
+            entries.append(("header", [line]))
+        else:
+            entries.append(("line", [line]))
+
+    lines = []
+    for kind, entry in entries:
+        if not any(tag in line for line in entry):
+            lines.extend(entry)
+        elif kind == "qualifier":
+            # Join the wrapped lines. Breaks before the line width were made at a space, as were breaks at the
+            # line width unless the line has no space to break at (e.g. translations)
+            text = entry[0].rstrip("\n")
+            previous = text
+            for line in entry[1:]:
+                line = line.rstrip("\n")
+                at_space = len(previous) < max_width or " " in previous[qualifier_indent + 2 :]
+                text += (" " if at_space else "") + line[qualifier_indent:]
+                previous = line
+            lines.extend(wrap_qualifier(text.replace(tag, "")))
+        elif kind == "header":
+            keyword = entry[0][:12].strip()
+            text = " ".join(line[12:].strip() for line in entry)
+            lines.extend(wrap_header(keyword, text.replace(tag, "")))
+        else:
+            line = entry[0].replace(tag, "")
+            lines.append(locus_line(line) if line.startswith("LOCUS") else line)
+    return lines
+
+
+def split_genbank(path, tag):
+    lines = []
+    for record in genbank_records(path):
+        if first_tag("".join(record)) == tag:
+            lines.extend(untag_record(record, tag))
+    return lines
+
+
+def untag_json(value, tag):
+    if isinstance(value, str):
+        return value.replace(tag, "")
+    if isinstance(value, list):
+        return [untag_json(item, tag) for item in value]
+    if isinstance(value, dict):
+        return {untag_json(key, tag): untag_json(item, tag) for key, item in value.items()}
+    return value
+
+
+def split_json(path, tag):
+    with open_file(path) as f:
+        text = f.read()
+    data = json.loads(text)
+    # Keep the indentation of the input
+    second = text.split("\n")[1] if "\n" in text.strip() else ""
+    indent = len(second) - len(second.lstrip(" ")) or None
+    if isinstance(data, dict) and isinstance(data.get("records"), list):
+        data["records"] = [
+            untag_json(record, tag) for record in data["records"] if first_tag(json.dumps(record)) == tag
+        ]
+    return json.dumps(data, indent=indent) + ("\n" if text.endswith("\n") else "")
+
+
+def split(tags, sample, batch_stem, files, outdir):
+    entry = [entry for entry in read_tags(tags) if entry["sample"] == sample]
+    if not entry:
+        sys.exit("Sample {sample} not found in {tags}".format(sample=sample, tags=tags))
+    tag, stem = entry[0]["tag"], entry[0]["stem"]
+    os.makedirs(outdir, exist_ok=True)
+
+    for path in files:
+        name = os.path.basename(path)
+        if not name.startswith(batch_stem):
+            shutil.copyfile(path, os.path.join(outdir, name))
+            continue
+        suffix = name[len(batch_stem) :]
+        if suffix.endswith(binary_suffixes):
+            print("Skipped binary output {name}".format(name=name), file=sys.stderr)
+            continue
+        output = os.path.join(outdir, stem + suffix)
+        with open(output, "w") as out:
+            if suffix.endswith((".gbk", ".gbff")):
+                out.writelines(split_genbank(path, tag))
+            elif suffix.endswith(".json"):
+                out.write(split_json(path, tag))
+            else:
+                out.writelines(split_text(path, tag))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="predictor_batch",
+        description="Run sequence predictors on batches of samples and split the results back per sample.",
+    )
+    parser.add_argument("-v", "--version", help="show version number and exit", action="store_true")
+    subparsers = parser.add_subparsers(dest="command")
+
+    concat_parser = subparsers.add_parser("concat", help="write the FASTA files of samples to one batch")
+    concat_parser.add_argument(
+        "-i", "--input", metavar="PATH", nargs="+", required=True, help="FASTA files, may be gzipped"
+    )
+    concat_parser.add_argument(
+        "-s", "--samples", metavar="NAME", nargs="+", required=True, help="sample names, in the order of --input"
+    )
+    concat_parser.add_argument(
+        "-n",
+        "--stems",
+        metavar="NAME",
+        nargs="+",
+        required=True,
+        help="output file name stem of every sample, in the order of --input",
+    )
+    concat_parser.add_argument("-o", "--output", metavar="PATH", required=True, help="batch FASTA file")
+    concat_parser.add_argument("-t", "--tags", metavar="PATH", required=True, help="tag table of the batch")
+
+    split_parser = subparsers.add_parser("split", help="write the outputs of one sample of a batch")
+    split_parser.add_argument("-t", "--tags", metavar="PATH", required=True, help="tag table written by concat")
+    split_parser.add_argument("-s", "--sample", metavar="NAME", required=True, help="sample to write")
+    split_parser.add_argument(
+        "-b", "--batch_stem", metavar="NAME", required=True, help="output file name stem of the batch run"
+    )
+    split_parser.add_argument("-o", "--outdir", metavar="PATH", default=".", help="output directory")
+    split_parser.add_argument("files", metavar="FILE", nargs="+", help="outputs of the batch run")
+
+    args = parser.parse_args()
+
+    if args.version:
+        print("predictor_batch {version}".format(version=tool_version))
+        sys.exit(0)
+
+    if args.command == "concat":
+        if not len(args.input) == len(args.samples) == len(args.stems):
+            parser.error("--input, --samples and --stems must have the same number of values")
+        concat(args.samples, args.stems, args.input, args.output, args.tags)
+    elif args.command == "split":
+        split(args.tags, args.sample, args.batch_stem, args.files, args.outdir)
+    else:
+        parser.error("a command (concat or split) is required")
+
+
+if __name__ == "__main__":
+    main()
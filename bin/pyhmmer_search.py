@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+# Written by the nf-core/funcscan team, released under the MIT license.
+
+"""
+Search the proteins of a sample with a set of HMM files in one process, with pyhmmer.
+
+All models of all HMM files are loaded once, the FAA file is read once into a
+block of digital sequences, and all models are searched against it on `--cpus`
+threads. As with hmmsearch, E-values are computed for the number of proteins
+of the sample. Results are written per HMM file, named
+`<prefix>_<file ID>.<extension>.gz` as the outputs of one hmmsearch per sample
+and HMM file:
+
+- `tbl`: per-target hits, in the format of hmmsearch --tblout
+- `domtbl`: per-domain hits, in the format of hmmsearch --domtblout
+- `sto`: with --alignments, the included hits of every model as a Stockholm
+  alignment, as hmmsearch -A
+
+pyhmmer does not write the human-readable main output of hmmsearch.
+"""
+
+import argparse
+import gzip
+import io
+import os
+import sys
+
+import pyhmmer
+
+tool_version = "1.0.0"
+
+
+def open_file(path):
+    """
+    Open a plain or gzipped file for binary reading, detected by magic bytes rather than file extension.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def open_output(path):
+    # Equivalent to `gzip --no-name`, as used by the hmmsearch module
+    return gzip.GzipFile(filename="", mode="wb", fileobj=open(path, "wb"), mtime=0)
+
+
+def close_output(handle):
+    fileobj = handle.fileobj
+    handle.close()
+    fileobj.close()
+
+
+def hmm_id(path):
+    """
+    ID of an HMM file as used for output names: the file name without `.hmm` or `.hmm.gz`.
+    """
+    name = os.path.basename(path)
+    for extension in (".hmm.gz", ".hmm"):
+        if name.endswith(extension):
+            return name[: -len(extension)]
+    return name
+
+
+def read_models(hmm_paths, alphabet):
+    """
+    Read all models into a list of (file ID, HMM), in the order of the files and of the models in each file.
+    """
+    models = []
+    seen = {}
+    for path in hmm_paths:
+        file_id = hmm_id(path)
+        if file_id in seen:
+            sys.exit(
+                "HMM files {first} and {second} have the same ID {file_id}".format(
+                    first=seen[file_id], second=path, file_id=file_id
+                )
+            )
+        seen[file_id] = path
+        with open_file(path) as f, pyhmmer.plan7.HMMFile(f) as hmms:
+            for hmm in hmms:
+                if hmm.alphabet != alphabet:
+                    sys.exit(
+                        "{path} contains a model that is not a protein model: {name}".format(path=path, name=hmm.name)
+                    )
+                models.append((file_id, hmm))
+    return models
+
+
+def read_sequences(faa, alphabet):
+    with open_file(faa) as f:
+        try:
+            seqs = pyhmmer.easel.SequenceFile(f, digital=True, alphabet=alphabet, format="fasta")
+        except EOFError:
+            # Samples without predicted proteins
+            return pyhmmer.easel.DigitalSequenceBlock(alphabet)
+        with seqs:
+            return seqs.read_block()
+
+
+def trailer(hmm_path, faa):
+    """
+    Closing comment lines of a table, as written by hmmsearch.
+    """
+    return (
+        "#\n"
+        "# Program:         pyhmmer\n"
+        "# Version:         {version}\n"
+        "# Pipeline mode:   SEARCH\n"
+        "# Query file:      {hmm}\n"
+        "# Target file:     {faa}\n"
+        "# [ok]\n"
+    ).format(version=pyhmmer.__version__, hmm=os.path.basename(hmm_path), faa=os.path.basename(faa))
+
+
+def search(hmm_paths, faa, prefix, cpus, alignments):
+    alphabet = pyhmmer.easel.Alphabet.amino()
+    models = read_models(hmm_paths, alphabet)
+    sequences = read_sequences(faa, alphabet)
+
+    extensions = ["tbl", "domtbl"] + (["sto"] if alignments else [])
+    outputs = {}
+    for path in hmm_paths:
+        file_id = hmm_id(path)
+        outputs[file_id] = {
+            extension: open_output(
+                "{prefix}_{file_id}.{extension}.gz".format(prefix=prefix, file_id=file_id, extension=extension)
+            )
+            for extension in extensions
+        }
+
+    header_written = set()
+    hits_per_file = dict.fromkeys(outputs, 0)
+    # Results are returned in the order of the queries
+    results = pyhmmer.hmmer.hmmsearch([hmm for _, hmm in models], sequences, cpus=cpus)
+    for (file_id, hmm), hits in zip(models, results):
+        handles = outputs[file_id]
+        first = file_id not in header_written
+        header_written.add(file_id)
+        hits.write(handles["tbl"], format="targets", header=first)
+        hits.write(handles["domtbl"], format="domains", header=first)
+        if alignments and any(hit.included for hit in hits):
+            msa = hits.to_msa(alphabet)
+            msa.name = hmm.name
+            if hmm.accession is not None:
+                msa.accession = hmm.accession
+            text = io.BytesIO()
+            msa.write(text, "stockholm")
+            handles["sto"].write(text.getvalue())
+        hits_per_file[file_id] += sum(1 for hit in hits if hit.reported)
+
+    for path in hmm_paths:
+        file_id = hmm_id(path)
+        for extension, handle in outputs[file_id].items():
+            if extension != "sto":
+                handle.write(trailer(path, faa).encode())
+            close_output(handle)
+
+    for file_id, n in hits_per_file.items():
+        print(
+            "{file_id}: {n} hits in {proteins} proteins".format(file_id=file_id, n=n, proteins=len(sequences)),
+            file=sys.stderr,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="pyhmmer_search", description="Search the proteins of a sample with a set of HMM files, with pyhmmer."
+    )
+    parser.add_argument("-v", "--version", help="show version number and exit", action="store_true")
+    parser.add_argument("-m", "--hmm", metavar="PATH", nargs="+", help="HMM files, may be gzipped")
+    parser.add_argument("-i", "--faa", metavar="PATH", help="protein FASTA file, may be gzipped")
+    parser.add_argument("-o", "--prefix", metavar="PREFIX", help="prefix of the outputs")
+    parser.add_argument("-c", "--cpus", metavar="INT", type=int, default=1, help="number of threads (default: 1)")
+    parser.add_argument(
+        "-A", "--alignments", action="store_true", help="write the alignments of the included hits of every model"
+    )
+    args = parser.parse_args()
+
+    if args.version:
+        print("pyhmmer_search {version}".format(version=tool_version))
+        sys.exit(0)
+    if not args.hmm or not args.faa or not args.prefix:
+        parser.error("--hmm, --faa and --prefix are required")
+    if args.cpus < 1:
+        parser.error("--cpus must be at least 1")
+
+    search(args.hmm, args.faa, args.prefix, args.cpus, args.alignments)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+# Written by the nf-core/funcscan team, released under the MIT license.
+
+"""
+Predict genes with the Pyrodigal Python API, on several contigs in parallel.
+
+Takes the options of the `pyrodigal` command line for the gene finder and the
+GFF, gene and protein FASTA and score outputs, and writes the same files in one
+pass over the input: in single mode the gene finder is trained once on all
+contigs, in metagenome mode contigs are streamed. Genes are predicted on
+`--jobs` threads, as Pyrodigal releases the GIL while predicting, and results
+are written in input order.
+
+Pyrodigal numbers sequences in the order in which predictions finish, which
+with threads is not the input order. The sequence number (`seqnum=` and the
+`ID=<seqnum>_<gene>` attributes) is therefore set back to the position of the
+contig in the input, so that the outputs are identical to those of the
+`pyrodigal` command line on one thread.
+"""
+
+import argparse
+import functools
+import gzip
+import io
+import re
+import sys
+from multiprocessing.pool import ThreadPool
+
+import pyrodigal
+
+tool_version = "1.0.0"
+
+sequence_data = re.compile(r"^(# Sequence Data: seqnum=)(\d+)(;)", re.M)
+
+
+def open_file(path):
+    """
+    Open a plain or gzipped file for text reading, detected by magic bytes rather than file extension.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, "rt")
+    return open(path)
+
+
+def open_output(path, compress):
+    """
+    Open an output file for writing, gzipped without file name and time stamp (as `gzip -n`) if compress.
+    """
+    if not compress:
+        return open(path, "w")
+    handle = open(path, "wb")
+    return io.TextIOWrapper(gzip.GzipFile(filename="", mode="wb", fileobj=handle, mtime=0), write_through=False)
+
+
+def read_fasta(path):
+    """
+    Yield (ID, sequence) of a FASTA file, with the ID and sequence parsing of the pyrodigal command line.
+    """
+    seq_id, sequence = None, []
+    with open_file(path) as f:
+        for line in f:
+            stripped = line.strip()
+            if line.startswith(">"):
+                if seq_id is not None:
+                    yield seq_id, "".join(sequence)
+                fields = line[1:].split(maxsplit=1)
+                seq_id = fields[0] if fields else ""
+                sequence = []
+            elif stripped:
+                sequence.append(stripped)
+    if seq_id is not None:
+        yield seq_id, "".join(sequence)
+
+
+def gff_ids_use_seqnum(finder_kwargs):
+    """
+    Whether this Pyrodigal version names genes in GFF rows by sequence number rather than by sequence ID.
+    """
+    probe = "ATG" + "GCTGAAAAA" * 60 + "TAA"
+    genes = pyrodigal.GeneFinder(**dict(finder_kwargs, meta=True)).find_genes(probe * 4)
+    out = io.StringIO()
+    genes.write_gff(out, "probe")
+    rows = [line for line in out.getvalue().splitlines() if line and not line.startswith("#")]
+    return bool(rows) and not rows[0].split("\t")[8].startswith("ID=probe_")
+
+
+def renumber(texts, seqnum, seqnum_ids):
+    """
+    Set the sequence number in the outputs of one contig to seqnum.
+    """
+    match = sequence_data.search(texts["gff"])
+    if not match or int(match.group(2)) == seqnum:
+        return texts
+    found = match.group(2)
+
+    def data_line(text):
+        return sequence_data.sub(lambda m: m.group(1) + str(seqnum) + m.group(3), text)
+
+    def fasta_headers(text):
+        return re.sub(r"^(>\S+ # .* # ID=)" + found + "_", r"\g<1>" + str(seqnum) + "_", text, flags=re.M)
+
+    renumbered = {}
+    for kind, text in texts.items():
+        if kind in ("gff", "scores"):
+            text = data_line(text)
+            if kind == "gff" and seqnum_ids:
+                text = re.sub(
+                    r"^((?:[^\t\n]*\t){8})ID=" + found + "_", r"\g<1>ID=" + str(seqnum) + "_", text, flags=re.M
+                )
+        else:
+            text = fasta_headers(text)
+        renumbered[kind] = text
+    return renumbered
+
+
+def predict(gene_finder, outputs, include_stop, seqnum_ids, entry):
+    """
+    Outputs of one contig as text, entry is (seqnum, (ID, sequence)).
+    """
+    seqnum, (seq_id, sequence) = entry
+    genes = gene_finder.find_genes(sequence)
+    texts = {}
+    for kind in ["gff"] + [kind for kind in ("genes", "translations", "scores") if kind in outputs]:
+        out = io.StringIO()
+        if kind == "gff":
+            genes.write_gff(out, seq_id)
+        elif kind == "genes":
+            genes.write_genes(out, seq_id)
+        elif kind == "translations":
+            if include_stop:
+                genes.write_translations(out, seq_id)
+            else:
+                genes.write_translations(out, seq_id, include_stop=False)
+        else:
+            genes.write_scores(out, seq_id)
+        texts[kind] = out.getvalue()
+    return renumber(texts, seqnum, seqnum_ids)
+
+
+def run(args):
+    finder_kwargs = {"meta": args.p == "meta", "closed": args.c, "mask": args.m}
+    for name in ("min_gene", "min_edge_gene", "max_overlap"):
+        if getattr(args, name) is not None:
+            finder_kwargs[name] = getattr(args, name)
+    gene_finder = pyrodigal.GeneFinder(**finder_kwargs)
+
+    if args.p == "single":
+        sequences = list(read_fasta(args.i))
+        gene_finder.train(*(sequence for _, sequence in sequences), force_nonsd=args.n, translation_table=args.g)
+    else:
+        sequences = read_fasta(args.i)
+
+    paths = {"gff": args.o, "genes": args.d, "translations": args.a, "scores": args.s}
+    outputs = {kind: open_output(path, args.compress) for kind, path in paths.items() if path}
+    process = functools.partial(
+        predict, gene_finder, outputs, not args.no_stop_codon, gff_ids_use_seqnum(finder_kwargs)
+    )
+
+    contigs = 0
+    with ThreadPool(args.jobs) as pool:
+        # Bounded chunks keep memory low in metagenome mode, where contigs are streamed
+        for texts in pool.imap(process, enumerate(sequences, start=1), chunksize=4):
+            for kind, handle in outputs.items():
+                handle.write(texts[kind])
+            contigs += 1
+    for handle in outputs.values():
+        handle.close()
+
+    print("Predicted genes on {n} contigs with {jobs} threads".format(n=contigs, jobs=args.jobs), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="pyrodigal_genes", description="Predict genes with the Pyrodigal Python API on several threads."
+    )
+    parser.add_argument("-v", "--version", help="show version number and exit", action="store_true")
+    parser.add_argument("-i", metavar="PATH", help="input FASTA file, may be gzipped")
+    parser.add_argument("-o", metavar="PATH", help="GFF output file")
+    parser.add_argument("-d", metavar="PATH", help="gene nucleotide FASTA output file")
+    parser.add_argument("-a", metavar="PATH", help="protein FASTA output file")
+    parser.add_argument("-s", metavar="PATH", help="output file of all potential genes with scores")
+    parser.add_argument("-p", metavar="MODE", choices=["single", "meta"], default="single", help="procedure")
+    parser.add_argument("-c", action="store_true", help="closed ends, do not allow genes to run off edges")
+    parser.add_argument("-m", action="store_true", help="treat runs of N as masked sequence")
+    parser.add_argument("-n", action="store_true", help="bypass the Shine-Dalgarno trainer (single mode)")
+    parser.add_argument("-g", metavar="INT", type=int, default=11, help="translation table (single mode)")
+    parser.add_argument("--min-gene", dest="min_gene", metavar="INT", type=int, help="minimum gene length")
+    parser.add_argument(
+        "--min-edge-gene", dest="min_edge_gene", metavar="INT", type=int, help="minimum edge gene length"
+    )
+    parser.add_argument("--max-overlap", dest="max_overlap", metavar="INT", type=int, help="maximum gene overlap")
+    parser.add_argument(
+        "--no-stop-codon", dest="no_stop_codon", action="store_true", help="do not translate stop codons to '*'"
+    )
+    parser.add_argument("-j", "--jobs", metavar="INT", type=int, default=1, help="number of threads (default: 1)")
+    parser.add_argument("-z", "--compress", action="store_true", help="write gzipped outputs")
+    args = parser.parse_args()
+
+    if args.version:
+        print("pyrodigal_genes {version}".format(version=tool_version))
+        sys.exit(0)
+    if not args.i:
+        parser.error("an input file (-i) is required")
+    if not args.o:
+        parser.error("a GFF output file (-o) is required")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
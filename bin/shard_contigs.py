@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+# Written by the nf-core/funcscan team, released under the MIT license.
+
+"""
+Split an assembly and its annotations into shards of roughly equal size in
+base pairs, keeping every contig intact, so that BGC screening tools can be
+run on the shards in parallel.
+
+Contigs are assigned greedily, longest first, to the shard with the fewest
+base pairs so far. GFF lines follow the shard of their contig in the FASTA
+file, GenBank records are balanced by the lengths given in their LOCUS lines
+(annotation tools may rename contigs in GenBank output).
+"""
+
+import argparse
+import gzip
+import heapq
+import re
+import sys
+
+tool_version = "1.0.0"
+
+stats_cols = ["file", "contigs", "total_length", "longest_contig"]
+
+
+def open_file(path, mode="rb"):
+    """
+    Open a plain or gzipped file, detected by magic bytes rather than file extension.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def contig_id(header):
+    """
+    Contig ID of a FASTA header line, i.e. its first word.
+    """
+    fields = header[1:].split(maxsplit=1)
+    return fields[0].decode() if fields else ""
+
+
+def fasta_lengths(path):
+    """
+    Return (contig ID, length) of every record of a FASTA file, in file order.
+    """
+    lengths = []
+    with open_file(path) as fasta:
+        for line in fasta:
+            if line.startswith(b">"):
+                lengths.append([contig_id(line), 0])
+            elif lengths:
+                lengths[-1][1] += len(line.rstrip())
+    return [tuple(record) for record in lengths]
+
+
+def genbank_lengths(path):
+    """
+    Return (record index, length) of every record of a GenBank file, in file order.
+    """
+    lengths = []
+    with open_file(path, "rt") as gbk:
+        for line in gbk:
+            if line.startswith("LOCUS"):
+                match = re.search(r"\s(\d+)\s+(?:bp|aa)\b", line)
+                lengths.append((len(lengths), int(match.group(1)) if match else 0))
+    return lengths
+
+
+def assign_shards(lengths, n_shards):
+    """
+    Assign records to at most `n_shards` shards, longest record first to the
+    currently smallest shard. Returns {record key: shard index} with shard
+    indices numbered from 0 without gaps.
+    """
+    n_shards = max(1, min(n_shards, len(lengths)))
+    heap = [(0, shard) for shard in range(n_shards)]
+    assignment = {}
+    for key, length in sorted(lengths, key=lambda record: -record[1]):
+        size, shard = heapq.heappop(heap)
+        assignment[key] = shard
+        heapq.heappush(heap, (size + length, shard))
+    return assignment
+
+
+def shard_name(prefix, shard):
+    return "{prefix}_shard_{shard:03d}".format(prefix=prefix, shard=shard + 1)
+
+
+def shard_stats(lengths, assignment, n_shards):
+    stats = [{"contigs": 0, "total_length": 0, "longest_contig": 0} for _ in range(n_shards)]
+    for key, length in lengths:
+        shard = stats[assignment[key]]
+        shard["contigs"] += 1
+        shard["total_length"] += length
+        shard["longest_contig"] = max(shard["longest_contig"], length)
+    return stats
+
+
+def write_fasta_shards(path, assignment, outputs):
+    """
+    Copy every FASTA record to the output of its shard, records keep their input order.
+    """
+    out = None
+    with open_file(path) as fasta:
+        for line in fasta:
+            if line.startswith(b">"):
+                out = outputs[assignment[contig_id(line)]]
+            if out is not None:
+                out.write(line)
+
+
+def write_gff_shards(path, assignment, outputs):
+    """
+    Route GFF lines to the shard of the contig they describe.
+
+    File-level directives are written to every shard. Comment lines that
+    introduce a sequence (Prodigal's `# Sequence Data`, `##sequence-region`)
+    switch the current shard, other comments follow the current shard. The
+    optional `##FASTA` section is split like a FASTA file.
+    """
+    shard = None
+    in_fasta = False
+    with open_file(path) as gff:
+        for line in gff:
+            if in_fasta:
+                if line.startswith(b">"):
+                    shard = assignment.get(contig_id(line))
+                if shard is not None:
+                    outputs[shard].write(line)
+                continue
+
+            if line.startswith(b"##FASTA"):
+                in_fasta = True
+                shard = None
+                for out in outputs:
+                    out.write(line)
+                continue
+
+            if line.startswith(b"##sequence-region"):
+                fields = line.split()
+                shard = assignment.get(fields[1].decode()) if len(fields) > 1 else None
+            elif line.startswith(b"# Sequence Data:"):
+                match = re.search(rb'seqhdr="([^"\s]*)', line)
+                shard = assignment.get(match.group(1).decode()) if match else None
+            elif line.startswith(b"#") or not line.strip():
+                pass
+            else:
+                shard = assignment.get(line.split(b"\t", 1)[0].decode())
+
+            if shard is None:
+                for out in outputs:
+                    out.write(line)
+            else:
+                outputs[shard].write(line)
+
+
+def write_genbank_shards(path, assignment, outputs):
+    """
+    Copy every GenBank record (LOCUS line up to `//`) to the output of its shard.
+    """
+    record = -1
+    out = None
+    with open_file(path) as gbk:
+        for line in gbk:
+            if line.startswith(b"LOCUS"):
+                record += 1
+                out = outputs[assignment[record]]
+            if out is not None:
+                out.write(line)
+
+
+def shard_file(path, suffix, prefix, lengths, assignment, writer):
+    """
+    Write the shards of one input file and return the statistics of each shard.
+    """
+    n_shards = len(set(assignment.values()))
+    names = [shard_name(prefix, shard) + suffix for shard in range(n_shards)]
+    outputs = [open(name, "wb") for name in names]
+    try:
+        writer(path, assignment, outputs)
+    finally:
+        for out in outputs:
+            out.close()
+
+    stats = []
+    for name, shard in zip(names, shard_stats(lengths, assignment, n_shards)):
+        stats.append(dict(shard, file=name))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="shard_contigs",
+        description="Split a FASTA file and its annotations into base pair balanced shards of intact contigs.",
+    )
+    parser.add_argument("-i", "--fasta", metavar="PATH", dest="fasta", help="input FASTA, may be gzipped")
+    parser.add_argument("-g", "--gff", metavar="PATH", dest="gff", help="GFF annotation of the input FASTA (optional)")
+    parser.add_argument(
+        "-b",
+        "--gbk",
+        metavar="PATH",
+        dest="gbk",
+        help="GenBank annotation, sharded independently of the FASTA file (optional)",
+    )
+    parser.add_argument("-n", "--shards", metavar="INT", dest="shards", type=int, help="number of shards to create")
+    parser.add_argument("-o", "--prefix", metavar="PREFIX", dest="prefix", help="prefix of the output files")
+    parser.add_argument("-v", "--version", help="show version number and exit", action="store_true")
+    args = parser.parse_args()
+
+    if args.version:
+        print("shard_contigs {version}".format(version=tool_version))
+        sys.exit(0)
+
+    if not ((args.fasta or args.gbk) and args.shards and args.prefix):
+        parser.error("--shards, --prefix and at least one of --fasta or --gbk are required")
+    if args.gff and not args.fasta:
+        parser.error("--gff requires --fasta, GFF lines are sharded alongside their FASTA records")
+
+    stats = []
+
+    if args.fasta:
+        lengths = fasta_lengths(args.fasta)
+        if len(set(contig for contig, _ in lengths)) != len(lengths):
+            sys.exit("Contig IDs of {fasta} are not unique, cannot shard by contig".format(fasta=args.fasta))
+        assignment = assign_shards(lengths, args.shards)
+        stats += shard_file(args.fasta, ".fasta", args.prefix, lengths, assignment, write_fasta_shards)
+        if args.gff:
+            shard_file(args.gff, ".gff", args.prefix, lengths, assignment, write_gff_shards)
+
+    if args.gbk:
+        lengths = genbank_lengths(args.gbk)
+        assignment = assign_shards(lengths, args.shards)
+        stats += shard_file(args.gbk, ".gbk", args.prefix, lengths, assignment, write_genbank_shards)
+
+    with open(args.prefix + ".shard_stats.tsv", "w") as out:
+        out.write("\t".join(stats_cols) + "\n")
+        for shard in stats:
+            out.write("\t".join(str(shard[col]) for col in stats_cols) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,631 @@
+#!/usr/bin/env python3
+
+# Written by the nf-core/funcscan team, released under the MIT license.
+
+"""
+Load the AMP, ARG and BGC summaries of a run into one indexed SQLite database.
+
+`load` bulk-inserts the AMPcombi complete summary (plain or BGZF-compressed
+CSV), the hAMRonization summary (TSV, JSON or JSON lines) and the comBGC
+complete summary into the tables `amp`, `arg` and `bgc`. Every table keeps all
+columns of its summary and starts with the shared key columns
+
+    sample, contig, start, end
+
+which are indexed per table. Overlap queries use an R*Tree interval index per
+table (`<table>_interval`) with the contig as one dimension and the position
+as the other, the contig of a row is resolved via the `contigs` table.
+
+AMPcombi reports proteins, not positions: the contig of an AMP is derived from
+the Prodigal/Pyrodigal protein ID (`<contig>_<n>`) and its start and end are
+empty, so AMPs take part in contig level but not in overlap queries.
+
+`query` answers common questions (contigs carrying several feature types,
+overlapping features, features in a region) or runs plain SQL, `benchmark`
+compares loading and querying with the equivalent pandas code on a synthetic
+cohort.
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+
+tool_version = "1.0.0"
+
+tables = ["amp", "arg", "bgc"]
+key_cols = ["sample", "contig", "start", "end"]
+
+# Column names of the shared key in the summaries of the individual tools
+bgc_key = {"sample": "Sample_ID", "contig": "Contig_ID", "start": "BGC_start", "end": "BGC_end"}
+arg_key = {
+    "sample": "input_file_name",
+    "contig": "input_sequence_id",
+    "start": "input_gene_start",
+    "end": "input_gene_stop",
+}
+amp_key = {"sample": "name", "protein": "contig_id"}
+
+missing_values = {"", "NA", "NaN", "nan", "None"}
+int_pattern = re.compile(r"[-+]?\d+")
+float_pattern = re.compile(r"[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?|[-+]?inf")
+
+
+def open_file(path):
+    """
+    Open a plain or gzipped (also BGZF) file for text reading, detected by magic bytes rather than file extension.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, "rt", newline="")
+    return open(path, newline="")
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def convert(value):
+    """
+    Store numbers as numbers, so that they compare and sort numerically in SQL.
+    """
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        return value
+    if value in missing_values:
+        return None
+    if int_pattern.fullmatch(value):
+        return int(value)
+    if float_pattern.fullmatch(value):
+        return float(value)
+    return value
+
+
+def position(value):
+    value = convert(value)
+    if isinstance(value, (int, float)):
+        return int(value)
+    return None
+
+
+def protein_contig(protein):
+    """
+    Contig of a Prodigal/Pyrodigal protein ID, None for other annotation tools.
+    """
+    match = re.fullmatch(r"(.+)_\d+", protein or "")
+    return match.group(1) if match else None
+
+
+def sample_of(input_file_name, samples):
+    """
+    Sample of a hAMRonization `input_file_name`: the longest known sample name the file name starts with, otherwise
+    the file name without extensions.
+    """
+    name = os.path.basename(input_file_name or "")
+    # Prefixes of the file name that end before a '.' or '_', longest first
+    for end in sorted([len(name)] + [m.start() for m in re.finditer(r"[._]", name)], reverse=True):
+        if name[:end] in samples:
+            return name[:end]
+    return name.split(".")[0]
+
+
+def unique_columns(names):
+    """
+    Make column names unique, case-insensitively as SQLite compares them, and distinct from the key columns.
+    """
+    seen = {col.lower() for col in key_cols} | {"id"}
+    result = []
+    for name in names:
+        candidate = name or "column"
+        n = 1
+        while candidate.lower() in seen:
+            n += 1
+            candidate = "{name}_{n}".format(name=name, n=n)
+        seen.add(candidate.lower())
+        result.append(candidate)
+    return result
+
+
+def read_delimited(path, delimiter):
+    """
+    Yield the header and then every row of a CSV/TSV file as a list.
+    """
+    with open_file(path) as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        for row in reader:
+            if row:
+                yield row
+
+
+def read_records(path):
+    """
+    Yield the header and rows of a summary file: CSV/TSV by delimiter of the header, hAMRonization JSON or JSON lines.
+    """
+    with open_file(path) as f:
+        start = f.read(1)
+    if start == "{":
+        with open_file(path) as f:
+            try:
+                first = json.loads(f.readline())
+            except json.JSONDecodeError:
+                first = None
+            if first is not None:
+                # JSON lines as written by hamronization_merge.py, every record has the same fields
+                header = list(first)
+                yield header
+                yield [first.get(key) for key in header]
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        yield [record.get(key) for key in header]
+                return
+    if start in ("[", "{"):
+        with open_file(path) as f:
+            records = json.load(f)
+        if isinstance(records, dict):
+            records = [records]
+        header = []
+        for record in records:
+            header += [key for key in record if key not in header]
+        yield header
+        for record in records:
+            yield [record.get(key) for key in header]
+        return
+
+    with open_file(path) as f:
+        first = f.readline()
+    delimiter = "\t" if first.count("\t") >= first.count(",") else ","
+    yield from read_delimited(path, delimiter)
+
+
+def load_table(con, table, path, key_of):
+    """
+    Create a table from a summary file, with the shared key columns followed by all columns of the summary.
+    Return the number of rows loaded, or None if the file is empty and no table was created.
+    """
+    records = read_records(path)
+    header = next(records, None)
+    if header is None:
+        print("{path} is empty, {table} is not loaded".format(path=path, table=table), file=sys.stderr)
+        return None
+
+    columns = unique_columns(header)
+    con.execute(
+        "CREATE TABLE {table} (id INTEGER PRIMARY KEY, {cols})".format(
+            table=table, cols=", ".join(quote(col) for col in key_cols + columns)
+        )
+    )
+    insert = "INSERT INTO {table} ({cols}) VALUES ({values})".format(
+        table=table,
+        cols=", ".join(quote(col) for col in key_cols + columns),
+        values=", ".join("?" * (len(key_cols) + len(columns))),
+    )
+
+    def rows():
+        for record in records:
+            record = dict(zip(header, record))
+            key = key_of(record)
+            yield key + [convert(record.get(name)) for name in header]
+
+    cursor = con.executemany(insert, rows())
+    return cursor.rowcount
+
+
+def bgc_key_of(record):
+    start, end = position(record.get(bgc_key["start"])), position(record.get(bgc_key["end"]))
+    return [record.get(bgc_key["sample"]), record.get(bgc_key["contig"]), start, end]
+
+
+def arg_key_of(samples):
+    def key_of(record):
+        start, end = position(record.get(arg_key["start"])), position(record.get(arg_key["end"]))
+        if start is not None and end is not None and start > end:
+            start, end = end, start
+        return [sample_of(record.get(arg_key["sample"]), samples), record.get(arg_key["contig"]), start, end]
+
+    return key_of
+
+
+def amp_key_of(record):
+    return [record.get(amp_key["sample"]), protein_contig(record.get(amp_key["protein"])), None, None]
+
+
+def build_indexes(con, loaded):
+    """
+    Index the shared key of every table, number the contigs and fill the interval indexes.
+    """
+    con.execute(
+        "CREATE TABLE contigs (contig_key INTEGER PRIMARY KEY, sample TEXT, contig TEXT, UNIQUE (sample, contig))"
+    )
+    for table in loaded:
+        con.execute(
+            "CREATE INDEX {table}_key ON {table} (sample, contig, start, {end})".format(table=table, end=quote("end"))
+        )
+        con.execute(
+            "INSERT OR IGNORE INTO contigs (sample, contig) SELECT DISTINCT sample, contig FROM {table} "
+            "WHERE contig IS NOT NULL ORDER BY sample, contig".format(table=table)
+        )
+    for table in loaded:
+        # 32 bit integer R*Tree: exact for positions below 2^31
+        con.execute(
+            "CREATE VIRTUAL TABLE {table}_interval USING rtree_i32 (id, contig_min, contig_max, start, {end})".format(
+                table=table, end=quote("end")
+            )
+        )
+        con.execute(
+            "INSERT INTO {table}_interval SELECT t.id, c.contig_key, c.contig_key, t.start, t.{end} FROM {table} t "
+            "JOIN contigs c ON c.sample = t.sample AND c.contig = t.contig "
+            "WHERE t.start IS NOT NULL AND t.{end} IS NOT NULL".format(table=table, end=quote("end"))
+        )
+
+
+def load(database, ampcombi, hamronization, combgc, samples):
+    if os.path.exists(database):
+        os.remove(database)
+    con = sqlite3.connect(database)
+    # The database is written from scratch, a crash leaves nothing worth recovering
+    con.execute("PRAGMA journal_mode = OFF")
+    con.execute("PRAGMA synchronous = OFF")
+
+    known_samples = set(samples or [])
+    loaded = {}
+    with con:
+        if combgc:
+            loaded["bgc"] = load_table(con, "bgc", combgc, bgc_key_of)
+            if loaded["bgc"] is not None:
+                known_samples |= {row[0] for row in con.execute("SELECT DISTINCT sample FROM bgc")}
+        if ampcombi:
+            loaded["amp"] = load_table(con, "amp", ampcombi, amp_key_of)
+            if loaded["amp"] is not None:
+                known_samples |= {row[0] for row in con.execute("SELECT DISTINCT sample FROM amp")}
+        if hamronization:
+            loaded["arg"] = load_table(con, "arg", hamronization, arg_key_of(known_samples - {None}))
+        loaded = {table: rows for table, rows in loaded.items() if rows is not None}
+
+        build_indexes(con, [table for table in tables if table in loaded])
+
+        con.execute("CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT)")
+        con.executemany(
+            "INSERT INTO metadata VALUES (?, ?)",
+            [
+                ("tool_version", tool_version),
+                ("created", time.strftime("%Y-%m-%dT%H:%M:%S")),
+                ("ampcombi", ampcombi or ""),
+                ("hamronization", hamronization or ""),
+                ("combgc", combgc or ""),
+            ],
+        )
+    con.execute("ANALYZE")
+    con.close()
+
+    print(
+        "Loaded {tables} into {database}".format(
+            tables=", ".join("{n} {table} rows".format(n=n, table=table) for table, n in loaded.items()) or "no tables",
+            database=database,
+        ),
+        file=sys.stderr,
+    )
+
+
+########################
+# QUERIES
+########################
+
+
+def existing_tables(con):
+    return [row[0] for row in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'") if row[0] in tables]
+
+
+def check_tables(con, names):
+    available = existing_tables(con)
+    for name in names:
+        if name not in available:
+            sys.exit(
+                "Table {name} is not in the database (available: {available})".format(
+                    name=name, available=", ".join(available) or "none"
+                )
+            )
+
+
+def query_contigs(con, kinds, sample=None):
+    """
+    Contigs that carry features of all the given tables, with the number of features per table.
+    """
+    check_tables(con, kinds)
+    counts = ", ".join(
+        "(SELECT COUNT(*) FROM {t} WHERE {t}.sample = c.sample AND {t}.contig = c.contig) AS {t}".format(t=t)
+        for t in kinds
+    )
+    exists = " AND ".join(
+        "EXISTS (SELECT 1 FROM {t} WHERE {t}.sample = c.sample AND {t}.contig = c.contig)".format(t=t) for t in kinds
+    )
+    sql = "SELECT c.sample, c.contig, {counts} FROM contigs c WHERE {exists}".format(counts=counts, exists=exists)
+    params = []
+    if sample:
+        sql += " AND c.sample = ?"
+        params.append(sample)
+    cursor = con.execute(sql + " ORDER BY c.sample, c.contig", params)
+    return ["sample", "contig"] + kinds, cursor
+
+
+def query_overlaps(con, first, second, distance=0, sample=None):
+    """
+    Pairs of features of two tables on the same contig whose intervals overlap or are at most `distance` bp apart.
+    """
+    check_tables(con, [first, second])
+    sql = (
+        "SELECT a.sample, a.contig, a.id, a.start, a.{end}, b.id, b.start, b.{end} "
+        "FROM {a} a "
+        "JOIN contigs c ON c.sample = a.sample AND c.contig = a.contig "
+        "JOIN {b}_interval r ON r.contig_min <= c.contig_key AND r.contig_max >= c.contig_key "
+        "AND r.start <= a.{end} + ? AND r.{end} >= a.start - ? "
+        "JOIN {b} b ON b.id = r.id "
+        "WHERE a.start IS NOT NULL AND a.{end} IS NOT NULL"
+    ).format(a=first, b=second, end=quote("end"))
+    params = [distance, distance]
+    if sample:
+        sql += " AND a.sample = ?"
+        params.append(sample)
+    sql += " ORDER BY a.sample, a.contig, a.start, b.start"
+    names = [
+        "sample",
+        "contig",
+        first + "_id",
+        first + "_start",
+        first + "_end",
+        second + "_id",
+        second + "_start",
+        second + "_end",
+    ]
+    return names, con.execute(sql, params)
+
+
+def query_region(con, sample, contig, start, end, kinds):
+    """
+    Features of the given tables on a contig, overlapping [start, end] if given.
+    """
+    check_tables(con, kinds)
+    parts = []
+    params = []
+    for t in kinds:
+        sql = "SELECT '{t}', id, sample, contig, start, {end} FROM {t} WHERE sample = ? AND contig = ?".format(
+            t=t, end=quote("end")
+        )
+        params += [sample, contig]
+        if start is not None:
+            sql += " AND {end} >= ?".format(end=quote("end"))
+            params.append(start)
+        if end is not None:
+            sql += " AND start <= ?"
+            params.append(end)
+        parts.append(sql)
+    sql = " UNION ALL ".join(parts) + " ORDER BY 5, 1"
+    return ["table", "id"] + key_cols, con.execute(sql, params)
+
+
+def write_rows(names, rows, out):
+    out.write("\t".join(names) + "\n")
+    for row in rows:
+        out.write("\t".join("NA" if value is None else str(value) for value in row) + "\n")
+
+
+########################
+# BENCHMARK
+########################
+
+
+def write_fixture(outdir, n_samples, seed):
+    """
+    Write a synthetic cohort in the formats of the three summaries: per sample 60 contigs with 8 BGCs, 10 ARGs and
+    15 AMPs on random contigs.
+    """
+    rng = random.Random(seed)
+    paths = {
+        "bgc": os.path.join(outdir, "combgc_complete_summary.tsv"),
+        "arg": os.path.join(outdir, "hamronization_combined_report.tsv"),
+        "amp": os.path.join(outdir, "ampcombi_complete_summary.csv.gz"),
+    }
+    with open(paths["bgc"], "w") as bgc, open(paths["arg"], "w") as arg, gzip.open(paths["amp"], "wt") as amp:
+        bgc.write("\t".join(["Sample_ID", "Prediction_tool", "Contig_ID", "Product_class", "BGC_start", "BGC_end"]))
+        bgc.write("\n")
+        arg.write(
+            "\t".join(
+                ["input_file_name", "gene_symbol", "analysis_software_name", "input_sequence_id"]
+                + ["input_gene_start", "input_gene_stop", "strand_orientation"]
+            )
+            + "\n"
+        )
+        amp.write("name,contig_id,prob_macrel,prob_ampir,aa_sequence\n")
+        for s in range(n_samples):
+            sample = "sample_{s:05d}".format(s=s)
+            for _ in range(8):
+                start = rng.randint(1, 200000)
+                contig = "contig_{c}".format(c=rng.randint(1, 60))
+                tool = rng.choice(["antiSMASH", "deepBGC", "GECCO"])
+                bgc.write("\t".join([sample, tool, contig, "NRPS", str(start), str(start + rng.randint(5000, 40000))]))
+                bgc.write("\n")
+            for _ in range(10):
+                start = rng.randint(1, 240000)
+                contig = "contig_{c}".format(c=rng.randint(1, 60))
+                fields = [sample + ".tsv", "blaTEM", rng.choice(["abricate", "amrfinderplus", "rgi"]), contig]
+                fields += [str(start), str(start + rng.randint(600, 3000)), rng.choice(["+", "-"])]
+                arg.write("\t".join(fields) + "\n")
+            for _ in range(15):
+                protein = "contig_{c}_{g}".format(c=rng.randint(1, 60), g=rng.randint(1, 200))
+                amp.write("{s},{p},{m:.3f},{a:.3f},MKKLL\n".format(s=sample, p=protein, m=rng.random(), a=rng.random()))
+    return paths
+
+
+def pandas_queries(paths):
+    """
+    The pandas equivalent of `query contigs arg bgc` and `query overlaps arg bgc`, including reading the summaries.
+    """
+    import pandas as pd
+
+    bgc = pd.read_csv(paths["bgc"], sep="\t")
+    arg = pd.read_csv(paths["arg"], sep="\t")
+    amp = pd.read_csv(paths["amp"])
+
+    bgc = bgc.rename(columns={bgc_key[k]: k for k in ["sample", "contig", "start", "end"]})
+    arg = arg.rename(columns={arg_key[k]: k for k in ["contig", "start", "end"]})
+    samples = set(bgc["sample"]) | set(amp["name"])
+    arg["sample"] = [sample_of(name, samples) for name in arg[arg_key["sample"]]]
+
+    both = arg[["sample", "contig"]].drop_duplicates().merge(bgc[["sample", "contig"]].drop_duplicates(), how="inner")
+    pairs = arg.merge(bgc, on=["sample", "contig"], suffixes=("_arg", "_bgc"))
+    overlaps = pairs[(pairs["start_bgc"] <= pairs["end_arg"]) & (pairs["end_bgc"] >= pairs["start_arg"])]
+    return len(both), len(overlaps)
+
+
+def sqlite_queries(database):
+    con = sqlite3.connect(database)
+    contigs = len(query_contigs(con, ["arg", "bgc"])[1].fetchall())
+    overlaps = len(query_overlaps(con, "arg", "bgc")[1].fetchall())
+    con.close()
+    return contigs, overlaps
+
+
+def timed(function, *args, repeat=1):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def benchmark(n_samples, repeat, seed):
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        sys.exit("The benchmark compares against pandas, which is not installed")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = write_fixture(tmpdir, n_samples, seed)
+        database = os.path.join(tmpdir, "funcscan_summary.sqlite")
+
+        pandas_result, pandas_time = timed(pandas_queries, paths, repeat=repeat)
+        _, load_time = timed(load, database, paths["amp"], paths["arg"], paths["bgc"], None)
+        sqlite_result, query_time = timed(sqlite_queries, database, repeat=repeat)
+        size = os.path.getsize(database)
+
+    if pandas_result != sqlite_result:
+        sys.exit(
+            "Results differ: pandas {p} and SQLite {s} (contigs with ARG and BGC, overlapping pairs)".format(
+                p=pandas_result, s=sqlite_result
+            )
+        )
+
+    print("\t".join(["samples", "method", "seconds", "contigs_arg_bgc", "overlaps_arg_bgc"]))
+    print("\t".join(map(str, [n_samples, "pandas_read_and_query", round(pandas_time, 4), *pandas_result])))
+    print("\t".join(map(str, [n_samples, "sqlite_load", round(load_time, 4), "NA", "NA"])))
+    print("\t".join(map(str, [n_samples, "sqlite_query", round(query_time, 4), *sqlite_result])))
+    print("Database size: {size:.1f} MB".format(size=size / 1024**2), file=sys.stderr)
+
+
+########################
+# MAIN
+########################
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="summary_store", description="Load AMP, ARG and BGC summaries into one indexed SQLite database."
+    )
+    parser.add_argument("-v", "--version", help="show version number and exit", action="store_true")
+    subparsers = parser.add_subparsers(dest="command")
+
+    load_parser = subparsers.add_parser("load", help="create the database from the summaries")
+    load_parser.add_argument("-a", "--ampcombi", metavar="PATH", help="AMPcombi complete summary (.csv or .csv.gz)")
+    load_parser.add_argument(
+        "-r", "--hamronization", metavar="PATH", help="hAMRonization summary (.tsv, .json or .jsonl)"
+    )
+    load_parser.add_argument("-b", "--combgc", metavar="PATH", help="comBGC complete summary (.tsv)")
+    load_parser.add_argument(
+        "-s",
+        "--samples",
+        metavar="NAME",
+        nargs="+",
+        help="sample names, to resolve the samples of hAMRonization input file names",
+    )
+    load_parser.add_argument(
+        "-o", "--output", metavar="PATH", default="funcscan_summary.sqlite", help="database to write"
+    )
+
+    query_parser = subparsers.add_parser("query", help="query a database, writes TSV to stdout")
+    query_parser.add_argument("-d", "--database", metavar="PATH", required=True, help="database written by load")
+    query_subparsers = query_parser.add_subparsers(dest="query")
+
+    contigs_parser = query_subparsers.add_parser("contigs", help="contigs carrying features of all given tables")
+    contigs_parser.add_argument("tables", metavar="TABLE", nargs="+", choices=tables)
+    contigs_parser.add_argument("-s", "--sample", metavar="NAME", help="only this sample")
+
+    overlaps_parser = query_subparsers.add_parser("overlaps", help="overlapping features of two tables")
+    overlaps_parser.add_argument("first", metavar="TABLE", choices=tables)
+    overlaps_parser.add_argument("second", metavar="TABLE", choices=tables)
+    overlaps_parser.add_argument(
+        "-w", "--distance", metavar="BP", type=int, default=0, help="also report features up to this distance"
+    )
+    overlaps_parser.add_argument("-s", "--sample", metavar="NAME", help="only this sample")
+
+    region_parser = query_subparsers.add_parser("region", help="features on a contig or in a region of a contig")
+    region_parser.add_argument("-s", "--sample", metavar="NAME", required=True)
+    region_parser.add_argument("-c", "--contig", metavar="NAME", required=True)
+    region_parser.add_argument("--start", metavar="BP", type=int)
+    region_parser.add_argument("--end", metavar="BP", type=int)
+    region_parser.add_argument("-t", "--tables", metavar="TABLE", nargs="+", choices=tables)
+
+    sql_parser = query_subparsers.add_parser("sql", help="run an SQL statement")
+    sql_parser.add_argument("statement", metavar="SQL")
+
+    benchmark_parser = subparsers.add_parser("benchmark", help="compare with pandas on a synthetic cohort")
+    benchmark_parser.add_argument("-n", "--samples", metavar="INT", type=int, default=1000, help="default: 1000")
+    benchmark_parser.add_argument("-r", "--repeat", metavar="INT", type=int, default=3, help="default: 3")
+    benchmark_parser.add_argument("--seed", metavar="INT", type=int, default=1)
+
+    args = parser.parse_args()
+
+    if args.version:
+        print("summary_store {version}".format(version=tool_version))
+        sys.exit(0)
+
+    if args.command == "load":
+        if not (args.ampcombi or args.hamronization or args.combgc):
+            load_parser.error("at least one of --ampcombi, --hamronization and --combgc is required")
+        load(args.output, args.ampcombi, args.hamronization, args.combgc, args.samples)
+    elif args.command == "query":
+        if not os.path.isfile(args.database):
+            sys.exit("Database {database} does not exist".format(database=args.database))
+        con = sqlite3.connect("file:{path}?mode=ro".format(path=args.database), uri=True)
+        if args.query == "contigs":
+            names, cursor = query_contigs(con, args.tables, args.sample)
+        elif args.query == "overlaps":
+            names, cursor = query_overlaps(con, args.first, args.second, args.distance, args.sample)
+        elif args.query == "region":
+            names, cursor = query_region(
+                con, args.sample, args.contig, args.start, args.end, args.tables or existing_tables(con)
+            )
+        elif args.query == "sql":
+            cursor = con.execute(args.statement)
+            names = [description[0] for description in cursor.description or []]
+        else:
+            query_parser.error("a query (contigs, overlaps, region or sql) is required")
+        write_rows(names, cursor, sys.stdout)
+    elif args.command == "benchmark":
+        benchmark(args.samples, args.repeat, args.seed)
+    else:
+        parser.error("a command (load, query or benchmark) is required")
+
+
+if __name__ == "__main__":
+    main()
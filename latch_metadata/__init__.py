@@ -6,14 +6,14 @@ from latch.types.metadata import (
 )
 from latch.types.directory import LatchDir
 
-from .parameters import generated_parameters
+from .parameters import generated_parameters, workflow_parameters
 
 NextflowMetadata(
     display_name='nf-core/funcscan',
     author=LatchAuthor(
         name="Your Name",
     ),
-    parameters=generated_parameters,
+    parameters={**generated_parameters, **workflow_parameters},
     runtime_resources=NextflowRuntimeResources(
         cpus=4,
         memory=8,
@@ -13,6 +13,8 @@ from latch.types.directory import LatchDir, LatchOutputDir
 #
 # from .parameters import generated_parameters
 
+# Only the workflow registration and the `nextflow_runtime` task, which forwards
+# these parameters to Nextflow, import this module (see wf/entrypoint.py).
 generated_parameters = {
     'input': NextflowParameter(
         type=LatchFile,
@@ -56,6 +58,12 @@ generated_parameters = {
         section_title=None,
         description='Activate biosynthetic gene cluster screening tools.',
     ),
+    'preprocessing_mincontiglen': NextflowParameter(
+        type=typing.Optional[int],
+        default=0,
+        section_title='Preprocessing',
+        description='Minimum length of contigs to keep for annotation and screening.',
+    ),
     'annotation_tool': NextflowParameter(
         type=typing.Optional[str],
         default='pyrodigal',
@@ -68,6 +76,30 @@ generated_parameters = {
         section_title=None,
         description='Specify whether to save gene annotations in the results directory.',
     ),
+    'annotation_dedup': NextflowParameter(
+        type=typing.Optional[bool],
+        default=None,
+        section_title=None,
+        description='Annotate contigs that occur in several samples only once (Prodigal and Pyrodigal in metagenome mode only).',
+    ),
+    'annotation_dedup_batchsize': NextflowParameter(
+        type=typing.Optional[int],
+        default=50000000,
+        section_title=None,
+        description='Base pairs of distinct contigs per annotation task with `--annotation_dedup`.',
+    ),
+    'annotation_cache_dir': NextflowParameter(
+        type=typing.Optional[str],
+        default=None,
+        section_title=None,
+        description='Directory of a persistent annotation cache shared between pipeline runs.',
+    ),
+    'annotation_cache_maxsize': NextflowParameter(
+        type=typing.Optional[float],
+        default=100.0,
+        section_title=None,
+        description='Maximum size of the annotation cache in GB. The least recently used entries are removed when it is exceeded.',
+    ),
     'annotation_bakta_db_localpath': NextflowParameter(
         type=typing.Optional[str],
         default=None,
@@ -308,18 +340,42 @@ generated_parameters = {
         section_title=None,
         description='Forces Pyrodigal to scan for motifs.',
     ),
+    'annotation_pyrodigal_multithreaded': NextflowParameter(
+        type=typing.Optional[bool],
+        default=None,
+        section_title=None,
+        description='Predict genes with the Pyrodigal Python API on several threads per sample.',
+    ),
     'save_databases': NextflowParameter(
         type=typing.Optional[bool],
         default=None,
         section_title='Database downloading options',
         description='Specify whether to save pipeline-downloaded databases in your results directory.',
     ),
+    'database_store': NextflowParameter(
+        type=typing.Optional[str],
+        default=None,
+        section_title=None,
+        description='Path to a local database store fetched with funcscan_db.py, used for all database parameters that are not given.',
+    ),
+    'amp_prediction_cache_dir': NextflowParameter(
+        type=typing.Optional[str],
+        default=None,
+        section_title='AMP: Prediction cache',
+        description='Directory of a persistent AMP prediction cache shared between samples and pipeline runs.',
+    ),
     'amp_skip_amplify': NextflowParameter(
         type=typing.Optional[bool],
         default=None,
         section_title='AMP: AMPlify',
         description='Skip AMPlify during AMP-screening.',
     ),
+    'amp_amplify_batchsize': NextflowParameter(
+        type=typing.Optional[int],
+        default=1,
+        section_title=None,
+        description='Number of samples per AMPlify run.',
+    ),
     'amp_skip_ampir': NextflowParameter(
         type=typing.Optional[bool],
         default=None,
@@ -368,6 +424,18 @@ generated_parameters = {
         section_title=None,
         description='Save a simple tabular file summarising the per-domain output.',
     ),
+    'amp_hmmsearch_batch': NextflowParameter(
+        type=typing.Optional[bool],
+        default=None,
+        section_title=None,
+        description='Run a single hmmsearch per sample against all HMM models instead of one per sample and model.',
+    ),
+    'amp_hmmsearch_engine': NextflowParameter(
+        type=typing.Optional[str],
+        default='hmmer',
+        section_title=None,
+        description='Specify the engine used to search the HMM models: the hmmsearch command line or pyhmmer.',
+    ),
     'amp_skip_macrel': NextflowParameter(
         type=typing.Optional[bool],
         default=None,
@@ -482,6 +550,12 @@ generated_parameters = {
         section_title=None,
         description='Specify minimum number of alignments per entry for DIAMOND step of DeepARG.',
     ),
+    'arg_deeparg_batchsize': NextflowParameter(
+        type=typing.Optional[int],
+        default=1,
+        section_title=None,
+        description='Number of samples per DeepARG run.',
+    ),
     'arg_skip_fargene': NextflowParameter(
         type=typing.Optional[bool],
         default=None,
@@ -518,6 +592,12 @@ generated_parameters = {
         section_title=None,
         description='Defines which ORF finding algorithm to use.',
     ),
+    'arg_fargene_batch': NextflowParameter(
+        type=typing.Optional[bool],
+        default=None,
+        section_title=None,
+        description='Run all fARGene HMM classes of a sample in one task, translating the contigs only once.',
+    ),
     'arg_fargene_translationformat': NextflowParameter(
         type=typing.Optional[str],
         default='pearson',
@@ -596,6 +676,18 @@ generated_parameters = {
         section_title=None,
         description='Minimum percent coverage of alignment required for a hit to be considered.',
     ),
+    'bgc_shard_contigs': NextflowParameter(
+        type=typing.Optional[bool],
+        default=None,
+        section_title='BGC: Sharding',
+        description='Split large samples into shards of contigs before running antiSMASH, deepBGC and GECCO.',
+    ),
+    'bgc_shard_size': NextflowParameter(
+        type=typing.Optional[int],
+        default=50000000,
+        section_title=None,
+        description='Target number of base pairs per shard.',
+    ),
     'bgc_skip_antismash': NextflowParameter(
         type=typing.Optional[bool],
         default=None,
@@ -614,6 +706,12 @@ generated_parameters = {
         section_title=None,
         description='Path to user-defined local antiSMASH directory. Only required when running with docker/singularity.',
     ),
+    'bgc_antismash_cache_dir': NextflowParameter(
+        type=typing.Optional[str],
+        default=None,
+        section_title=None,
+        description='Directory in which downloaded antiSMASH databases are cached between runs.',
+    ),
     'bgc_antismash_sampleminlength': NextflowParameter(
         type=typing.Optional[int],
         default=1000,
@@ -734,6 +832,12 @@ generated_parameters = {
         section_title=None,
         description='DeepBGC classification score threshold for assigning classes to BGCs.',
     ),
+    'bgc_deepbgc_batchsize': NextflowParameter(
+        type=typing.Optional[int],
+        default=1,
+        section_title=None,
+        description='Number of samples per DeepBGC run.',
+    ),
     'bgc_skip_gecco': NextflowParameter(
         type=typing.Optional[bool],
         default=None,
@@ -800,12 +904,42 @@ generated_parameters = {
         section_title=None,
         description='Save a simple tabular file summarising the per-domain output.',
     ),
+    'bgc_hmmsearch_batch': NextflowParameter(
+        type=typing.Optional[bool],
+        default=None,
+        section_title=None,
+        description='Run a single hmmsearch per sample against all HMM models instead of one per sample and model.',
+    ),
+    'bgc_hmmsearch_engine': NextflowParameter(
+        type=typing.Optional[str],
+        default='hmmer',
+        section_title=None,
+        description='Specify the engine used to search the HMM models: the hmmsearch command line or pyhmmer.',
+    ),
     'arg_hamronization_summarizeformat': NextflowParameter(
         type=typing.Optional[str],
         default='tsv',
         section_title='Reporting',
         description='Specifies summary output format',
     ),
+    'arg_hamronization_appendsummary': NextflowParameter(
+        type=typing.Optional[str],
+        default=None,
+        section_title=None,
+        description='Path to an existing hAMRonization summary that the ARGs of this run are added to.',
+    ),
+    'run_summary_store': NextflowParameter(
+        type=typing.Optional[bool],
+        default=None,
+        section_title=None,
+        description='Load the AMP, ARG and BGC summaries into one indexed SQLite database.',
+    ),
+    'resource_scaling': NextflowParameter(
+        type=typing.Optional[bool],
+        default=None,
+        section_title='Resource options',
+        description='Scale memory and time of heavy processes with the size of their input sample.',
+    ),
     'multiqc_methods_description': NextflowParameter(
         type=typing.Optional[str],
         default=None,
@@ -814,3 +948,13 @@ generated_parameters = {
     ),
 }
 
+# Inputs of the Latch workflow itself. They are shown with the pipeline
+# parameters but are not forwarded to Nextflow.
+workflow_parameters = {
+    'shards': NextflowParameter(
+        type=int,
+        default=1,
+        section_title='Latch execution options',
+        description='Number of shards of similar total FASTA size to split the samplesheet into, each run by its own Nextflow runtime. The cohort summaries of all shards are merged into reports/ of the output directory.',
+    ),
+}
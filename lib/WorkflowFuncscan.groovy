@@ -3,6 +3,7 @@
 //
 
 import nextflow.Nextflow
+import groovy.json.JsonSlurper
 import groovy.text.SimpleTemplateEngine
 
 class WorkflowFuncscan {
@@ -19,6 +20,133 @@ class WorkflowFuncscan {
         //}
     }
 
+    //
+    // Check whether a possibly gzipped file has no content, a gzipped empty file is not of size zero
+    //
+    public static Boolean isEmptyFile(file) {
+        if (file.isEmpty()) {
+            return true
+        }
+        if (!file.toString().endsWith('.gz')) {
+            return false
+        }
+        def stream = new java.util.zip.GZIPInputStream(file.newInputStream())
+        try {
+            return stream.read() == -1
+        } finally {
+            stream.close()
+        }
+    }
+
+    //
+    // Annotation tool, its version and parameters, the part of the annotation cache key that does not depend
+    // on the sample. Versions are those of the annotation module containers and must be updated with the modules.
+    //
+    public static String annotationCacheSettings(params) {
+        def tool_versions = [
+            prodigal  : '2.6.3',
+            pyrodigal : '2.1.0',
+            prokka    : '1.14.6',
+            bakta     : '1.9.3'
+        ]
+        def tool     = params.annotation_tool
+        // Multithreaded Pyrodigal gives the same predictions, an entry is valid for both
+        def settings = params
+            .findAll { name, value -> name.startsWith("annotation_${tool}_") && name != 'annotation_pyrodigal_multithreaded' }
+            .sort { it.key }
+            .collect { name, value -> "${name}=${value}" }
+
+        // Prodigal writes GBK only with --save_annotations, an entry without it cannot be restored with it
+        if ( tool == 'prodigal' ) settings << "save_annotations=${params.save_annotations}"
+
+        return ( [ "tool=${tool}", "version=${tool_versions[tool]}" ] + settings ).join(';').replace("'", '')
+    }
+
+    //
+    // Settings of the protein based AMP predictors that are run, the part of the AMP prediction cache key that
+    // does not depend on the protein. Versions are those of the module containers and must be updated with the modules.
+    //
+    public static Map ampPredictionCacheSettings(params) {
+        def settings = [:]
+        if ( !params.amp_skip_amplify ) {
+            settings['amplify'] = "tool=amplify;version=1.1.0;model=balanced"
+        }
+        if ( !params.amp_skip_ampir ) {
+            settings['ampir'] = "tool=ampir;version=1.1.0;model=${params.amp_ampir_model};min_length=${params.amp_ampir_minlength};min_probability=0.0"
+        }
+        return settings
+    }
+
+    //
+    // Batches of at most batch_size [ meta, file ] entries, sorted by sample ID, for predictors that are run on the
+    // concatenated inputs of several samples. The batch meta holds the meta maps of its samples, the output file name
+    // stem of every sample (from the closure stem) and the summed contig statistics for resource scaling.
+    //
+    public static List predictorBatches(entries, batch_size, name, Closure stem) {
+        def sorted  = entries.sort(false) { a, b -> a[0].id <=> b[0].id }
+        def batches = []
+        sorted.collate(batch_size as int).eachWithIndex { batch, i ->
+            def metas = batch.collect { it[0] }
+            def meta  = [ id: "${name}_batch_${i + 1}".toString(), samples: metas, stems: batch.collect { stem(it[0], it[1]).toString() } ]
+            if ( metas.every { it.total_length != null } ) {
+                meta.total_length = metas.sum { it.total_length as Long }
+                meta.n_contigs    = metas.sum { ( it.n_contigs ?: 0 ) as Long }
+            }
+            batches << [ meta, batch.collect { it[1] } ]
+        }
+        return batches
+    }
+
+    //
+    // Path of a database parameter: the parameter if given, else the database of the parameter in the lockfile of
+    // --database_store (written by bin/funcscan_db.py), else null to download the database in the run
+    //
+    private static Map databaseStoreParams = [:]
+
+    public static String databasePath(params, String name) {
+        if ( params[name] ) {
+            return params[name]
+        }
+        if ( !params.database_store ) {
+            return null
+        }
+        def store = params.database_store.toString()
+        if ( !databaseStoreParams.containsKey(store) ) {
+            def lockfile = Nextflow.file("${store}/funcscan-db.lock")
+            if ( !lockfile.exists() ) {
+                Nextflow.error("No funcscan-db.lock in --database_store ${store}, fetch databases with: funcscan_db.py fetch --store ${store} <databases>")
+            }
+            def lock  = new JsonSlurper().parseText(lockfile.text)
+            def paths = [:]
+            lock.databases.each { db, entry ->
+                entry.params.each { param, relative ->
+                    paths[param] = Nextflow.file("${store}/${entry.path}/${relative}").normalize().toString()
+                }
+            }
+            databaseStoreParams[store] = paths
+        }
+        return databaseStoreParams[store][name]
+    }
+
+    //
+    // Settings and key of the antiSMASH database cache: the antiSMASH version and the URLs of the css, detection and
+    // modules tarballs, which pin a commit of nf-core/test-datasets
+    //
+    public static Map antismashDatabaseCacheKey(String version, List urls) {
+        def settings = ( [ "antismash-lite=${version}" ] + urls ).join(';')
+        def key      = java.security.MessageDigest.getInstance('SHA-256').digest(settings.getBytes('UTF-8')).encodeHex().toString()
+        return [ key: key, settings: settings ]
+    }
+
+    //
+    // Directory of a complete entry of the antiSMASH database cache (written by bin/antismash_database_cache.py), or
+    // null on a cache miss
+    //
+    public static String antismashDatabaseCacheEntry(String cache_dir, String key) {
+        def entry = Nextflow.file("${cache_dir}/${key}")
+        return entry.resolve('entry.json').exists() ? entry.toString() : null
+    }
+
     //
     // Get workflow summary for MultiQC
     //
@@ -54,7 +182,7 @@ class WorkflowFuncscan {
 
         // Can use ternary operators to dynamically construct based conditions, e.g. params["run_xyz"] ? "Tool (Foo et al. 2023)" : "",
         // Uncomment function in methodsDescriptionText to render in MultiQC report
-        def preprocessing_text = "The pipeline used the following tools: preprocessing included bioawk (Li 2023)."
+        def preprocessing_text = "The pipeline used the following tools: contig statistics were calculated with a script bundled with nf-core/funcscan."
 
         def annotation_text    = [
                 "Annotation was carried out with:",
@@ -108,7 +236,7 @@ class WorkflowFuncscan {
 
     public static String toolBibliographyText(params) {
 
-        def preprocessing_text = "<li>Li, H. (2023). bioawk: BWK awk modified for biological data. Github. Retrieved July 12, 2023, from <a href=\"https://github.com/lh3/bioawk\">https://github.com/lh3/bioawk</a></li>"
+        def preprocessing_text = ""
 
         def annotation_text    = [
                 params.annotation_tool == 'prodigal'  ? "<li>Hyatt, D., Chen, G. L., Locascio, P. F., Land, M. L., Larimer, F. W., & Hauser, L. J. (2010). Prodigal: prokaryotic gene recognition and translation initiation site identification. BMC bioinformatics, 11, 119. DOI: <a href=\"https://doi.org/10.1186/1471-2105-11-119\">10.1186/1471-2105-11-119</a>" : "",
@@ -0,0 +1,42 @@
+process AMP_PREDICTION_CACHE_LOOKUP {
+    label 'process_single'
+
+    conda "conda-forge::python=3.11.0"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.11' :
+        'biocontainers/python:3.11' }"
+
+    input:
+    val(samples)
+    path(faas, stageAs: 'input*/*')
+    val(tools)
+    val(settings)
+    val(cache_dir)
+
+    output:
+    path "missing/*.faa"                    , emit: missing, optional: true
+    path "amp_prediction_cache.stats.tsv"   , emit: stats
+    path "versions.yml"                     , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    def args = task.ext.args ?: ''
+    """
+    amp_prediction_cache.py \\
+        lookup \\
+        $args \\
+        --cache_dir $cache_dir \\
+        --faa $faas \\
+        --samples ${samples.join(' ')} \\
+        --tools ${tools.join(' ')} \\
+        --settings ${settings.collect { "'${it}'" }.join(' ')} \\
+        --outdir missing
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        amp_prediction_cache: \$(amp_prediction_cache.py --version | sed 's/amp_prediction_cache //g')
+    END_VERSIONS
+    """
+}
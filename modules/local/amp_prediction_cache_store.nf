@@ -0,0 +1,47 @@
+process AMP_PREDICTION_CACHE_STORE {
+    label 'process_single'
+
+    conda "conda-forge::python=3.11.0"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.11' :
+        'biocontainers/python:3.11' }"
+
+    input:
+    val(samples)
+    path(faas, stageAs: 'input*/*')
+    path(missing, stageAs: 'missing/*')
+    path(predictions, stageAs: 'predictions/*')
+    val(tools)
+    val(settings)
+    val(cache_dir)
+
+    output:
+    path "amplify/*/*.tsv"      , emit: amplify   , optional: true
+    path "ampir/*/*.ampir.tsv"  , emit: ampir     , optional: true
+    path "ampir/*/*.ampir.faa"  , emit: ampir_faa , optional: true
+    path "versions.yml"         , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    def missing_args     = missing ? "--missing ${missing}" : ''
+    def predictions_args = predictions ? "--predictions ${predictions}" : ''
+    """
+    amp_prediction_cache.py \\
+        store \\
+        --cache_dir $cache_dir \\
+        --faa $faas \\
+        --samples ${samples.join(' ')} \\
+        --tools ${tools.join(' ')} \\
+        --settings ${settings.collect { "'${it}'" }.join(' ')} \\
+        $missing_args \\
+        $predictions_args \\
+        --outdir .
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        amp_prediction_cache: \$(amp_prediction_cache.py --version | sed 's/amp_prediction_cache //g')
+    END_VERSIONS
+    """
+}
@@ -0,0 +1,35 @@
+process AMPCOMBI_MERGE {
+    label 'process_single'
+
+    conda "conda-forge::python=3.11.0"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.11' :
+        'biocontainers/python:3.11' }"
+
+    input:
+    val(samples)
+    path(summaries, stageAs: 'input*/*')
+
+    output:
+    path("*.csv.gz")     , emit: csv
+    path("*.index.tsv")  , emit: index
+    path "versions.yml"  , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    def prefix = task.ext.prefix ?: "ampcombi_complete_summary"
+    """
+    ampcombi_merge.py \\
+        merge \\
+        --input ${summaries.join(' ')} \\
+        --samples ${samples.join(' ')} \\
+        --prefix $prefix
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        ampcombi_merge: \$(ampcombi_merge.py --version | sed 's/ampcombi_merge //g')
+    END_VERSIONS
+    """
+}
@@ -0,0 +1,43 @@
+process ANNOTATION_CACHE_LOOKUP {
+    tag "$meta.id"
+    label 'process_single'
+
+    conda "conda-forge::python=3.11.0"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.11' :
+        'biocontainers/python:3.11' }"
+
+    input:
+    tuple val(meta), path(fasta)
+    val(settings)
+    val(cache_dir)
+
+    output:
+    tuple val(meta), path("restored/*.faa*")                          , emit: faa   , optional: true
+    tuple val(meta), path("restored/*.fna*")                          , emit: fna   , optional: true
+    tuple val(meta), path("restored/*.gff*")                          , emit: gff   , optional: true
+    tuple val(meta), path("restored/*.{gbk,gbff}*")                   , emit: gbk   , optional: true
+    tuple val(meta), path(fasta), path("*.annotation_cache.miss.tsv") , emit: miss  , optional: true
+    tuple val(meta), path("*.annotation_cache.*.tsv")                 , emit: report
+    path "versions.yml"                                               , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    def prefix = task.ext.prefix ?: "${meta.id}"
+    """
+    annotation_cache.py \\
+        lookup \\
+        --cache_dir $cache_dir \\
+        --fasta $fasta \\
+        --sample ${meta.id} \\
+        --settings '$settings' \\
+        --prefix $prefix
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        annotation_cache: \$(annotation_cache.py --version | sed 's/annotation_cache //g')
+    END_VERSIONS
+    """
+}
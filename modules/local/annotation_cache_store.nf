@@ -0,0 +1,37 @@
+process ANNOTATION_CACHE_STORE {
+    tag "$meta.id"
+    label 'process_single'
+
+    conda "conda-forge::python=3.11.0"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.11' :
+        'biocontainers/python:3.11' }"
+
+    input:
+    tuple val(meta), path(report), path(files, stageAs: 'annotation/*')
+    val(settings)
+    val(cache_dir)
+    val(max_size)
+
+    output:
+    path "versions.yml" , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    """
+    annotation_cache.py \\
+        store \\
+        --cache_dir $cache_dir \\
+        --report $report \\
+        --settings '$settings' \\
+        --max_size $max_size \\
+        $files
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        annotation_cache: \$(annotation_cache.py --version | sed 's/annotation_cache //g')
+    END_VERSIONS
+    """
+}
@@ -0,0 +1,38 @@
+process ANTISMASH_DATABASE_CACHE_STORE {
+    label 'process_single'
+
+    conda "conda-forge::python=3.11.0"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.11' :
+        'biocontainers/python:3.11' }"
+
+    input:
+    path(database)
+    path(directory)
+    path(tarballs, stageAs: 'tarballs/*')
+    val(key)
+    val(settings)
+    val(cache_dir)
+
+    output:
+    path "versions.yml" , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    """
+    antismash_database_cache.py \\
+        --cache_dir $cache_dir \\
+        --key $key \\
+        --settings '$settings' \\
+        --database $database \\
+        --directory $directory \\
+        $tarballs
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        antismash_database_cache: \$(antismash_database_cache.py --version | sed 's/antismash_database_cache //g')
+    END_VERSIONS
+    """
+}
@@ -18,10 +18,13 @@ process COMBGC {
     task.ext.when == null || task.ext.when
 
     script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    def args = task.ext.args ?: ''
     prefix = task.ext.prefix ?: "${meta.id}"
     """
     comBGC.py \\
+        $args \\
         -i $input_paths \\
+        --threads $task.cpus \\
         -o $prefix
 
     cat <<-END_VERSIONS > versions.yml
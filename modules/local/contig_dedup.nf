@@ -0,0 +1,38 @@
+process CONTIG_DEDUP {
+    label 'process_single'
+
+    conda "conda-forge::python=3.11.0"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.11' :
+        'biocontainers/python:3.11' }"
+
+    input:
+    val(samples)
+    path(fastas, stageAs: 'input*/*')
+    val(batch_size)
+
+    output:
+    path("*_batch_*.fasta")    , emit: fasta
+    path("*.contig_map.tsv")   , emit: map
+    path("*.dedup_stats.tsv")  , emit: stats
+    path "versions.yml"        , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    def prefix = task.ext.prefix ?: "dedup"
+    """
+    contig_dedup.py \\
+        dedup \\
+        --fasta ${fastas.join(' ')} \\
+        --samples ${samples.join(' ')} \\
+        --batch_size $batch_size \\
+        --prefix $prefix
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        contig_dedup: \$(contig_dedup.py --version | sed 's/contig_dedup //g')
+    END_VERSIONS
+    """
+}
@@ -0,0 +1,45 @@
+process CONTIG_FANOUT {
+    tag "$meta.id"
+    label 'process_single'
+
+    conda "conda-forge::python=3.11.0"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.11' :
+        'biocontainers/python:3.11' }"
+
+    input:
+    val(meta)
+    path(contig_map)
+    path(faa)
+    path(fna)
+    path(gff)
+
+    output:
+    tuple val(meta), path("*.faa.gz") , emit: faa
+    tuple val(meta), path("*.fna.gz") , emit: fna
+    tuple val(meta), path("*.gff.gz") , emit: gff
+    path "versions.yml"               , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    def args   = task.ext.args ?: ''
+    def prefix = task.ext.prefix ?: "${meta.id}"
+    """
+    contig_dedup.py \\
+        fanout \\
+        $args \\
+        --map $contig_map \\
+        --sample ${meta.id} \\
+        --faa $faa \\
+        --fna $fna \\
+        --gff $gff \\
+        --prefix $prefix
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        contig_dedup: \$(contig_dedup.py --version | sed 's/contig_dedup //g')
+    END_VERSIONS
+    """
+}
@@ -0,0 +1,43 @@
+process CONTIG_STATS {
+    tag "$meta.id"
+    label 'process_single'
+
+    conda "conda-forge::python=3.11.0"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.11' :
+        'biocontainers/python:3.11' }"
+
+    input:
+    tuple val(meta), path(fasta)
+    val(min_length) // Optional: drop shorter contigs before writing the uncompressed FASTA
+
+    output:
+    tuple val(meta), path("*.contig_stats.tsv")            , emit: stats
+    tuple val(meta), path("*.contig_length_histogram.tsv") , emit: histogram
+    tuple val(meta), path("filtered/*")                    , optional: true, emit: fasta
+    path "versions.yml"                                    , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    def prefix = task.ext.prefix ?: "${meta.id}"
+    // Compressed or filtered inputs are written uncompressed in the same pass, replacing a separate
+    // GUNZIP task. The output keeps the (uncompressed) input file name, so downstream output names do not change
+    def compressed = fasta.name.endsWith('.gz')
+    def filter     = min_length ? "--min_length ${min_length}" : ''
+    def plain      = ( min_length || compressed ) ? "--filtered filtered/${compressed ? fasta.baseName : fasta.name}" : ''
+    """
+    contig_stats.py \\
+        -i $fasta \\
+        -s ${meta.id} \\
+        -o $prefix \\
+        $filter \\
+        $plain
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        contig_stats: \$(contig_stats.py --version | sed 's/contig_stats //g')
+    END_VERSIONS
+    """
+}
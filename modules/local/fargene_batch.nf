@@ -0,0 +1,75 @@
+process FARGENE_BATCH {
+    tag "$meta.id"
+    label 'process_low'
+
+    // WARN: Version information not provided by tool on CLI. Please update version string below when bumping container versions.
+    conda "bioconda::fargene=0.1"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/fargene:0.1--py27h21c881e_4' :
+        'biocontainers/fargene:0.1--py27h21c881e_4' }"
+
+    input:
+    tuple val(meta), path(input)
+    val hmm_models
+
+    output:
+    tuple val(meta), path("*.log")                                                         , emit: log
+    tuple val(meta), path("*/results_summary.txt")                                         , emit: txt
+    tuple val(meta), path("*/hmmsearchresults/*.out")                      , optional: true, emit: hmm
+    tuple val(meta), path("*/predictedGenes/predicted-orfs.fasta")         , optional: true, emit: orfs
+    tuple val(meta), path("*/predictedGenes/predicted-orfs-amino.fasta")   , optional: true, emit: orfs_amino
+    tuple val(meta), path("*/predictedGenes/retrieved-contigs.fasta")      , optional: true, emit: contigs
+    tuple val(meta), path("*/predictedGenes/retrieved-contigs-peptides.fasta"), optional: true, emit: contigs_pept
+    tuple val(meta), path("*/predictedGenes/*filtered.fasta")              , optional: true, emit: filtered
+    tuple val(meta), path("*/predictedGenes/*filtered-peptides.fasta")     , optional: true, emit: filtered_pept
+    tuple val(meta), path("tmpdir/*.fasta")                                , optional: true, emit: metagenome
+    tuple val(meta), path("tmpdir/*.out")                                  , optional: true, emit: tmp
+    tuple val(meta), path("${meta.id}.fargene_batch.tsv")                                  , emit: timing
+    tuple val(meta), path("${meta.id}.fargene_batch_summary.tsv")                          , emit: summary
+    path "versions.yml"                                                                    , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script:
+    def args = task.ext.args ?: ''
+    def VERSION = '0.1' // WARN: Version information not provided by tool on CLI. Please update this string when bumping container versions.
+    """
+    ## All classes share one tmpdir and --store-peptides, so the six-frame translation
+    ## of the input is done by the first class only and reused by all following classes.
+    printf "hmm_class\\tseconds\\n" > ${meta.id}.fargene_batch.tsv
+
+    for hmm_class in ${hmm_models.join(' ')}; do
+        start=\$SECONDS
+
+        fargene \\
+            $args \\
+            -p $task.cpus \\
+            -i $input \\
+            --hmm-model \$hmm_class \\
+            --tmp-dir tmpdir \\
+            --store-peptides \\
+            --logfile ${meta.id}-\${hmm_class}.log \\
+            -o \$hmm_class
+
+        printf "%s\\t%s\\n" \$hmm_class \$(( SECONDS - start )) >> ${meta.id}.fargene_batch.tsv
+    done
+
+    ## The first class also pays for the translation, its surplus over the fastest other class is
+    ## an estimate of the translation time, which one task per class would spend once per class.
+    awk -F '\t' -v OFS='\t' -v sample=${meta.id} -v cpus=$task.cpus '
+        NR == 2 { first = \$2 }
+        NR > 2  { if (fastest == "" || \$2 < fastest) fastest = \$2 }
+        END {
+            classes = NR - 1
+            translation = (fastest == "" || first < fastest) ? 0 : first - fastest
+            print "sample", "classes", "translation_seconds", "saved_cpu_seconds"
+            print sample, classes, translation, translation * (classes - 1) * cpus
+        }' ${meta.id}.fargene_batch.tsv > ${meta.id}.fargene_batch_summary.tsv
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        fargene: $VERSION
+    END_VERSIONS
+    """
+}
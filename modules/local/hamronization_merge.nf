@@ -0,0 +1,43 @@
+process HAMRONIZATION_MERGE {
+    label 'process_low'
+
+    conda "conda-forge::python=3.11.0"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.11' :
+        'biocontainers/python:3.11' }"
+
+    input:
+    path(reports, stageAs: 'input*/*')
+    val(format)
+    path(existing_summary, stageAs: 'existing/*')
+
+    output:
+    path("hamronization_combined_report.json") , optional: true, emit: json
+    path("hamronization_combined_report.jsonl"), optional: true, emit: jsonl
+    path("hamronization_combined_report.tsv")  , optional: true, emit: tsv
+    path "versions.yml"                        , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    def args = task.ext.args ?: ''
+    def append = existing_summary ? "--append ${existing_summary}" : ""
+    // The report list is written by the shell builtin, tens of thousands of paths exceed the argument limit of a command
+    """
+    printf '%s\\n' ${reports.join(' ')} > reports.txt
+
+    hamronization_merge.py \\
+        --report_list reports.txt \\
+        --format ${format} \\
+        --threads ${task.cpus} \\
+        $append \\
+        $args \\
+        --output hamronization_combined_report.${format}
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        hamronization_merge: \$(hamronization_merge.py --version | sed 's/hamronization_merge //g')
+    END_VERSIONS
+    """
+}
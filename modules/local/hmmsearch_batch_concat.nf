@@ -0,0 +1,31 @@
+process HMMSEARCH_BATCH_CONCAT {
+    label 'process_single'
+
+    conda "conda-forge::python=3.11.0"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.11' :
+        'biocontainers/python:3.11' }"
+
+    input:
+    path(hmms)
+
+    output:
+    path("batch_models.hmm") , emit: hmm
+    path("batch_models.tsv") , emit: models
+    path "versions.yml"      , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    """
+    hmmsearch_batch.py \\
+        concat \\
+        $hmms
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        hmmsearch_batch: \$(hmmsearch_batch.py --version | sed 's/hmmsearch_batch //g')
+    END_VERSIONS
+    """
+}
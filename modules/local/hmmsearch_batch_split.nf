@@ -0,0 +1,38 @@
+process HMMSEARCH_BATCH_SPLIT {
+    tag "$meta.id"
+    label 'process_single'
+
+    conda "conda-forge::python=3.11.0"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.11' :
+        'biocontainers/python:3.11' }"
+
+    input:
+    tuple val(meta), path(results)
+    path(models)
+
+    output:
+    tuple val(meta), path("${prefix}_*.txt.gz")    , emit: output
+    tuple val(meta), path("${prefix}_*.sto.gz")    , emit: alignments    , optional: true
+    tuple val(meta), path("${prefix}_*.tbl.gz")    , emit: target_summary, optional: true
+    tuple val(meta), path("${prefix}_*.domtbl.gz") , emit: domain_summary, optional: true
+    path "versions.yml"                            , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    prefix = task.ext.prefix ?: "${meta.id}"
+    """
+    hmmsearch_batch.py \\
+        split \\
+        --models $models \\
+        --prefix $prefix \\
+        $results
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        hmmsearch_batch: \$(hmmsearch_batch.py --version | sed 's/hmmsearch_batch //g')
+    END_VERSIONS
+    """
+}
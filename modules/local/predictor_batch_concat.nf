@@ -0,0 +1,38 @@
+process PREDICTOR_BATCH_CONCAT {
+    tag "$meta.id"
+    label 'process_single'
+
+    conda "conda-forge::python=3.11.0"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.11' :
+        'biocontainers/python:3.11' }"
+
+    input:
+    tuple val(meta), path(fastas, stageAs: 'input*/*')
+    val(extension)
+
+    output:
+    tuple val(meta), path("${prefix}.${extension}") , emit: fasta
+    tuple val(meta), path("${prefix}.tags.tsv")     , emit: tags
+    path "versions.yml"                             , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    prefix = task.ext.prefix ?: "${meta.id}"
+    """
+    predictor_batch.py \\
+        concat \\
+        --input $fastas \\
+        --samples ${meta.samples.collect { it.id }.join(' ')} \\
+        --stems ${meta.stems.join(' ')} \\
+        --output ${prefix}.${extension} \\
+        --tags ${prefix}.tags.tsv
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        predictor_batch: \$(predictor_batch.py --version | sed 's/predictor_batch //g')
+    END_VERSIONS
+    """
+}
@@ -0,0 +1,36 @@
+process PREDICTOR_BATCH_SPLIT {
+    tag "$meta.id"
+    label 'process_single'
+
+    conda "conda-forge::python=3.11.0"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.11' :
+        'biocontainers/python:3.11' }"
+
+    input:
+    tuple val(meta), val(batch_stem), path(tags), path(files, stageAs: 'batch/*')
+
+    output:
+    tuple val(meta), path("${prefix}/*") , emit: files
+    path "versions.yml"                  , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    prefix = task.ext.prefix ?: "${meta.id}"
+    """
+    predictor_batch.py \\
+        split \\
+        --tags $tags \\
+        --sample ${meta.id} \\
+        --batch_stem $batch_stem \\
+        --outdir $prefix \\
+        $files
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        predictor_batch: \$(predictor_batch.py --version | sed 's/predictor_batch //g')
+    END_VERSIONS
+    """
+}
@@ -0,0 +1,44 @@
+process PYHMMER_SEARCH {
+    tag "$meta.id"
+    label 'process_medium'
+
+    // pyhmmer is taken from the GECCO container that is already used for BGC screening
+    conda "bioconda::gecco=0.9.8"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/gecco:0.9.8--pyhdfd78af_0':
+        'biocontainers/gecco:0.9.8--pyhdfd78af_0' }"
+
+    input:
+    tuple val(meta), path(faa)
+    path(hmms)
+    val(write_align)
+
+    output:
+    tuple val(meta), path("*.tbl.gz")    , emit: target_summary
+    tuple val(meta), path("*.domtbl.gz") , emit: domain_summary
+    tuple val(meta), path("*.sto.gz")    , emit: alignments    , optional: true
+    path "versions.yml"                  , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    def args   = task.ext.args ?: ''
+    def prefix = task.ext.prefix ?: "${meta.id}"
+    def alignment = write_align ? '--alignments' : ''
+    """
+    pyhmmer_search.py \\
+        $args \\
+        --cpus $task.cpus \\
+        $alignment \\
+        --hmm $hmms \\
+        --faa $faa \\
+        --prefix $prefix
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        pyhmmer_search: \$(pyhmmer_search.py --version | sed 's/pyhmmer_search //g')
+        pyhmmer: \$(python -c "import pyhmmer; print(pyhmmer.__version__)")
+    END_VERSIONS
+    """
+}
@@ -0,0 +1,40 @@
+process SHARD_CONTIGS {
+    tag "$meta.id"
+    label 'process_single'
+
+    conda "conda-forge::python=3.11.0"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.11' :
+        'biocontainers/python:3.11' }"
+
+    input:
+    tuple val(meta), path(fasta), path(gff), path(gbk)
+
+    output:
+    tuple val(meta), path("*_shard_*.fasta")   , emit: fasta
+    tuple val(meta), path("*_shard_*.gff")     , optional: true, emit: gff
+    tuple val(meta), path("*_shard_*.gbk")     , optional: true, emit: gbk
+    tuple val(meta), path("*.shard_stats.tsv") , emit: stats
+    path "versions.yml"                        , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    def prefix   = task.ext.prefix ?: "${meta.id}"
+    def gff_flag = gff ? "--gff ${gff}" : ""
+    def gbk_flag = gbk ? "--gbk ${gbk}" : ""
+    """
+    shard_contigs.py \\
+        --fasta $fasta \\
+        $gff_flag \\
+        $gbk_flag \\
+        --shards ${meta.shards} \\
+        --prefix $prefix
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        shard_contigs: \$(shard_contigs.py --version | sed 's/shard_contigs //g')
+    END_VERSIONS
+    """
+}
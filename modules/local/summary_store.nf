@@ -0,0 +1,41 @@
+process SUMMARY_STORE {
+    label 'process_single'
+
+    conda "conda-forge::python=3.11.0"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.11' :
+        'biocontainers/python:3.11' }"
+
+    input:
+    path(ampcombi, stageAs: 'amp/*')
+    path(hamronization, stageAs: 'arg/*')
+    path(combgc, stageAs: 'bgc/*')
+    val(samples)
+
+    output:
+    path("*.sqlite")     , emit: sqlite
+    path "versions.yml"  , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script: // This script is bundled with the pipeline, in nf-core/funcscan/bin/
+    def prefix = task.ext.prefix ?: "funcscan_summary"
+    def amp_arg = ampcombi ? "--ampcombi ${ampcombi}" : ""
+    def arg_arg = hamronization ? "--hamronization ${hamronization}" : ""
+    def bgc_arg = combgc ? "--combgc ${combgc}" : ""
+    """
+    summary_store.py \\
+        load \\
+        $amp_arg \\
+        $arg_arg \\
+        $bgc_arg \\
+        --samples ${samples.join(' ')} \\
+        --output ${prefix}.sqlite
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        summary_store: \$(summary_store.py --version | sed 's/summary_store //g')
+    END_VERSIONS
+    """
+}
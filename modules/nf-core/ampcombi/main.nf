@@ -33,11 +33,17 @@ process AMPCOMBI {
     def args = task.ext.args ?: ''
     def prefix = task.ext.prefix ?: "${meta.id}"
     def db = opt_amp_db? "--amp_database $opt_amp_db": ""
-    def faa = faa_input.isDirectory() ? "--faa ${faa_input}/" : "--faa ${faa_input}"
+    def faa = faa_input.isDirectory() ? "--faa ${faa_input}/" : "--faa ${faa_input.toString() - '.gz'}"
     """
+    for input in ${amp_input.join(' ')} ${faa_input}; do
+        if [[ \$input == *.gz ]]; then
+            gzip -cdf \$input > \${input%.gz}
+        fi
+    done
+
     ampcombi \\
         $args \\
-        --path_list '${amp_input.collect{"$it"}.join("' '")}' \\
+        --path_list '${amp_input.collect{ it.toString() - '.gz' }.join("' '")}' \\
         --sample_list ${prefix} \\
         --log True \\
         --threads ${task.cpus} \\
@@ -27,7 +27,7 @@ process AMPLIFY_PREDICT {
     AMPlify \\
         $args \\
         ${custom_model_dir} \\
-        -s '${faa}'
+        -s <(gzip -cdf '${faa}')
 
     #rename output, because tool includes date and time in name
     mv *.tsv ${prefix}.tsv
@@ -30,11 +30,16 @@ process DEEPARG_PREDICT {
     def args = task.ext.args ?: ''
     def prefix = task.ext.prefix ?: "${meta.id}"
     def VERSION='1.0.2' // WARN: Version information not provided by tool on CLI. Please update this string when bumping container versions.
+    def input = fasta.toString() - '.gz'
     """
+    if [[ $fasta == *.gz ]]; then
+        gzip -cdf $fasta > $input
+    fi
+
     deeparg \\
         predict \\
         $args \\
-        -i $fasta \\
+        -i $input \\
         -o ${prefix} \\
         -d $db \\
         --model $model
@@ -4,12 +4,22 @@
 
 include { MACREL_CONTIGS                                            } from '../../modules/nf-core/macrel/contigs/main'
 include { HMMER_HMMSEARCH as AMP_HMMER_HMMSEARCH                    } from '../../modules/nf-core/hmmer/hmmsearch/main'
+include { HMMER_HMMSEARCH as AMP_HMMER_HMMSEARCHBATCH               } from '../../modules/nf-core/hmmer/hmmsearch/main'
+include { HMMSEARCH_BATCH_CONCAT as AMP_HMMSEARCH_BATCH_CONCAT      } from '../../modules/local/hmmsearch_batch_concat'
+include { HMMSEARCH_BATCH_SPLIT as AMP_HMMSEARCH_BATCH_SPLIT        } from '../../modules/local/hmmsearch_batch_split'
+include { PYHMMER_SEARCH as AMP_PYHMMER_SEARCH                      } from '../../modules/local/pyhmmer_search'
 include { AMPLIFY_PREDICT                                           } from '../../modules/nf-core/amplify/predict/main'
 include { AMPIR                                                     } from '../../modules/nf-core/ampir/main'
+include { AMPLIFY_PREDICT as AMPLIFY_PREDICT_CACHEMISS              } from '../../modules/nf-core/amplify/predict/main'
+include { AMPLIFY_PREDICT as AMPLIFY_PREDICT_BATCH                  } from '../../modules/nf-core/amplify/predict/main'
+include { PREDICTOR_BATCH_CONCAT as AMPLIFY_BATCH_CONCAT            } from '../../modules/local/predictor_batch_concat'
+include { PREDICTOR_BATCH_SPLIT as AMPLIFY_BATCH_SPLIT              } from '../../modules/local/predictor_batch_split'
+include { AMPIR as AMPIR_CACHEMISS                                  } from '../../modules/nf-core/ampir/main'
+include { AMP_PREDICTION_CACHE_LOOKUP                               } from '../../modules/local/amp_prediction_cache_lookup'
+include { AMP_PREDICTION_CACHE_STORE                                } from '../../modules/local/amp_prediction_cache_store'
 include { DRAMP_DOWNLOAD                                            } from '../../modules/local/dramp_download'
 include { AMPCOMBI                                                  } from '../../modules/nf-core/ampcombi/main'
-include { GUNZIP as GUNZIP_MACREL_PRED ; GUNZIP as GUNZIP_HMMER  ; GUNZIP as GUNZIP_MACREL_ORFS } from '../../modules/nf-core/gunzip/main'
-include { TABIX_BGZIP                                               } from '../../modules/nf-core/tabix/bgzip/main'
+include { AMPCOMBI_MERGE                                            } from '../../modules/local/ampcombi_merge'
 
 workflow AMP {
     take:
@@ -25,38 +35,126 @@ workflow AMP {
     // When adding new tool that requires FAA, make sure to update conditions
     // in funcscan.nf around annotation and AMP subworkflow execution
     // to ensure annotation is executed!
+    // FAA files may be gzipped: hmmsearch and ampir read them directly, AMPlify streams
+    // them through process substitution and AMPcombi decompresses them in its own task.
     ch_faa_for_amplify          = faa
     ch_faa_for_amp_hmmsearch    = faa
     ch_faa_for_ampir            = faa
     ch_faa_for_ampcombi         = faa
 
+    // With the AMP prediction cache, AMPlify and ampir are run below on the proteins missing from the cache
+    amp_prediction_cache_settings = params.amp_prediction_cache_dir ? WorkflowFuncscan.ampPredictionCacheSettings(params) : [:]
+
     // AMPLIFY
-    if ( !params.amp_skip_amplify ) {
-        AMPLIFY_PREDICT ( ch_faa_for_amplify, [] )
-        ch_versions                 = ch_versions.mix(AMPLIFY_PREDICT.out.versions)
-        ch_ampresults_for_ampcombi  = ch_ampresults_for_ampcombi.mix(AMPLIFY_PREDICT.out.tsv)
+    if ( !params.amp_skip_amplify && !amp_prediction_cache_settings ) {
+        if ( params.amp_amplify_batchsize > 1 ) {
+            // Samples are concatenated to batches with sample-tagged protein names, so that AMPlify loads
+            // its models once per batch, and the results are split back per sample
+            ch_amplify_batches = ch_faa_for_amplify
+                .toList()
+                .flatMap { entries -> WorkflowFuncscan.predictorBatches(entries, params.amp_amplify_batchsize, 'amplify') { meta, faa -> meta.id } }
+
+            AMPLIFY_BATCH_CONCAT ( ch_amplify_batches, 'faa' )
+            ch_versions = ch_versions.mix(AMPLIFY_BATCH_CONCAT.out.versions)
+
+            AMPLIFY_PREDICT_BATCH ( AMPLIFY_BATCH_CONCAT.out.fasta, [] )
+            ch_versions = ch_versions.mix(AMPLIFY_PREDICT_BATCH.out.versions)
+
+            ch_amplify_batch_split_input = AMPLIFY_PREDICT_BATCH.out.tsv
+                .join( AMPLIFY_BATCH_CONCAT.out.tags )
+                .flatMap { meta, tsv, tags -> meta.samples.collect { sample -> [ sample, meta.id, tags, tsv ] } }
+
+            AMPLIFY_BATCH_SPLIT ( ch_amplify_batch_split_input )
+            ch_versions                 = ch_versions.mix(AMPLIFY_BATCH_SPLIT.out.versions)
+            ch_ampresults_for_ampcombi  = ch_ampresults_for_ampcombi.mix(AMPLIFY_BATCH_SPLIT.out.files)
+        } else {
+            AMPLIFY_PREDICT ( ch_faa_for_amplify, [] )
+            ch_versions                 = ch_versions.mix(AMPLIFY_PREDICT.out.versions)
+            ch_ampresults_for_ampcombi  = ch_ampresults_for_ampcombi.mix(AMPLIFY_PREDICT.out.tsv)
+        }
     }
 
     // MACREL
     if ( !params.amp_skip_macrel ) {
         MACREL_CONTIGS ( contigs )
         ch_versions                 = ch_versions.mix(MACREL_CONTIGS.out.versions)
-        GUNZIP_MACREL_PRED ( MACREL_CONTIGS.out.amp_prediction )
-        GUNZIP_MACREL_ORFS ( MACREL_CONTIGS.out.all_orfs )
-        ch_versions                 = ch_versions.mix(GUNZIP_MACREL_PRED.out.versions)
-        ch_versions                 = ch_versions.mix(GUNZIP_MACREL_ORFS.out.versions)
-        ch_ampresults_for_ampcombi  = ch_ampresults_for_ampcombi.mix(GUNZIP_MACREL_PRED.out.gunzip)
-        ch_macrel_faa               = ch_macrel_faa.mix(GUNZIP_MACREL_ORFS.out.gunzip)
+        // Gzipped outputs are decompressed by AMPCOMBI in its own task
+        ch_ampresults_for_ampcombi  = ch_ampresults_for_ampcombi.mix(MACREL_CONTIGS.out.amp_prediction)
+        ch_macrel_faa               = ch_macrel_faa.mix(MACREL_CONTIGS.out.all_orfs)
         ch_faa_for_ampcombi         = ch_faa_for_ampcombi.mix(ch_macrel_faa)
     }
 
     // AMPIR
-    if ( !params.amp_skip_ampir ) {
+    if ( !params.amp_skip_ampir && !amp_prediction_cache_settings ) {
         AMPIR ( ch_faa_for_ampir, params.amp_ampir_model, params.amp_ampir_minlength, 0.0 )
         ch_versions                 = ch_versions.mix(AMPIR.out.versions)
         ch_ampresults_for_ampcombi  = ch_ampresults_for_ampcombi.mix(AMPIR.out.amps_tsv)
     }
 
+    // AMP PREDICTION CACHE
+    // Predictions are cached per protein sequence, so proteins shared between samples or seen in an earlier run
+    // are predicted once. Per-sample tables are rebuilt from the cache as if the tool had run on the sample.
+    if ( amp_prediction_cache_settings ) {
+        amp_prediction_cache_dir   = file(params.amp_prediction_cache_dir).toString()
+        amp_prediction_cache_tools = amp_prediction_cache_settings.keySet().toList()
+        amp_prediction_cache_keys  = amp_prediction_cache_settings.values().toList()
+
+        ch_amp_prediction_cache_input = faa
+            .map { meta, faa -> [ meta.id, faa ] }
+            .toSortedList { a, b -> a[0] <=> b[0] }
+            .filter { it } // toSortedList emits an empty list without samples, skip the lookup then
+            .multiMap { faas ->
+                samples: faas.collect { it[0] }
+                faas:    faas.collect { it[1] }
+            }
+
+        AMP_PREDICTION_CACHE_LOOKUP ( ch_amp_prediction_cache_input.samples, ch_amp_prediction_cache_input.faas, amp_prediction_cache_tools, amp_prediction_cache_keys, amp_prediction_cache_dir )
+        ch_versions = ch_versions.mix(AMP_PREDICTION_CACHE_LOOKUP.out.versions)
+
+        // Batches of missing proteins are named <tool>.missing_<n>.faa
+        ch_amp_prediction_cache_missing = AMP_PREDICTION_CACHE_LOOKUP.out.missing
+            .flatten()
+            .map { batch -> [ [ id: batch.baseName ], batch ] }
+            .branch { meta, batch ->
+                amplify: meta.id.startsWith('amplify.')
+                ampir:   meta.id.startsWith('ampir.')
+            }
+
+        ch_amp_prediction_cache_predictions = Channel.empty()
+        if ( !params.amp_skip_amplify ) {
+            AMPLIFY_PREDICT_CACHEMISS ( ch_amp_prediction_cache_missing.amplify, [] )
+            ch_versions                         = ch_versions.mix(AMPLIFY_PREDICT_CACHEMISS.out.versions)
+            ch_amp_prediction_cache_predictions = ch_amp_prediction_cache_predictions.mix(AMPLIFY_PREDICT_CACHEMISS.out.tsv)
+        }
+        if ( !params.amp_skip_ampir ) {
+            AMPIR_CACHEMISS ( ch_amp_prediction_cache_missing.ampir, params.amp_ampir_model, params.amp_ampir_minlength, 0.0 )
+            ch_versions                         = ch_versions.mix(AMPIR_CACHEMISS.out.versions)
+            ch_amp_prediction_cache_predictions = ch_amp_prediction_cache_predictions.mix(AMPIR_CACHEMISS.out.amps_tsv)
+        }
+
+        AMP_PREDICTION_CACHE_STORE (
+            ch_amp_prediction_cache_input.samples,
+            ch_amp_prediction_cache_input.faas,
+            AMP_PREDICTION_CACHE_LOOKUP.out.missing.ifEmpty([]),
+            ch_amp_prediction_cache_predictions.map { meta, tsv -> tsv }.collect().ifEmpty([]),
+            amp_prediction_cache_tools,
+            amp_prediction_cache_keys,
+            amp_prediction_cache_dir
+        )
+        ch_versions = ch_versions.mix(AMP_PREDICTION_CACHE_STORE.out.versions)
+
+        // Rebuilt tables are written to <tool>/<sample>/, the sample of a table is its directory name
+        ch_amp_prediction_cache_meta = faa.map { meta, faa -> [ meta.id, meta ] }
+        ch_ampresults_for_ampcombi   = ch_ampresults_for_ampcombi.mix(
+            AMP_PREDICTION_CACHE_STORE.out.amplify
+                .mix(AMP_PREDICTION_CACHE_STORE.out.ampir)
+                .flatten()
+                .map { tsv -> [ tsv.parent.name, tsv ] }
+                .combine(ch_amp_prediction_cache_meta, by: 0)
+                .map { id, tsv, meta -> [ meta, tsv ] }
+        )
+    }
+
     // HMMSEARCH
     if ( !params.amp_skip_hmmsearch ) {
         if ( params.amp_hmmsearch_models ) { ch_amp_hmm_models = Channel.fromPath( params.amp_hmmsearch_models, checkIfExists: true ) } else { error('[nf-core/funcscan] error: hmm model files not found for --amp_hmmsearch_models! Please check input.') }
@@ -70,17 +168,46 @@ workflow AMP {
                 [ meta, file ]
             }
 
-        ch_in_for_amp_hmmsearch = ch_faa_for_amp_hmmsearch.combine(ch_amp_hmm_models_meta)
-            .map {
-                meta_faa, faa, meta_hmm, hmm ->
-                    def meta_new = [:]
-                    meta_new['id']     = meta_faa['id']
-                    meta_new['hmm_id'] = meta_hmm['id']
-                [ meta_new, hmm, faa, params.amp_hmmsearch_savealignments, params.amp_hmmsearch_savetargets, params.amp_hmmsearch_savedomains ]
-            }
-
-        AMP_HMMER_HMMSEARCH ( ch_in_for_amp_hmmsearch )
-        ch_versions = ch_versions.mix(AMP_HMMER_HMMSEARCH.out.versions)
+        if ( params.amp_hmmsearch_engine == 'pyhmmer' ) {
+            // All models are searched in one process per sample, results are written per model file
+            AMP_PYHMMER_SEARCH ( ch_faa_for_amp_hmmsearch, ch_amp_hmm_models.collect(), params.amp_hmmsearch_savealignments )
+            ch_versions = ch_versions.mix(AMP_PYHMMER_SEARCH.out.versions)
+        } else if ( params.amp_hmmsearch_batch ) {
+            // One hmmsearch per sample against all models, results are split back per model file afterwards
+            AMP_HMMSEARCH_BATCH_CONCAT ( ch_amp_hmm_models.collect() )
+            ch_versions = ch_versions.mix(AMP_HMMSEARCH_BATCH_CONCAT.out.versions)
+
+            ch_in_for_amp_hmmsearch = ch_faa_for_amp_hmmsearch.combine(AMP_HMMSEARCH_BATCH_CONCAT.out.hmm)
+                .map {
+                    meta_faa, faa, hmm ->
+                        def meta_new = [:]
+                        meta_new['id'] = meta_faa['id']
+                    [ meta_new, hmm, faa, params.amp_hmmsearch_savealignments, params.amp_hmmsearch_savetargets, params.amp_hmmsearch_savedomains ]
+                }
+
+            AMP_HMMER_HMMSEARCHBATCH ( ch_in_for_amp_hmmsearch )
+            ch_versions = ch_versions.mix(AMP_HMMER_HMMSEARCHBATCH.out.versions)
+
+            def n_outputs = 1 + [ params.amp_hmmsearch_savealignments, params.amp_hmmsearch_savetargets, params.amp_hmmsearch_savedomains ].count { it }
+            ch_in_for_amp_hmmsearch_split = AMP_HMMER_HMMSEARCHBATCH.out.output
+                .mix(AMP_HMMER_HMMSEARCHBATCH.out.alignments, AMP_HMMER_HMMSEARCHBATCH.out.target_summary, AMP_HMMER_HMMSEARCHBATCH.out.domain_summary)
+                .groupTuple(size: n_outputs)
+
+            AMP_HMMSEARCH_BATCH_SPLIT ( ch_in_for_amp_hmmsearch_split, AMP_HMMSEARCH_BATCH_CONCAT.out.models )
+            ch_versions = ch_versions.mix(AMP_HMMSEARCH_BATCH_SPLIT.out.versions)
+        } else {
+            ch_in_for_amp_hmmsearch = ch_faa_for_amp_hmmsearch.combine(ch_amp_hmm_models_meta)
+                .map {
+                    meta_faa, faa, meta_hmm, hmm ->
+                        def meta_new = [:]
+                        meta_new['id']     = meta_faa['id']
+                        meta_new['hmm_id'] = meta_hmm['id']
+                    [ meta_new, hmm, faa, params.amp_hmmsearch_savealignments, params.amp_hmmsearch_savetargets, params.amp_hmmsearch_savedomains ]
+                }
+
+            AMP_HMMER_HMMSEARCH ( ch_in_for_amp_hmmsearch )
+            ch_versions = ch_versions.mix(AMP_HMMER_HMMSEARCH.out.versions)
+        }
     }
 
     //AMPCOMBI
@@ -91,10 +218,11 @@ workflow AMP {
             input: [ it[0], it[1] ]
             faa: it[2]
         }
-    // Checks if `--amp_database` is a user supplied path and if the path does not exist it goes to default, which downloads the DRAMP database once.
-    if ( params.amp_ampcombi_db ) {
+    // Checks if `--amp_database` is a user supplied path or in the --database_store, if not it goes to default, which downloads the DRAMP database once.
+    def ampcombi_db = WorkflowFuncscan.databasePath(params, 'amp_ampcombi_db')
+    if ( ampcombi_db ) {
         ch_ampcombi_input_db = Channel
-                                    .fromPath( params.amp_ampcombi_db, checkIfExists: true ) }
+                                    .fromPath( ampcombi_db, checkIfExists: true ) }
     else {
         DRAMP_DOWNLOAD()
         ch_ampcombi_input_db = DRAMP_DOWNLOAD.out.db
@@ -104,18 +232,21 @@ workflow AMP {
     ch_ampcombi_summaries = ch_ampcombi_summaries.mix(AMPCOMBI.out.csv)
 
     //AMPCOMBI concatenation
-    ch_ampcombi_summaries_out = ch_ampcombi_summaries
-        .multiMap{
-                input: [ it[0] ]
-                summary: it[1]
+    // Summaries are streamed into one BGZF-compressed CSV, sorted by sample, with a per-sample index
+    ch_ampcombi_merge_input = ch_ampcombi_summaries
+        .map { meta, csv -> [ meta.id, csv ] }
+        .toSortedList { a, b -> a[0] <=> b[0] }
+        .filter { it } // toSortedList emits an empty list without summaries, skip the merge then
+        .multiMap { summaries ->
+            samples: summaries.collect { it[0] }
+            csvs:    summaries.collect { it[1] }
         }
-    
-    ch_tabix_input = Channel.of(['id':'ampcombi_complete_summary'])
-        .combine(ch_ampcombi_summaries_out.summary.collectFile(name: 'ampcombi_complete_summary.csv', keepHeader:true))
-    
-    TABIX_BGZIP(ch_tabix_input)
+
+    AMPCOMBI_MERGE ( ch_ampcombi_merge_input.samples, ch_ampcombi_merge_input.csvs )
+    ch_versions = ch_versions.mix(AMPCOMBI_MERGE.out.versions)
 
     emit:
     versions = ch_versions
+    summary  = AMPCOMBI_MERGE.out.csv // path(csv.gz)
 
 }
@@ -0,0 +1,75 @@
+/*
+    Annotate contigs that are shared between samples only once
+*/
+
+include { CONTIG_DEDUP                             } from '../../modules/local/contig_dedup'
+include { CONTIG_FANOUT                            } from '../../modules/local/contig_fanout'
+include { PRODIGAL as PRODIGAL_DEDUP               } from '../../modules/nf-core/prodigal/main'
+include { PYRODIGAL as PYRODIGAL_DEDUP             } from '../../modules/nf-core/pyrodigal/main'
+include { PYRODIGAL_GENES as PYRODIGAL_GENES_DEDUP } from '../../modules/local/pyrodigal_genes'
+
+workflow ANNOTATION_DEDUP {
+
+    take:
+    contigs // tuple val(meta), path(contigs)
+
+    main:
+    ch_versions = Channel.empty()
+
+    // Distinct contigs of all samples are written once to batches of --annotation_dedup_batchsize bp.
+    // Samples are sorted by ID so that batches, and therefore the cache, are stable between runs.
+    ch_dedup_input = contigs
+                        .map { meta, fasta -> [ meta.id, fasta ] }
+                        .toSortedList { a, b -> a[0] <=> b[0] }
+                        .multiMap { samples ->
+                            ids:    samples.collect { it[0] }
+                            fastas: samples.collect { it[1] }
+                        }
+
+    CONTIG_DEDUP ( ch_dedup_input.ids, ch_dedup_input.fastas, params.annotation_dedup_batchsize )
+    ch_versions = ch_versions.mix(CONTIG_DEDUP.out.versions)
+
+    ch_batches = CONTIG_DEDUP.out.fasta
+                    .flatten()
+                    .map { fasta -> [ [ id: fasta.baseName ], fasta ] }
+
+    if ( params.annotation_tool == "prodigal" ) {
+        PRODIGAL_DEDUP ( ch_batches, "gff" )
+        ch_versions   = ch_versions.mix(PRODIGAL_DEDUP.out.versions)
+        ch_batch_faa  = PRODIGAL_DEDUP.out.amino_acid_fasta
+        ch_batch_fna  = PRODIGAL_DEDUP.out.nucleotide_fasta
+        ch_batch_gff  = PRODIGAL_DEDUP.out.gene_annotations
+    } else if ( params.annotation_pyrodigal_multithreaded ) {
+        PYRODIGAL_GENES_DEDUP ( ch_batches )
+        ch_versions   = ch_versions.mix(PYRODIGAL_GENES_DEDUP.out.versions)
+        ch_batch_faa  = PYRODIGAL_GENES_DEDUP.out.faa
+        ch_batch_fna  = PYRODIGAL_GENES_DEDUP.out.fna
+        ch_batch_gff  = PYRODIGAL_GENES_DEDUP.out.gff
+    } else {
+        PYRODIGAL_DEDUP ( ch_batches )
+        ch_versions   = ch_versions.mix(PYRODIGAL_DEDUP.out.versions)
+        ch_batch_faa  = PYRODIGAL_DEDUP.out.faa
+        ch_batch_fna  = PYRODIGAL_DEDUP.out.fna
+        ch_batch_gff  = PYRODIGAL_DEDUP.out.gff
+    }
+
+    // Every sample gets back the predictions of its own contigs, as if annotated on its own
+    CONTIG_FANOUT (
+        contigs.map { meta, fasta -> meta },
+        CONTIG_DEDUP.out.map.first(),
+        ch_batch_faa.map { meta, faa -> faa }.collect(),
+        ch_batch_fna.map { meta, fna -> fna }.collect(),
+        ch_batch_gff.map { meta, gff -> gff }.collect()
+    )
+    ch_versions = ch_versions.mix(CONTIG_FANOUT.out.versions)
+
+    CONTIG_DEDUP.out.stats
+        .map { stats -> stats.splitCsv(header: true, sep: '\t')[0] }
+        .subscribe { stats -> log.info "[nf-core/funcscan] ${stats.unique_contigs} of ${stats.contigs} contigs are distinct (ratio ${stats.dedup_ratio}), annotation dedup saved an estimated ${String.format('%.1f', (stats.saved_fraction as Double) * 100)}% of annotation CPU" }
+
+    emit:
+    faa      = CONTIG_FANOUT.out.faa // tuple val(meta), path(faa)
+    fna      = CONTIG_FANOUT.out.fna // tuple val(meta), path(fna)
+    gff      = CONTIG_FANOUT.out.gff // tuple val(meta), path(gff)
+    versions = ch_versions
+}
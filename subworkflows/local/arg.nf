@@ -2,19 +2,24 @@
     Run ARG screening tools
 */
 
-include { ABRICATE_RUN                }  from '../../modules/nf-core/abricate/run/main'
-include { AMRFINDERPLUS_UPDATE        }  from '../../modules/nf-core/amrfinderplus/update/main'
-include { AMRFINDERPLUS_RUN           }  from '../../modules/nf-core/amrfinderplus/run/main'
-include { FARGENE                     }  from '../../modules/nf-core/fargene/main'
-include { DEEPARG_DOWNLOADDATA        }  from '../../modules/nf-core/deeparg/downloaddata/main'
-include { DEEPARG_PREDICT             }  from '../../modules/nf-core/deeparg/predict/main'
-include { RGI_MAIN                    }  from '../../modules/nf-core/rgi/main/main'
-include { HAMRONIZATION_ABRICATE      }  from '../../modules/nf-core/hamronization/abricate/main'
-include { HAMRONIZATION_RGI           }  from '../../modules/nf-core/hamronization/rgi/main'
-include { HAMRONIZATION_DEEPARG       }  from '../../modules/nf-core/hamronization/deeparg/main'
-include { HAMRONIZATION_AMRFINDERPLUS }  from '../../modules/nf-core/hamronization/amrfinderplus/main'
-include { HAMRONIZATION_FARGENE       }  from '../../modules/nf-core/hamronization/fargene/main'
-include { HAMRONIZATION_SUMMARIZE     }  from '../../modules/nf-core/hamronization/summarize/main'
+include { ABRICATE_RUN                                   }  from '../../modules/nf-core/abricate/run/main'
+include { AMRFINDERPLUS_UPDATE                           }  from '../../modules/nf-core/amrfinderplus/update/main'
+include { AMRFINDERPLUS_RUN                              }  from '../../modules/nf-core/amrfinderplus/run/main'
+include { FARGENE                                        }  from '../../modules/nf-core/fargene/main'
+include { FARGENE_BATCH                                  }  from '../../modules/local/fargene_batch'
+include { DEEPARG_DOWNLOADDATA                           }  from '../../modules/nf-core/deeparg/downloaddata/main'
+include { DEEPARG_PREDICT                                }  from '../../modules/nf-core/deeparg/predict/main'
+include { DEEPARG_PREDICT as DEEPARG_PREDICT_BATCH       }  from '../../modules/nf-core/deeparg/predict/main'
+include { PREDICTOR_BATCH_CONCAT as DEEPARG_BATCH_CONCAT }  from '../../modules/local/predictor_batch_concat'
+include { PREDICTOR_BATCH_SPLIT as DEEPARG_BATCH_SPLIT   }  from '../../modules/local/predictor_batch_split'
+include { RGI_MAIN                                       }  from '../../modules/nf-core/rgi/main/main'
+include { HAMRONIZATION_ABRICATE                         }  from '../../modules/nf-core/hamronization/abricate/main'
+include { HAMRONIZATION_RGI                              }  from '../../modules/nf-core/hamronization/rgi/main'
+include { HAMRONIZATION_DEEPARG                          }  from '../../modules/nf-core/hamronization/deeparg/main'
+include { HAMRONIZATION_AMRFINDERPLUS                    }  from '../../modules/nf-core/hamronization/amrfinderplus/main'
+include { HAMRONIZATION_FARGENE                          }  from '../../modules/nf-core/hamronization/fargene/main'
+include { HAMRONIZATION_SUMMARIZE                        }  from '../../modules/nf-core/hamronization/summarize/main'
+include { HAMRONIZATION_MERGE                            }  from '../../modules/local/hamronization_merge'
 
 workflow ARG {
     take:
@@ -29,11 +34,12 @@ workflow ARG {
 
     // AMRfinderplus run
         // Prepare channel for database
-    if ( !params.arg_skip_amrfinderplus && params.arg_amrfinderplus_db ) {
+    def amrfinderplus_db = WorkflowFuncscan.databasePath(params, 'arg_amrfinderplus_db')
+    if ( !params.arg_skip_amrfinderplus && amrfinderplus_db ) {
         ch_amrfinderplus_db = Channel
-            .fromPath( params.arg_amrfinderplus_db )
+            .fromPath( amrfinderplus_db )
             .first()
-    } else if ( !params.arg_skip_amrfinderplus && !params.arg_amrfinderplus_db ) {
+    } else if ( !params.arg_skip_amrfinderplus && !amrfinderplus_db ) {
         AMRFINDERPLUS_UPDATE( )
         ch_versions = ch_versions.mix(AMRFINDERPLUS_UPDATE.out.versions)
         ch_amrfinderplus_db = AMRFINDERPLUS_UPDATE.out.db
@@ -52,27 +58,47 @@ workflow ARG {
     // fARGene run
     if ( !params.arg_skip_fargene ) {
 
-        ch_fargene_classes = Channel.fromList( params.arg_fargene_hmmmodel.tokenize(',') )
+        if ( params.arg_fargene_batch ) {
+
+            // All classes in one task per sample, the input is translated once and reused by every class
+            FARGENE_BATCH ( contigs, params.arg_fargene_hmmmodel.tokenize(',') )
+            ch_versions = ch_versions.mix(FARGENE_BATCH.out.versions)
+            // Split the results per class, as in one task per class
+            ch_fargene_hmm = FARGENE_BATCH.out.hmm
+                                .transpose()
+                                .map { meta, hmm -> [ meta + [ hmm_class: hmm.parent.parent.name ], hmm ] }
+
+            FARGENE_BATCH.out.summary
+                .map { meta, summary -> summary.splitCsv(header: true, sep: '\t')[0].saved_cpu_seconds as Double }
+                .sum()
+                .subscribe { seconds -> log.info "[nf-core/funcscan] fARGene batch mode saved an estimated ${String.format('%.2f', seconds / 3600)} CPU hours of repeated translation" }
+
+        } else {
+
+            ch_fargene_classes = Channel.fromList( params.arg_fargene_hmmmodel.tokenize(',') )
+
+            ch_fargene_input = contigs
+                                .combine(ch_fargene_classes)
+                                .map {
+                                    meta, contigs, hmm_class ->
+                                        def meta_new = meta.clone()
+                                        meta_new['hmm_class'] = hmm_class
+                                    [ meta_new, contigs, hmm_class ]
+                                }
+                                .multiMap {
+                                    contigs: [ it[0], it[1] ]
+                                    hmmclass: it[2]
+                                }
+
+            FARGENE ( ch_fargene_input.contigs, ch_fargene_input.hmmclass )
+            ch_versions = ch_versions.mix(FARGENE.out.versions)
+            ch_fargene_hmm = FARGENE.out.hmm
 
-        ch_fargene_input = contigs
-                            .combine(ch_fargene_classes)
-                            .map {
-                                meta, contigs, hmm_class ->
-                                    def meta_new = meta.clone()
-                                    meta_new['hmm_class'] = hmm_class
-                                [ meta_new, contigs, hmm_class ]
-                            }
-                            .multiMap {
-                                contigs: [ it[0], it[1] ]
-                                hmmclass: it[2]
-                            }
-
-        FARGENE ( ch_fargene_input.contigs, ch_fargene_input.hmmclass )
-        ch_versions = ch_versions.mix(FARGENE.out.versions)
+        }
 
         // Reporting
         // Note: currently hardcoding versions, has to be updated with every fARGene-update
-        HAMRONIZATION_FARGENE ( FARGENE.out.hmm.transpose(), 'json', '0.1', '0.1' )
+        HAMRONIZATION_FARGENE ( ch_fargene_hmm.transpose(), 'json', '0.1', '0.1' )
         ch_versions = ch_versions.mix(HAMRONIZATION_FARGENE.out.versions)
         ch_input_to_hamronization_summarize = ch_input_to_hamronization_summarize.mix(HAMRONIZATION_FARGENE.out.json)
     }
@@ -90,11 +116,12 @@ workflow ARG {
     }
 
     // DeepARG prepare download
-    if ( !params.arg_skip_deeparg && params.arg_deeparg_data ) {
+    def deeparg_data = WorkflowFuncscan.databasePath(params, 'arg_deeparg_data')
+    if ( !params.arg_skip_deeparg && deeparg_data ) {
         ch_deeparg_db = Channel
-            .fromPath( params.arg_deeparg_data )
+            .fromPath( deeparg_data )
             .first()
-    } else if ( !params.arg_skip_deeparg && !params.arg_deeparg_data ) {
+    } else if ( !params.arg_skip_deeparg && !deeparg_data ) {
         DEEPARG_DOWNLOADDATA( )
         ch_versions = ch_versions.mix(DEEPARG_DOWNLOADDATA.out.versions)
         ch_deeparg_db = DEEPARG_DOWNLOADDATA.out.db
@@ -114,13 +141,41 @@ workflow ARG {
                 }
                 .set { ch_input_for_deeparg }
 
-        DEEPARG_PREDICT ( ch_input_for_deeparg, ch_deeparg_db )
-        ch_versions = ch_versions.mix(DEEPARG_PREDICT.out.versions)
+        if ( params.arg_deeparg_batchsize > 1 ) {
+            // Samples are concatenated to batches with sample-tagged protein names, so that DeepARG loads
+            // its model once per batch, and the results are split back per sample
+            ch_deeparg_batches = annotations
+                .toList()
+                .flatMap { entries -> WorkflowFuncscan.predictorBatches(entries, params.arg_deeparg_batchsize, 'deeparg') { meta, faa -> meta.id } }
+
+            DEEPARG_BATCH_CONCAT ( ch_deeparg_batches, 'faa' )
+            ch_versions = ch_versions.mix(DEEPARG_BATCH_CONCAT.out.versions)
+
+            DEEPARG_PREDICT_BATCH ( DEEPARG_BATCH_CONCAT.out.fasta.map { meta, faa -> [ meta, faa, params.arg_deeparg_model ] }, ch_deeparg_db )
+            ch_versions = ch_versions.mix(DEEPARG_PREDICT_BATCH.out.versions)
+
+            // The DIAMOND DAA file is binary and not split
+            ch_deeparg_batch_split_input = DEEPARG_PREDICT_BATCH.out.daa_tsv
+                .join( DEEPARG_PREDICT_BATCH.out.arg )
+                .join( DEEPARG_PREDICT_BATCH.out.potential_arg )
+                .join( DEEPARG_BATCH_CONCAT.out.tags )
+                .flatMap { meta, daa_tsv, arg, potential_arg, tags -> meta.samples.collect { sample -> [ sample, meta.id, tags, [ daa_tsv, arg, potential_arg ] ] } }
+
+            DEEPARG_BATCH_SPLIT ( ch_deeparg_batch_split_input )
+            ch_versions = ch_versions.mix(DEEPARG_BATCH_SPLIT.out.versions)
+
+            ch_deeparg_results = DEEPARG_BATCH_SPLIT.out.files
+                .flatMap { meta, files -> [ files ].flatten().findAll { it.name.endsWith('.ARG') }.collect { [ meta, it ] } }
+        } else {
+            DEEPARG_PREDICT ( ch_input_for_deeparg, ch_deeparg_db )
+            ch_versions = ch_versions.mix(DEEPARG_PREDICT.out.versions)
+            ch_deeparg_results = DEEPARG_PREDICT.out.arg.mix(DEEPARG_PREDICT.out.potential_arg)
+        }
 
         // Reporting
         // Note: currently hardcoding versions as unreported by DeepARG
         // Make sure to update on version bump.
-        HAMRONIZATION_DEEPARG ( DEEPARG_PREDICT.out.arg.mix(DEEPARG_PREDICT.out.potential_arg), 'json', '1.0.2', params.arg_deeparg_data_version )
+        HAMRONIZATION_DEEPARG ( ch_deeparg_results, 'json', '1.0.2', params.arg_deeparg_data_version )
         ch_versions = ch_versions.mix(HAMRONIZATION_DEEPARG.out.versions)
         ch_input_to_hamronization_summarize = ch_input_to_hamronization_summarize.mix(HAMRONIZATION_DEEPARG.out.json)
     }
@@ -142,9 +197,20 @@ workflow ARG {
         .collect()
         .set { ch_input_for_hamronization_summarize }
 
-    HAMRONIZATION_SUMMARIZE( ch_input_for_hamronization_summarize, params.arg_hamronization_summarizeformat )
-    ch_versions = ch_versions.mix(HAMRONIZATION_SUMMARIZE.out.versions)
+    // The interactive report needs hAMRonization itself, table formats are merged in parallel and with bounded memory
+    if ( params.arg_hamronization_summarizeformat == 'interactive' ) {
+        if ( params.arg_hamronization_appendsummary ) log.warn("[nf-core/funcscan] --arg_hamronization_appendsummary is ignored with the interactive hAMRonization summary format.")
+        HAMRONIZATION_SUMMARIZE( ch_input_for_hamronization_summarize, params.arg_hamronization_summarizeformat )
+        ch_versions = ch_versions.mix(HAMRONIZATION_SUMMARIZE.out.versions)
+        ch_hamronization_summary = Channel.empty()
+    } else {
+        ch_hamronization_existing = params.arg_hamronization_appendsummary ? file(params.arg_hamronization_appendsummary, checkIfExists: true) : []
+        HAMRONIZATION_MERGE( ch_input_for_hamronization_summarize, params.arg_hamronization_summarizeformat, ch_hamronization_existing )
+        ch_versions = ch_versions.mix(HAMRONIZATION_MERGE.out.versions)
+        ch_hamronization_summary = HAMRONIZATION_MERGE.out.tsv.mix(HAMRONIZATION_MERGE.out.json, HAMRONIZATION_MERGE.out.jsonl)
+    }
 
     emit:
     versions = ch_versions
+    summary  = ch_hamronization_summary // path(tsv, json or jsonl), not with the interactive format
 }
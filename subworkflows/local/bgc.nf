@@ -2,16 +2,48 @@
     Run BGC screening tools
 */
 
-include { UNTAR as UNTAR_CSS                       } from '../../modules/nf-core/untar/main'
-include { UNTAR as UNTAR_DETECTION                 } from '../../modules/nf-core/untar/main'
-include { UNTAR as UNTAR_MODULES                   } from '../../modules/nf-core/untar/main'
-include { ANTISMASH_ANTISMASHLITEDOWNLOADDATABASES } from '../../modules/nf-core/antismash/antismashlitedownloaddatabases/main'
-include { ANTISMASH_ANTISMASHLITE                  } from '../../modules/nf-core/antismash/antismashlite/main'
-include { GECCO_RUN                                } from '../../modules/nf-core/gecco/run/main'
-include { HMMER_HMMSEARCH as BGC_HMMER_HMMSEARCH   } from '../../modules/nf-core/hmmer/hmmsearch/main'
-include { DEEPBGC_DOWNLOAD                         } from '../../modules/nf-core/deepbgc/download/main'
-include { DEEPBGC_PIPELINE                         } from '../../modules/nf-core/deepbgc/pipeline/main'
-include { COMBGC                                   } from '../../modules/local/combgc'
+include { UNTAR as UNTAR_CSS                                   } from '../../modules/nf-core/untar/main'
+include { UNTAR as UNTAR_DETECTION                             } from '../../modules/nf-core/untar/main'
+include { UNTAR as UNTAR_MODULES                               } from '../../modules/nf-core/untar/main'
+include { ANTISMASH_ANTISMASHLITEDOWNLOADDATABASES             } from '../../modules/nf-core/antismash/antismashlitedownloaddatabases/main'
+include { ANTISMASH_DATABASE_CACHE_STORE                       } from '../../modules/local/antismash_database_cache_store'
+include { ANTISMASH_ANTISMASHLITE                              } from '../../modules/nf-core/antismash/antismashlite/main'
+include { GUNZIP as GUNZIP_ANTISMASH_GFF                       } from '../../modules/nf-core/gunzip/main'
+include { GECCO_RUN                                            } from '../../modules/nf-core/gecco/run/main'
+include { HMMER_HMMSEARCH as BGC_HMMER_HMMSEARCH               } from '../../modules/nf-core/hmmer/hmmsearch/main'
+include { HMMER_HMMSEARCH as BGC_HMMER_HMMSEARCHBATCH          } from '../../modules/nf-core/hmmer/hmmsearch/main'
+include { HMMSEARCH_BATCH_CONCAT as BGC_HMMSEARCH_BATCH_CONCAT } from '../../modules/local/hmmsearch_batch_concat'
+include { HMMSEARCH_BATCH_SPLIT as BGC_HMMSEARCH_BATCH_SPLIT   } from '../../modules/local/hmmsearch_batch_split'
+include { PYHMMER_SEARCH as BGC_PYHMMER_SEARCH                 } from '../../modules/local/pyhmmer_search'
+include { DEEPBGC_DOWNLOAD                                     } from '../../modules/nf-core/deepbgc/download/main'
+include { DEEPBGC_PIPELINE                                     } from '../../modules/nf-core/deepbgc/pipeline/main'
+include { DEEPBGC_PIPELINE as DEEPBGC_PIPELINE_BATCH           } from '../../modules/nf-core/deepbgc/pipeline/main'
+include { PREDICTOR_BATCH_CONCAT as DEEPBGC_BATCH_CONCAT       } from '../../modules/local/predictor_batch_concat'
+include { PREDICTOR_BATCH_SPLIT as DEEPBGC_BATCH_SPLIT         } from '../../modules/local/predictor_batch_split'
+include { COMBGC                                               } from '../../modules/local/combgc'
+include { SHARD_CONTIGS                                        } from '../../modules/local/shard_contigs'
+
+/*
+    Turn the shard files of one sample into one channel element per shard. A shard
+    keeps the meta map of its sample, with its own ID and contig statistics taken
+    from the SHARD_CONTIGS statistics file, and the sample meta map under `sample`
+    so that results can be grouped back per sample.
+*/
+def splitShards( meta, shards, stats, stats_extension ) {
+    def shard_stats = stats.splitCsv( header: true, sep: '\t' ).collectEntries { row -> [ (row.file): row ] }
+
+    [ shards ].flatten().collect { shard ->
+        def row = shard_stats[ "${shard.baseName}.${stats_extension}".toString() ]
+        def meta_shard = meta + [
+            id             : shard.baseName,
+            sample         : meta,
+            n_contigs      : row.contigs as Long,
+            total_length   : row.total_length as Long,
+            longest_contig : row.longest_contig as Long
+        ]
+        [ meta_shard, shard ]
+    }
+}
 
 workflow BGC {
 
@@ -25,6 +57,47 @@ workflow BGC {
     ch_versions              = Channel.empty()
     ch_bgcresults_for_combgc = Channel.empty()
 
+    ch_fna_for_bgc = fna
+    ch_gff_for_bgc = gff
+    ch_gbk_for_bgc = gbk
+
+    // SHARDING
+    // Samples larger than --bgc_shard_size are split into shards of intact contigs that are screened in parallel,
+    // results of antiSMASH, deepBGC and GECCO are grouped back per sample before comBGC.
+    if ( params.bgc_shard_contigs ) {
+        def n_shards = { meta -> Math.ceil( meta.total_length / params.bgc_shard_size ) as int }
+        def annotation_is_gbk = params.annotation_tool == 'prokka' || params.annotation_tool == 'bakta'
+
+        ch_input_for_sharding = fna
+            .join( annotation_is_gbk ? gbk : gff, remainder: true )
+            .filter {
+                meta, fasta, annotation ->
+                    fasta && n_shards(meta) > 1
+            }
+            .map {
+                meta, fasta, annotation ->
+                    def meta_sample = meta + [ shards: n_shards(meta) ]
+                    annotation_is_gbk ? [ meta_sample, fasta, [], annotation ?: [] ] : [ meta_sample, fasta, annotation ?: [], [] ]
+            }
+
+        SHARD_CONTIGS ( ch_input_for_sharding )
+        ch_versions = ch_versions.mix(SHARD_CONTIGS.out.versions)
+
+        ch_fna_shards = SHARD_CONTIGS.out.fasta
+            .join(SHARD_CONTIGS.out.stats)
+            .flatMap { meta, shards, stats -> splitShards( meta, shards, stats, 'fasta' ) }
+        ch_gff_shards = SHARD_CONTIGS.out.gff
+            .join(SHARD_CONTIGS.out.stats)
+            .flatMap { meta, shards, stats -> splitShards( meta, shards, stats, 'fasta' ) }
+        ch_gbk_shards = SHARD_CONTIGS.out.gbk
+            .join(SHARD_CONTIGS.out.stats)
+            .flatMap { meta, shards, stats -> splitShards( meta, shards, stats, 'gbk' ) }
+
+        ch_fna_for_bgc = fna.filter { meta, fasta -> n_shards(meta) <= 1 }.mix(ch_fna_shards)
+        ch_gff_for_bgc = gff.filter { meta, file -> n_shards(meta) <= 1 }.mix(ch_gff_shards)
+        ch_gbk_for_bgc = gbk.filter { meta, file -> n_shards(meta) <= 1 }.mix(ch_gbk_shards)
+    }
+
     // When adding new tool that requires FAA, make sure to update conditions
     // in funcscan.nf around annotation and AMP subworkflow execution
     // to ensure annotation is executed!
@@ -34,22 +107,43 @@ workflow BGC {
     if ( !params.bgc_skip_antismash ) {
         // Check whether user supplies database and/or antismash directory. If not, obtain them via the module antismashlite/antismashlitedownloaddatabases.
         // Important for future maintenance: For CI tests, only the "else" option below is used. Both options should be tested locally whenever the antiSMASH module gets updated.
-        if ( params.bgc_antismash_databases && params.bgc_antismash_installationdirectory ) {
+        def antismash_databases             = WorkflowFuncscan.databasePath(params, 'bgc_antismash_databases')
+        def antismash_installationdirectory = WorkflowFuncscan.databasePath(params, 'bgc_antismash_installationdirectory')
+
+        // May need to update on each new version of antismash-lite due to changes to scripts inside these tars
+        ch_css_for_antismash = "https://github.com/nf-core/test-datasets/raw/91bb8781c576967e23d2c5315dd4d43213575033/data/delete_me/antismash/css.tar.gz"
+        ch_detection_for_antismash = "https://github.com/nf-core/test-datasets/raw/91bb8781c576967e23d2c5315dd4d43213575033/data/delete_me/antismash/detection.tar.gz"
+        ch_modules_for_antismash = "https://github.com/nf-core/test-datasets/raw/91bb8781c576967e23d2c5315dd4d43213575033/data/delete_me/antismash/modules.tar.gz"
+        // Version of the container of the antismashlite/antismashlitedownloaddatabases module
+        antismash_lite_version = '6.1.1'
+
+        // Downloaded databases are cached by antiSMASH version and tarball URLs
+        antismash_cache       = WorkflowFuncscan.antismashDatabaseCacheKey( antismash_lite_version, [ ch_css_for_antismash, ch_detection_for_antismash, ch_modules_for_antismash ] )
+        antismash_cache_entry = params.bgc_antismash_cache_dir ? WorkflowFuncscan.antismashDatabaseCacheEntry( file(params.bgc_antismash_cache_dir).toString(), antismash_cache.key ) : null
+
+        if ( antismash_databases && antismash_installationdirectory ) {
 
             ch_antismash_databases = Channel
-                .fromPath( params.bgc_antismash_databases )
+                .fromPath( antismash_databases )
                 .first()
 
             ch_antismash_directory = Channel
-                .fromPath( params.bgc_antismash_installationdirectory )
+                .fromPath( antismash_installationdirectory )
                 .first()
 
-        } else {
+        } else if ( antismash_cache_entry ) {
 
-            // May need to update on each new version of antismash-lite due to changes to scripts inside these tars
-            ch_css_for_antismash = "https://github.com/nf-core/test-datasets/raw/91bb8781c576967e23d2c5315dd4d43213575033/data/delete_me/antismash/css.tar.gz"
-            ch_detection_for_antismash = "https://github.com/nf-core/test-datasets/raw/91bb8781c576967e23d2c5315dd4d43213575033/data/delete_me/antismash/detection.tar.gz"
-            ch_modules_for_antismash = "https://github.com/nf-core/test-datasets/raw/91bb8781c576967e23d2c5315dd4d43213575033/data/delete_me/antismash/modules.tar.gz"
+            log.info "[nf-core/funcscan] Using the antiSMASH databases cached in ${antismash_cache_entry}"
+
+            ch_antismash_databases = Channel
+                .fromPath( "${antismash_cache_entry}/antismash_db", type: 'dir' )
+                .first()
+
+            ch_antismash_directory = Channel
+                .fromPath( "${antismash_cache_entry}/antismash_dir", type: 'dir' )
+                .first()
+
+        } else {
 
             UNTAR_CSS ( [ [], ch_css_for_antismash ] )
             ch_versions = ch_versions.mix(UNTAR_CSS.out.versions)
@@ -66,11 +160,34 @@ workflow BGC {
 
             ch_antismash_directory = ANTISMASH_ANTISMASHLITEDOWNLOADDATABASES.out.antismash_dir
 
+            if ( params.bgc_antismash_cache_dir ) {
+                ANTISMASH_DATABASE_CACHE_STORE (
+                    ch_antismash_databases,
+                    ch_antismash_directory,
+                    [ file(ch_css_for_antismash), file(ch_detection_for_antismash), file(ch_modules_for_antismash) ],
+                    antismash_cache.key,
+                    antismash_cache.settings,
+                    file(params.bgc_antismash_cache_dir).toString()
+                )
+                ch_versions = ch_versions.mix(ANTISMASH_DATABASE_CACHE_STORE.out.versions)
+            }
+
         }
 
         if ( params.annotation_tool == 'prodigal' || params.annotation_tool == "pyrodigal" ) {
 
-            ch_antismash_input = fna.join(gff, by: 0)
+            // Annotations stay gzipped up to here, antiSMASH is the only consumer that needs an uncompressed GFF
+            ch_gff_for_antismash = ch_gff_for_bgc
+                                    .branch {
+                                        meta, gff ->
+                                            compressed: gff.toString().endsWith('.gz')
+                                            uncompressed: true
+                                    }
+
+            GUNZIP_ANTISMASH_GFF ( ch_gff_for_antismash.compressed )
+            ch_versions = ch_versions.mix(GUNZIP_ANTISMASH_GFF.out.versions)
+
+            ch_antismash_input = ch_fna_for_bgc.join(GUNZIP_ANTISMASH_GFF.out.gunzip.mix(ch_gff_for_antismash.uncompressed), by: 0)
                                     .filter {
                                         meta, fna, gff ->
                                             if ( meta.longest_contig < params.bgc_antismash_sampleminlength ) log.warn "[nf-core/funcscan] Sample does not have any contig reaching min. length threshold of --bgc_antismash_sampleminlength ${params.bgc_antismash_sampleminlength}. Antismash will not be run for sample: ${meta.id}."
@@ -86,7 +203,7 @@ workflow BGC {
 
         } else if ( params.annotation_tool == 'prokka' ) {
 
-            ch_antismash_input = gbk.filter {
+            ch_antismash_input = ch_gbk_for_bgc.filter {
                                         meta, files ->
                                             if ( meta.longest_contig < params.bgc_antismash_sampleminlength ) log.warn "[nf-core/funcscan] Sample does not have any contig reaching min. length threshold of --bgc_antismash_sampleminlength ${params.bgc_antismash_sampleminlength}. Antismash will not be run for sample: ${meta.id}."
                                             meta.longest_contig >= params.bgc_antismash_sampleminlength
@@ -96,7 +213,7 @@ workflow BGC {
 
         } else if ( params.annotation_tool == 'bakta' ) {
 
-            ch_antismash_input = gbk.filter {
+            ch_antismash_input = ch_gbk_for_bgc.filter {
                                         meta, files ->
                                             if ( meta.longest_contig < params.bgc_antismash_sampleminlength ) log.warn "[nf-core/funcscan] Sample does not have any contig reaching min. length threshold of --bgc_antismash_sampleminlength ${params.bgc_antismash_sampleminlength}. Antismash will not be run for sample: ${meta.id}."
                                             meta.longest_contig >= params.bgc_antismash_sampleminlength
@@ -107,8 +224,10 @@ workflow BGC {
         }
 
         ch_versions = ch_versions.mix(ANTISMASH_ANTISMASHLITE.out.versions)
-        ch_antismashresults_for_combgc = ANTISMASH_ANTISMASHLITE.out.knownclusterblast_dir
+        // knownclusterblast files rather than directories, so that the results of several shards can be staged together
+        ch_antismashresults_for_combgc = ANTISMASH_ANTISMASHLITE.out.knownclusterblast_txt
             .mix(ANTISMASH_ANTISMASHLITE.out.gbk_input)
+            .map { meta, files -> [ meta.sample ?: meta, files ] }
             .groupTuple()
             .map{
                 meta, files ->
@@ -119,10 +238,11 @@ workflow BGC {
 
     // DEEPBGC
     if ( !params.bgc_skip_deepbgc ) {
-        if ( params.bgc_deepbgc_database ) {
+        def deepbgc_database = WorkflowFuncscan.databasePath(params, 'bgc_deepbgc_database')
+        if ( deepbgc_database ) {
 
             ch_deepbgc_database = Channel
-                .fromPath( params.bgc_deepbgc_database )
+                .fromPath( deepbgc_database )
                 .first()
         } else {
             DEEPBGC_DOWNLOAD()
@@ -130,14 +250,57 @@ workflow BGC {
             ch_versions = ch_versions.mix(DEEPBGC_DOWNLOAD.out.versions)
         }
 
-        DEEPBGC_PIPELINE ( fna, ch_deepbgc_database)
-        ch_versions = ch_versions.mix(DEEPBGC_PIPELINE.out.versions)
-        ch_bgcresults_for_combgc = ch_bgcresults_for_combgc.mix(DEEPBGC_PIPELINE.out.bgc_tsv)
+        // Batches are only valid if every contig is treated independently, i.e. Prodigal in metagenome mode
+        def deepbgc_batchsize = params.bgc_deepbgc_prodigalsinglemode ? 1 : params.bgc_deepbgc_batchsize
+        if ( params.bgc_deepbgc_prodigalsinglemode && params.bgc_deepbgc_batchsize > 1 ) log.warn "[nf-core/funcscan] --bgc_deepbgc_batchsize is ignored with --bgc_deepbgc_prodigalsinglemode, DeepBGC is run per sample."
+
+        if ( deepbgc_batchsize > 1 ) {
+            // Samples are concatenated to batches with sample-tagged contig names, so that DeepBGC loads
+            // its models once per batch, and the results are split back per sample
+            ch_deepbgc_batches = ch_fna_for_bgc
+                .toList()
+                .flatMap { entries -> WorkflowFuncscan.predictorBatches(entries, deepbgc_batchsize, 'deepbgc') { meta, fna -> fna.baseName } }
+
+            DEEPBGC_BATCH_CONCAT ( ch_deepbgc_batches, 'fna' )
+            ch_versions = ch_versions.mix(DEEPBGC_BATCH_CONCAT.out.versions)
+
+            DEEPBGC_PIPELINE_BATCH ( DEEPBGC_BATCH_CONCAT.out.fasta, ch_deepbgc_database )
+            ch_versions = ch_versions.mix(DEEPBGC_PIPELINE_BATCH.out.versions)
+
+            ch_deepbgc_batch_split_input = DEEPBGC_PIPELINE_BATCH.out.log
+                .mix(
+                    DEEPBGC_PIPELINE_BATCH.out.readme,
+                    DEEPBGC_PIPELINE_BATCH.out.json,
+                    DEEPBGC_PIPELINE_BATCH.out.bgc_gbk,
+                    DEEPBGC_PIPELINE_BATCH.out.bgc_tsv,
+                    DEEPBGC_PIPELINE_BATCH.out.full_gbk,
+                    DEEPBGC_PIPELINE_BATCH.out.pfam_tsv
+                )
+                .groupTuple()
+                .join( DEEPBGC_BATCH_CONCAT.out.tags )
+                .flatMap { meta, files, tags -> meta.samples.collect { sample -> [ sample, meta.id, tags, files ] } }
+
+            DEEPBGC_BATCH_SPLIT ( ch_deepbgc_batch_split_input )
+            ch_versions = ch_versions.mix(DEEPBGC_BATCH_SPLIT.out.versions)
+
+            ch_deepbgc_bgc_tsv = DEEPBGC_BATCH_SPLIT.out.files
+                .map { meta, files -> [ meta, [ files ].flatten().find { it.name.endsWith('.bgc.tsv') } ] }
+                .filter { meta, tsv -> tsv }
+        } else {
+            DEEPBGC_PIPELINE ( ch_fna_for_bgc, ch_deepbgc_database )
+            ch_versions = ch_versions.mix(DEEPBGC_PIPELINE.out.versions)
+            ch_deepbgc_bgc_tsv = DEEPBGC_PIPELINE.out.bgc_tsv
+        }
+
+        ch_deepbgcresults_for_combgc = ch_deepbgc_bgc_tsv
+            .map { meta, file -> [ meta.sample ?: meta, file ] }
+            .groupTuple()
+        ch_bgcresults_for_combgc = ch_bgcresults_for_combgc.mix(ch_deepbgcresults_for_combgc)
     }
 
     // GECCO
     if ( !params.bgc_skip_gecco ) {
-        ch_gecco_input = fna.groupTuple()
+        ch_gecco_input = ch_fna_for_bgc.groupTuple()
                             .multiMap {
                                 fna: [ it[0], it[1], [] ]
                             }
@@ -146,6 +309,7 @@ workflow BGC {
         ch_versions = ch_versions.mix(GECCO_RUN.out.versions)
         ch_geccoresults_for_combgc = GECCO_RUN.out.gbk
             .mix(GECCO_RUN.out.clusters)
+            .map { meta, files -> [ meta.sample ?: meta, files ] }
             .groupTuple()
             .map{
                 meta, files ->
@@ -167,17 +331,46 @@ workflow BGC {
                 [ meta, file ]
             }
 
-        ch_in_for_bgc_hmmsearch = ch_faa_for_bgc_hmmsearch.combine(ch_bgc_hmm_models_meta)
-            .map {
-                meta_faa, faa, meta_hmm, hmm ->
-                    def meta_new = [:]
-                    meta_new['id']     = meta_faa['id']
-                    meta_new['hmm_id'] = meta_hmm['id']
-                [ meta_new, hmm, faa, params.bgc_hmmsearch_savealignments, params.bgc_hmmsearch_savetargets, params.bgc_hmmsearch_savedomains ]
-            }
-
-        BGC_HMMER_HMMSEARCH ( ch_in_for_bgc_hmmsearch )
-        ch_versions = ch_versions.mix(BGC_HMMER_HMMSEARCH.out.versions)
+        if ( params.bgc_hmmsearch_engine == 'pyhmmer' ) {
+            // All models are searched in one process per sample, results are written per model file
+            BGC_PYHMMER_SEARCH ( ch_faa_for_bgc_hmmsearch, ch_bgc_hmm_models.collect(), params.bgc_hmmsearch_savealignments )
+            ch_versions = ch_versions.mix(BGC_PYHMMER_SEARCH.out.versions)
+        } else if ( params.bgc_hmmsearch_batch ) {
+            // One hmmsearch per sample against all models, results are split back per model file afterwards
+            BGC_HMMSEARCH_BATCH_CONCAT ( ch_bgc_hmm_models.collect() )
+            ch_versions = ch_versions.mix(BGC_HMMSEARCH_BATCH_CONCAT.out.versions)
+
+            ch_in_for_bgc_hmmsearch = ch_faa_for_bgc_hmmsearch.combine(BGC_HMMSEARCH_BATCH_CONCAT.out.hmm)
+                .map {
+                    meta_faa, faa, hmm ->
+                        def meta_new = [:]
+                        meta_new['id'] = meta_faa['id']
+                    [ meta_new, hmm, faa, params.bgc_hmmsearch_savealignments, params.bgc_hmmsearch_savetargets, params.bgc_hmmsearch_savedomains ]
+                }
+
+            BGC_HMMER_HMMSEARCHBATCH ( ch_in_for_bgc_hmmsearch )
+            ch_versions = ch_versions.mix(BGC_HMMER_HMMSEARCHBATCH.out.versions)
+
+            def n_outputs = 1 + [ params.bgc_hmmsearch_savealignments, params.bgc_hmmsearch_savetargets, params.bgc_hmmsearch_savedomains ].count { it }
+            ch_in_for_bgc_hmmsearch_split = BGC_HMMER_HMMSEARCHBATCH.out.output
+                .mix(BGC_HMMER_HMMSEARCHBATCH.out.alignments, BGC_HMMER_HMMSEARCHBATCH.out.target_summary, BGC_HMMER_HMMSEARCHBATCH.out.domain_summary)
+                .groupTuple(size: n_outputs)
+
+            BGC_HMMSEARCH_BATCH_SPLIT ( ch_in_for_bgc_hmmsearch_split, BGC_HMMSEARCH_BATCH_CONCAT.out.models )
+            ch_versions = ch_versions.mix(BGC_HMMSEARCH_BATCH_SPLIT.out.versions)
+        } else {
+            ch_in_for_bgc_hmmsearch = ch_faa_for_bgc_hmmsearch.combine(ch_bgc_hmm_models_meta)
+                .map {
+                    meta_faa, faa, meta_hmm, hmm ->
+                        def meta_new = [:]
+                        meta_new['id']     = meta_faa['id']
+                        meta_new['hmm_id'] = meta_hmm['id']
+                    [ meta_new, hmm, faa, params.bgc_hmmsearch_savealignments, params.bgc_hmmsearch_savetargets, params.bgc_hmmsearch_savedomains ]
+                }
+
+            BGC_HMMER_HMMSEARCH ( ch_in_for_bgc_hmmsearch )
+            ch_versions = ch_versions.mix(BGC_HMMER_HMMSEARCH.out.versions)
+        }
     }
 
     // COMBGC
@@ -187,4 +380,5 @@ workflow BGC {
 
     emit:
     versions = ch_versions
+    summary  = ch_combgc_summaries // path(tsv)
 }
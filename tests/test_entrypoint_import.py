@@ -0,0 +1,104 @@
+"""
+Import-time budget of wf/entrypoint.py in Latch task pods.
+
+Every task pod imports the entrypoint, including the tiny `initialize` task, so
+the module must not pull in the registration machinery of the Latch SDK or
+build the Latch metadata when FLYTE_INTERNAL_EXECUTION_ID is set. The budget on
+the cumulative import time can be changed with FUNCSCAN_IMPORT_BUDGET_S.
+"""
+
+import ast
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("flytekit")
+pytest.importorskip("latch")
+
+project_dir = Path(__file__).resolve().parent.parent
+
+import_budget_s = float(os.environ.get("FUNCSCAN_IMPORT_BUDGET_S", 3.0))
+
+# Modules that must not be loaded at all in a task pod
+blocked_modules = [
+    "boto3",
+    "botocore",
+    "docker",
+    "latch_cli.services.register",
+    "latch_metadata",
+]
+
+# Modules that the entrypoint only imports inside the tasks that use them.
+# flytekit imports requests on its own, so it can only be kept out of the
+# module level of the entrypoint.
+deferred_modules = [
+    "requests",
+    "latch.ldata.path",
+    "latch_cli.utils",
+    "wf.log_streaming",
+    "wf.sharding",
+    "wf.trace_summary",
+]
+
+
+def import_times(module):
+    """
+    Cumulative import time in microseconds of every module loaded when
+    importing module in a task pod, from the output of `-X importtime`.
+    """
+    env = {**os.environ, "FLYTE_INTERNAL_EXECUTION_ID": "import-time-test"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=project_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| *(\S+)$", line)
+        if match:
+            times[match.group(2)] = int(match.group(1))
+    return times
+
+
+def module_level_imports(path):
+    imports = []
+    for node in ast.parse(path.read_text()).body:
+        if isinstance(node, ast.Import):
+            imports += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            imports.append(node.module)
+    return imports
+
+
+@pytest.fixture(scope="module")
+def entrypoint_imports():
+    return import_times("wf.entrypoint")
+
+
+def test_import_time_budget(entrypoint_imports):
+    seconds = entrypoint_imports["wf.entrypoint"] / 1e6
+    assert seconds <= import_budget_s, (
+        f"importing wf.entrypoint in a task pod took {seconds:.2f} s," f" over the budget of {import_budget_s:.2f} s"
+    )
+
+
+def test_no_blocked_modules(entrypoint_imports):
+    loaded = entrypoint_imports.keys()
+    blocked = [
+        module for module in blocked_modules if any(name == module or name.startswith(module + ".") for name in loaded)
+    ]
+    assert not blocked, f"task pods import {blocked}"
+
+
+def test_deferred_modules():
+    imports = module_level_imports(project_dir / "wf" / "entrypoint.py")
+    deferred = [module for module in deferred_modules if module in imports]
+    assert not deferred, f"wf.entrypoint imports {deferred} at module level"
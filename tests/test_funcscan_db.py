@@ -0,0 +1,225 @@
+"""
+Tests of bin/funcscan_db.py against fixture archives served by a local
+http.server, standing in for the database hosts.
+"""
+
+import functools
+import hashlib
+import http.server
+import importlib.util
+import io
+import json
+import os
+import tarfile
+import threading
+import zipfile
+from pathlib import Path
+
+import pytest
+
+project_dir = Path(__file__).resolve().parent.parent
+
+
+def load_script():
+    spec = importlib.util.spec_from_file_location("funcscan_db", project_dir / "bin" / "funcscan_db.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+funcscan_db = load_script()
+
+
+class Server:
+    """
+    Serve the files of a directory on localhost and count the requests per path.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.requests = []
+        server = self
+
+        class Handler(http.server.SimpleHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                super().do_GET()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Handler, directory=str(root)))
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, name):
+        return "http://127.0.0.1:{port}/{name}".format(port=self.httpd.server_address[1], name=name)
+
+
+@pytest.fixture
+def server(tmp_path):
+    root = tmp_path / "www"
+    root.mkdir()
+    server = Server(root)
+    server.thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return funcscan_db.Store(tmp_path / "store")
+
+
+def write_tar(path, files):
+    with tarfile.open(path, "w:gz") as tar:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+
+
+def write_zip(path, files):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+
+
+def sha256(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def fetch(store, manifest, *names):
+    funcscan_db.fetch(store, manifest, list(names), jobs=2, engine="none", update=False)
+
+
+def tar_manifest(server, files, params):
+    write_tar(server.root / "db.tar.gz", files)
+    download = {"url": server.url("db.tar.gz"), "unpack": "tar", "sha256": sha256(server.root / "db.tar.gz")}
+    return {"testdb": {"version": "1", "downloads": [download], "params": params}}
+
+
+def test_fetch(server, store):
+    manifest = tar_manifest(
+        server,
+        {"testdb_v1/db_2024/proteins.fasta": b">p1\nMKV\n", "testdb_v1/README": b"test\n"},
+        {"arg_test_db": "db*"},
+    )
+    write_zip(server.root / "extra.zip", {"extra/table.tsv": b"a\tb\n"})
+    manifest["extradb"] = {
+        "version": "2",
+        "downloads": [{"url": server.url("extra.zip"), "unpack": "zip"}],
+        "params": {"amp_extra_db": "."},
+    }
+
+    fetch(store, manifest, "testdb", "extradb")
+
+    lock = store.read_lock()
+    assert set(lock["databases"]) == {"testdb", "extradb"}
+    locked = lock["databases"]["testdb"]
+    path = Path(store.root) / locked["path"]
+    # The single top-level directory of the archive is stripped
+    assert (path / "db_2024" / "proteins.fasta").read_bytes() == b">p1\nMKV\n"
+    assert locked["params"] == {"arg_test_db": "db_2024"}
+    assert locked["digest"] == "sha256:" + funcscan_db.tree_digest(str(path))
+    assert (Path(store.root) / lock["databases"]["extradb"]["path"] / "table.tsv").exists()
+
+
+def test_fetch_skips_current_databases(server, store):
+    manifest = tar_manifest(server, {"db/a.txt": b"a\n"}, {"arg_test_db": "."})
+
+    fetch(store, manifest, "testdb")
+    assert len(server.requests) == 1
+    fetched = store.read_lock()["databases"]["testdb"]["fetched"]
+
+    fetch(store, manifest, "testdb")
+    assert len(server.requests) == 1
+    assert store.read_lock()["databases"]["testdb"]["fetched"] == fetched
+
+    # A changed manifest entry is fetched again
+    manifest["testdb"]["version"] = "2"
+    fetch(store, manifest, "testdb")
+    assert len(server.requests) == 2
+
+
+def test_fetch_checksum_mismatch(server, store):
+    manifest = tar_manifest(server, {"db/a.txt": b"a\n"}, {"arg_test_db": "."})
+    manifest["testdb"]["downloads"][0]["sha256"] = "0" * 64
+
+    with pytest.raises(SystemExit, match="Failed to fetch: testdb"):
+        fetch(store, manifest, "testdb")
+    assert store.read_lock()["databases"] == {}
+    assert os.listdir(store.objects) == []
+
+
+@pytest.mark.parametrize("kind", ["tar", "zip"])
+@pytest.mark.parametrize("unsafe", ["../escaped.txt", "/tmp/funcscan_db_escaped.txt"])
+def test_unsafe_member(server, store, tmp_path, kind, unsafe):
+    files = {"db/a.txt": b"a\n", unsafe: b"escaped\n"}
+    name = "db.tar.gz" if kind == "tar" else "db.zip"
+    (write_tar if kind == "tar" else write_zip)(server.root / name, files)
+
+    with pytest.raises(RuntimeError, match="Unsafe path"):
+        funcscan_db.unpack(str(server.root / name), str(tmp_path / "dest"), kind, name)
+    assert not (tmp_path / "escaped.txt").exists()
+    assert not Path("/tmp/funcscan_db_escaped.txt").exists()
+
+    manifest = {"testdb": {"downloads": [{"url": server.url(name), "unpack": kind}], "params": {"arg_test_db": "."}}}
+    with pytest.raises(SystemExit, match="Failed to fetch: testdb"):
+        fetch(store, manifest, "testdb")
+    assert store.read_lock()["databases"] == {}
+
+
+@pytest.mark.parametrize(
+    "files, found",
+    [
+        ({"root/other/a.txt": b"a\n", "root/README": b"\n"}, "none"),
+        ({"root/db_1/a.txt": b"a\n", "root/db_2/a.txt": b"a\n"}, "db_1, db_2"),
+    ],
+)
+def test_resolve_params_needs_one_match(tmp_path, files, found):
+    out = tmp_path / "out"
+    for name, content in files.items():
+        path = out / name.split("/", 1)[1]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+
+    with pytest.raises(RuntimeError, match="Expected one entry matching db\\* for --arg_test_db, found: " + found):
+        funcscan_db.resolve_params({"params": {"arg_test_db": "db*"}}, str(out))
+
+
+def test_resolve(server, store, tmp_path):
+    manifest = tar_manifest(server, {"db/db_1/a.txt": b"a\n"}, {"arg_test_db": "db*", "arg_test_dir": "."})
+    fetch(store, manifest, "testdb")
+
+    funcscan_db.resolve(store, str(tmp_path / "params.json"))
+    params = json.loads((tmp_path / "params.json").read_text())
+    path = os.path.join(store.root, store.read_lock()["databases"]["testdb"]["path"])
+    assert params == {"arg_test_db": os.path.join(path, "db_1"), "arg_test_dir": path}
+
+
+def test_verify(server, store, capsys):
+    manifest = tar_manifest(server, {"db/a.txt": b"a\n", "db/b.txt": b"b\n"}, {"arg_test_db": "."})
+    fetch(store, manifest, "testdb")
+
+    funcscan_db.verify(store, jobs=1)
+    assert capsys.readouterr().out == "testdb\tok\n"
+
+    path = Path(store.root) / store.read_lock()["databases"]["testdb"]["path"]
+    (path / "a.txt").write_text("changed\n")
+    with pytest.raises(SystemExit, match="failed verification: testdb"):
+        funcscan_db.verify(store, jobs=1)
+    assert "testdb\tmodified" in capsys.readouterr().out
+
+
+def test_gc(server, store):
+    manifest = tar_manifest(server, {"db/a.txt": b"a\n"}, {"arg_test_db": "."})
+    fetch(store, manifest, "testdb")
+    used = os.path.basename(store.read_lock()["databases"]["testdb"]["path"])
+
+    os.makedirs(os.path.join(store.objects, "0" * 64))
+    os.makedirs(os.path.join(store.tmp, "testdb.leftover"))
+
+    funcscan_db.gc(store)
+    assert os.listdir(store.objects) == [used]
+    assert os.listdir(store.tmp) == []
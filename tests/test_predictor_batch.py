@@ -0,0 +1,171 @@
+"""
+Outputs of a predictor run on a batch of samples and split with
+bin/predictor_batch.py must be identical to those of the predictor run on
+every sample alone.
+
+The predictor is stood in for by `predict`, which treats every sequence
+independently, as DeepBGC, DeepARG and AMPlify do, and writes a TSV table, a
+GenBank file (with Biopython, as DeepBGC) and an antiSMASH-style JSON file that
+all contain the sequence names. Eleven samples give both FSB1_ and FSB10_ tags.
+"""
+
+import json
+import random
+import subprocess
+import sys
+import warnings
+from pathlib import Path
+
+import pytest
+
+project_dir = Path(__file__).resolve().parent.parent
+script = project_dir / "bin" / "predictor_batch.py"
+
+n_samples = 11
+
+
+def read_fasta(path):
+    records, name = [], None
+    for line in path.read_text().splitlines():
+        if line.startswith(">"):
+            name = line[1:].split()[0]
+            records.append((name, []))
+        elif name is not None:
+            records[-1][1].append(line.strip())
+    return [(name, "".join(seq)) for name, seq in records]
+
+
+def predict(fasta, stem, outdir):
+    """
+    Write `<stem>.tsv`, `<stem>.gbk` and `<stem>.json` for the sequences of fasta.
+    """
+    from Bio import SeqIO
+    from Bio.Seq import Seq
+    from Bio.SeqFeature import FeatureLocation, SeqFeature
+    from Bio.SeqRecord import SeqRecord
+
+    records = read_fasta(fasta)
+
+    with open(outdir / f"{stem}.tsv", "w") as out:
+        out.write("# predictor 1.0\n")
+        out.write("sequence_id\tlength\tscore\tdescription\n")
+        for name, seq in records:
+            out.write(f"{name}\t{len(seq)}\t{seq.count('G') / len(seq):.3f}\thit on {name}\n")
+            if len(seq) % 2:
+                # Continuation lines without a sequence name
+                out.write("\t\t\tsee previous hit\n")
+
+    genbank = []
+    for name, seq in records:
+        record = SeqRecord(
+            Seq(seq),
+            id=name,
+            name=name,
+            description=f"putative biosynthetic gene cluster predicted on {name} with a description long enough to wrap",
+        )
+        record.annotations["molecule_type"] = "DNA"
+        record.features.append(
+            SeqFeature(
+                FeatureLocation(0, len(seq) // 2, 1),
+                type="cluster",
+                qualifiers={
+                    "note": [f"cluster of {name} " + "with several domains " * 5],
+                    "product": [f"{name}_cluster_1"],
+                    "translation": ["M" + "ACDEFGHIKLMNPQRSTVWY" * 7],
+                },
+            )
+        )
+        genbank.append(record)
+    with warnings.catch_warnings():
+        # Long sequence names widen the LOCUS line
+        warnings.simplefilter("ignore")
+        SeqIO.write(genbank, outdir / f"{stem}.gbk", "genbank")
+
+    with open(outdir / f"{stem}.json", "w") as out:
+        json.dump(
+            {
+                "version": "1.0",
+                "records": [
+                    {
+                        "id": name,
+                        "seq": {"length": len(seq)},
+                        "features": [{"type": "cluster", "qualifiers": {"product": [f"{name}_cluster_1"]}}],
+                    }
+                    for name, seq in records
+                ],
+            },
+            out,
+            indent=1,
+        )
+        out.write("\n")
+
+
+def random_fasta(path, sample, rng):
+    with open(path, "w") as out:
+        for i in range(rng.randint(1, 4)):
+            # Mix short names and names longer than the 16 characters of a LOCUS name
+            name = f"{sample}_c{i}" if i % 2 else f"NODE_{i + 1}_length_{rng.randint(1000, 99999)}_cov_{sample}"
+            seq = "".join(rng.choice("ACGT") for _ in range(rng.randint(200, 1500)))
+            out.write(f">{name} some description\n")
+            for start in range(0, len(seq), 60):
+                out.write(seq[start : start + 60] + "\n")
+
+
+def run(*args):
+    subprocess.run([sys.executable, str(script), *map(str, args)], check=True, capture_output=True)
+
+
+def test_batched_outputs_match_unbatched(tmp_path):
+    pytest.importorskip("Bio")
+
+    rng = random.Random(45)
+    samples = [f"sample{n}" for n in range(1, n_samples + 1)]
+    fastas = []
+    for sample in samples:
+        fasta = tmp_path / f"{sample}.fasta"
+        random_fasta(fasta, sample, rng)
+        fastas.append(fasta)
+
+    unbatched = tmp_path / "unbatched"
+    unbatched.mkdir()
+    for sample, fasta in zip(samples, fastas):
+        predict(fasta, sample, unbatched)
+
+    batch = tmp_path / "batch"
+    batch.mkdir()
+    run(
+        "concat",
+        "--input",
+        *fastas,
+        "--samples",
+        *samples,
+        "--stems",
+        *samples,
+        "--output",
+        batch / "batch_1.fasta",
+        "--tags",
+        batch / "batch_1.tags.tsv",
+    )
+    tags = (batch / "batch_1.tags.tsv").read_text()
+    assert "FSB1_\t" in tags and "FSB10_\t" in tags
+
+    predict(batch / "batch_1.fasta", "batch_1", batch)
+    outputs = [batch / f"batch_1.{suffix}" for suffix in ["tsv", "gbk", "json"]]
+
+    for sample in samples:
+        split_dir = tmp_path / "split" / sample
+        run(
+            "split",
+            "--tags",
+            batch / "batch_1.tags.tsv",
+            "--sample",
+            sample,
+            "--batch_stem",
+            "batch_1",
+            "--outdir",
+            split_dir,
+            *outputs,
+        )
+        for suffix in ["tsv", "gbk", "json"]:
+            expected = (unbatched / f"{sample}.{suffix}").read_text()
+            assert (split_dir / f"{sample}.{suffix}").read_text() == expected, f"{sample}.{suffix}"
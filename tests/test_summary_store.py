@@ -0,0 +1,70 @@
+"""
+Tests of bin/summary_store.py on empty and header-only summaries, as written
+for cohorts without hits of a screening type.
+"""
+
+import importlib.util
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+project_dir = Path(__file__).resolve().parent.parent
+
+
+def load_script():
+    spec = importlib.util.spec_from_file_location("summary_store", project_dir / "bin" / "summary_store.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+summary_store = load_script()
+
+combgc_header = "Sample_ID\tContig_ID\tBGC_start\tBGC_end\tProduct_class\n"
+combgc_row = "sample1\tcontig_1\t100\t5000\tNRPS\n"
+
+
+def tables_of(database):
+    with sqlite3.connect(database) as con:
+        return {
+            row[0]
+            for row in con.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+        }
+
+
+@pytest.mark.parametrize(
+    "hamronization", ["", "input_file_name\tinput_sequence_id\tinput_gene_start\tinput_gene_stop\n"]
+)
+def test_load_empty_summary(tmp_path, hamronization):
+    combgc = tmp_path / "combgc_complete_summary.tsv"
+    combgc.write_text(combgc_header + combgc_row)
+    # hamronization_merge.py --format jsonl writes an empty file without ARG hits
+    arg = tmp_path / "hamronization_combined_report.jsonl"
+    arg.write_text(hamronization)
+    database = tmp_path / "summaries.sqlite"
+
+    summary_store.load(str(database), None, str(arg), str(combgc), None)
+
+    found = tables_of(database)
+    assert {"bgc", "bgc_interval", "contigs", "metadata"} <= found
+    # An empty file creates no table, a header-only file an empty one
+    assert ("arg" in found) == bool(hamronization)
+    with sqlite3.connect(database) as con:
+        assert con.execute('SELECT sample, contig, start, "end" FROM bgc').fetchall() == [
+            ("sample1", "contig_1", 100, 5000)
+        ]
+        if hamronization:
+            assert con.execute("SELECT COUNT(*) FROM arg").fetchone() == (0,)
+
+
+def test_load_all_empty(tmp_path):
+    combgc = tmp_path / "combgc_complete_summary.tsv"
+    combgc.write_text("")
+    ampcombi = tmp_path / "ampcombi_complete_summary.csv"
+    ampcombi.write_text("")
+    database = tmp_path / "summaries.sqlite"
+
+    summary_store.load(str(database), str(ampcombi), None, str(combgc), None)
+
+    assert tables_of(database) == {"contigs", "metadata"}
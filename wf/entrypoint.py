@@ -1,25 +1,77 @@
+import importlib.util
+import inspect
 import os
 import shutil
 import subprocess
+import sys
 import typing
 from pathlib import Path
 
-import requests
 import typing_extensions
 from flytekit.core.annotation import FlyteAnnotation
-from latch.ldata.path import LPath
+from flytekit.core.python_function_task import PythonFunctionTask
+from latch.resources.conditional import create_conditional_section
 from latch.resources.tasks import custom_task, nextflow_runtime_task
 from latch.resources.workflow import workflow
 from latch.types import metadata
 from latch.types.directory import LatchDir
 from latch.types.file import LatchFile
-from latch_cli.nextflow.utils import _get_execution_name
-from latch_cli.nextflow.workflow import get_flag
-from latch_cli.services.register.utils import import_module_by_path
-from latch_cli.utils import urljoins
 
-meta = Path("latch_metadata") / "__init__.py"
-import_module_by_path(meta)
+# Everything else is imported inside the task that needs it: every task pod
+# imports this module, including the tiny `initialize` task.
+#
+# Task pods never evaluate the workflow definition either, so the Latch
+# metadata (and the NextflowParameter table behind it) is only built when the
+# workflow is being registered, and in `nextflow_runtime`, which forwards the
+# parameters to Nextflow.
+executing_task = "FLYTE_INTERNAL_EXECUTION_ID" in os.environ
+
+
+def load_metadata():
+    if "latch_metadata" in sys.modules:
+        return sys.modules["latch_metadata"]
+
+    spec = importlib.util.spec_from_file_location(
+        "latch_metadata", Path("latch_metadata") / "__init__.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["latch_metadata"] = module
+    spec.loader.exec_module(module)
+
+    return module
+
+
+def check_parameters(names: typing.Iterable[str]) -> None:
+    generated_parameters = load_metadata().generated_parameters
+
+    names = set(names)
+    missing = generated_parameters.keys() - names
+    unknown = names - generated_parameters.keys()
+    if missing or unknown:
+        raise RuntimeError(
+            "nextflow_runtime inputs are out of sync with latch_metadata/parameters.py:"
+            f" missing {sorted(missing)}, unknown {sorted(unknown)}"
+        )
+
+
+def nextflow_flags(params: typing.Dict[str, typing.Any]) -> typing.List[str]:
+    from latch_cli.nextflow.workflow import get_flag
+
+    check_parameters(params.keys())
+
+    return [
+        flag
+        for name in load_metadata().generated_parameters
+        for flag in get_flag(name, params[name])
+    ]
+
+
+def workflow_decorator():
+    if executing_task:
+        return lambda f: f
+
+    load_metadata()
+    return workflow(metadata._nextflow_metadata)
 
 
 @custom_task(cpu=0.25, memory=0.5, storage_gib=1)
@@ -28,6 +80,8 @@ def initialize() -> str:
     if token is None:
         raise RuntimeError("failed to get execution token")
 
+    import requests
+
     headers = {"Authorization": f"Latch-Execution-Token {token}"}
 
     print("Provisioning shared storage volume... ", end="")
@@ -44,9 +98,10 @@ def initialize() -> str:
     return resp.json()["name"]
 
 
-@nextflow_runtime_task(cpu=4, memory=8, storage_gib=100)
-def nextflow_runtime(
-    pvc_name: str,
+# The inputs of the pipeline are only spelled out in the signature of the
+# workflow below. It is decorated as a workflow at the end of this module, once
+# the tasks it calls are defined, and the tasks derive their inputs from it.
+def nf_nf_core_funcscan(
     input: LatchFile,
     outdir: typing_extensions.Annotated[LatchDir, FlyteAnnotation({"output": True})],
     email: typing.Optional[str],
@@ -55,6 +110,8 @@ def nextflow_runtime(
     run_arg_screening: typing.Optional[bool],
     run_bgc_screening: typing.Optional[bool],
     save_annotations: typing.Optional[bool],
+    annotation_dedup: typing.Optional[bool],
+    annotation_cache_dir: typing.Optional[str],
     annotation_bakta_db_localpath: typing.Optional[str],
     annotation_bakta_db_downloadtype: typing.Optional[str],
     annotation_bakta_complete: typing.Optional[bool],
@@ -85,7 +142,9 @@ def nextflow_runtime(
     annotation_pyrodigal_singlemode: typing.Optional[bool],
     annotation_pyrodigal_closed: typing.Optional[bool],
     annotation_pyrodigal_forcenonsd: typing.Optional[bool],
+    annotation_pyrodigal_multithreaded: typing.Optional[bool],
     save_databases: typing.Optional[bool],
+    database_store: typing.Optional[str],
     amp_skip_amplify: typing.Optional[bool],
     amp_skip_ampir: typing.Optional[bool],
     amp_skip_hmmsearch: typing.Optional[bool],
@@ -93,6 +152,7 @@ def nextflow_runtime(
     amp_hmmsearch_savealignments: typing.Optional[bool],
     amp_hmmsearch_savetargets: typing.Optional[bool],
     amp_hmmsearch_savedomains: typing.Optional[bool],
+    amp_hmmsearch_batch: typing.Optional[bool],
     amp_skip_macrel: typing.Optional[bool],
     amp_ampcombi_db: typing.Optional[str],
     arg_skip_amrfinderplus: typing.Optional[bool],
@@ -105,14 +165,17 @@ def nextflow_runtime(
     arg_fargene_savetmpfiles: typing.Optional[bool],
     arg_fargene_score: typing.Optional[float],
     arg_fargene_orffinder: typing.Optional[bool],
+    arg_fargene_batch: typing.Optional[bool],
     arg_skip_rgi: typing.Optional[bool],
     arg_rgi_savejson: typing.Optional[bool],
     arg_rgi_savetmpfiles: typing.Optional[bool],
     arg_rgi_lowquality: typing.Optional[bool],
     arg_skip_abricate: typing.Optional[bool],
+    bgc_shard_contigs: typing.Optional[bool],
     bgc_skip_antismash: typing.Optional[bool],
     bgc_antismash_databases: typing.Optional[str],
     bgc_antismash_installationdirectory: typing.Optional[str],
+    bgc_antismash_cache_dir: typing.Optional[str],
     bgc_antismash_cbgeneral: typing.Optional[bool],
     bgc_antismash_cbknownclusters: typing.Optional[bool],
     bgc_antismash_cbsubclusters: typing.Optional[bool],
@@ -128,62 +191,157 @@ def nextflow_runtime(
     bgc_hmmsearch_savealignments: typing.Optional[bool],
     bgc_hmmsearch_savetargets: typing.Optional[bool],
     bgc_hmmsearch_savedomains: typing.Optional[bool],
+    bgc_hmmsearch_batch: typing.Optional[bool],
+    arg_hamronization_appendsummary: typing.Optional[str],
+    amp_prediction_cache_dir: typing.Optional[str],
+    run_summary_store: typing.Optional[bool],
+    resource_scaling: typing.Optional[bool],
     multiqc_methods_description: typing.Optional[str],
-    annotation_tool: typing.Optional[str],
-    annotation_bakta_mincontiglen: typing.Optional[int],
-    annotation_bakta_translationtable: typing.Optional[int],
-    annotation_bakta_gram: typing.Optional[str],
-    annotation_prokka_kingdom: typing.Optional[str],
-    annotation_prokka_gcode: typing.Optional[int],
-    annotation_prokka_mincontiglen: typing.Optional[int],
-    annotation_prokka_evalue: typing.Optional[float],
-    annotation_prokka_coverage: typing.Optional[int],
-    annotation_prodigal_transtable: typing.Optional[int],
-    annotation_pyrodigal_transtable: typing.Optional[int],
-    amp_ampir_model: typing.Optional[str],
-    amp_ampir_minlength: typing.Optional[int],
-    amp_ampcombi_cutoff: typing.Optional[float],
-    arg_amrfinderplus_identmin: typing.Optional[float],
-    arg_amrfinderplus_coveragemin: typing.Optional[float],
-    arg_amrfinderplus_translationtable: typing.Optional[int],
-    arg_deeparg_data_version: typing.Optional[int],
-    arg_deeparg_model: typing.Optional[str],
-    arg_deeparg_minprob: typing.Optional[float],
-    arg_deeparg_alignmentevalue: typing.Optional[float],
-    arg_deeparg_alignmentidentity: typing.Optional[int],
-    arg_deeparg_alignmentoverlap: typing.Optional[float],
-    arg_deeparg_numalignmentsperentry: typing.Optional[int],
-    arg_fargene_hmmmodel: typing.Optional[str],
-    arg_fargene_minorflength: typing.Optional[int],
-    arg_fargene_translationformat: typing.Optional[str],
-    arg_rgi_alignmenttool: typing.Optional[str],
-    arg_rgi_includeloose: typing.Optional[bool],
-    arg_rgi_excludenudge: typing.Optional[bool],
-    arg_rgi_data: typing.Optional[str],
-    arg_abricate_db: typing.Optional[str],
-    arg_abricate_minid: typing.Optional[int],
-    arg_abricate_mincov: typing.Optional[int],
-    bgc_antismash_sampleminlength: typing.Optional[int],
-    bgc_antismash_contigminlength: typing.Optional[int],
-    bgc_antismash_hmmdetectionstrictness: typing.Optional[str],
-    bgc_antismash_taxon: typing.Optional[str],
-    bgc_deepbgc_score: typing.Optional[float],
-    bgc_deepbgc_mergemaxproteingap: typing.Optional[int],
-    bgc_deepbgc_mergemaxnuclgap: typing.Optional[int],
-    bgc_deepbgc_minnucl: typing.Optional[int],
-    bgc_deepbgc_minproteins: typing.Optional[int],
-    bgc_deepbgc_mindomains: typing.Optional[int],
-    bgc_deepbgc_minbiodomains: typing.Optional[int],
-    bgc_deepbgc_classifierscore: typing.Optional[float],
-    bgc_gecco_cds: typing.Optional[int],
-    bgc_gecco_pfilter: typing.Optional[float],
-    bgc_gecco_threshold: typing.Optional[float],
-    bgc_gecco_edgedistance: typing.Optional[int],
-    arg_hamronization_summarizeformat: typing.Optional[str],
+    preprocessing_mincontiglen: typing.Optional[int] = 0,
+    annotation_tool: typing.Optional[str] = "pyrodigal",
+    annotation_dedup_batchsize: typing.Optional[int] = 50000000,
+    annotation_cache_maxsize: typing.Optional[float] = 100.0,
+    annotation_bakta_mincontiglen: typing.Optional[int] = 1,
+    annotation_bakta_translationtable: typing.Optional[int] = 11,
+    annotation_bakta_gram: typing.Optional[str] = "?",
+    annotation_prokka_kingdom: typing.Optional[str] = "Bacteria",
+    annotation_prokka_gcode: typing.Optional[int] = 11,
+    annotation_prokka_mincontiglen: typing.Optional[int] = 1,
+    annotation_prokka_evalue: typing.Optional[float] = 1e-06,
+    annotation_prokka_coverage: typing.Optional[int] = 80,
+    annotation_prodigal_transtable: typing.Optional[int] = 11,
+    annotation_pyrodigal_transtable: typing.Optional[int] = 11,
+    amp_ampir_model: typing.Optional[str] = "precursor",
+    amp_ampir_minlength: typing.Optional[int] = 10,
+    amp_amplify_batchsize: typing.Optional[int] = 1,
+    amp_ampcombi_cutoff: typing.Optional[float] = 0.4,
+    amp_hmmsearch_engine: typing.Optional[str] = "hmmer",
+    arg_amrfinderplus_identmin: typing.Optional[float] = -1.0,
+    arg_amrfinderplus_coveragemin: typing.Optional[float] = 0.5,
+    arg_amrfinderplus_translationtable: typing.Optional[int] = 11,
+    arg_deeparg_data_version: typing.Optional[int] = 2,
+    arg_deeparg_model: typing.Optional[str] = "LS",
+    arg_deeparg_minprob: typing.Optional[float] = 0.8,
+    arg_deeparg_alignmentevalue: typing.Optional[float] = 1e-10,
+    arg_deeparg_alignmentidentity: typing.Optional[int] = 50,
+    arg_deeparg_alignmentoverlap: typing.Optional[float] = 0.8,
+    arg_deeparg_numalignmentsperentry: typing.Optional[int] = 1000,
+    arg_deeparg_batchsize: typing.Optional[int] = 1,
+    arg_fargene_hmmmodel: typing.Optional[
+        str
+    ] = "class_a,class_b_1_2,class_b_3,class_c,class_d_1,class_d_2,qnr,tet_efflux,tet_rpg,tet_enzyme",
+    arg_fargene_minorflength: typing.Optional[int] = 90,
+    arg_fargene_translationformat: typing.Optional[str] = "pearson",
+    arg_rgi_alignmenttool: typing.Optional[str] = "BLAST",
+    arg_rgi_includeloose: typing.Optional[bool] = True,
+    arg_rgi_excludenudge: typing.Optional[bool] = True,
+    arg_rgi_data: typing.Optional[str] = "NA",
+    arg_abricate_db: typing.Optional[str] = "ncbi",
+    arg_abricate_minid: typing.Optional[int] = 80,
+    arg_abricate_mincov: typing.Optional[int] = 80,
+    bgc_shard_size: typing.Optional[int] = 50000000,
+    bgc_antismash_sampleminlength: typing.Optional[int] = 1000,
+    bgc_antismash_contigminlength: typing.Optional[int] = 1000,
+    bgc_antismash_hmmdetectionstrictness: typing.Optional[str] = "relaxed",
+    bgc_antismash_taxon: typing.Optional[str] = "bacteria",
+    bgc_deepbgc_score: typing.Optional[float] = 0.5,
+    bgc_deepbgc_mergemaxproteingap: typing.Optional[int] = 0,
+    bgc_deepbgc_mergemaxnuclgap: typing.Optional[int] = 0,
+    bgc_deepbgc_minnucl: typing.Optional[int] = 1,
+    bgc_deepbgc_minproteins: typing.Optional[int] = 1,
+    bgc_deepbgc_mindomains: typing.Optional[int] = 1,
+    bgc_deepbgc_minbiodomains: typing.Optional[int] = 0,
+    bgc_deepbgc_classifierscore: typing.Optional[float] = 0.5,
+    bgc_deepbgc_batchsize: typing.Optional[int] = 1,
+    bgc_gecco_cds: typing.Optional[int] = 3,
+    bgc_gecco_pfilter: typing.Optional[float] = 1e-09,
+    bgc_gecco_threshold: typing.Optional[float] = 0.8,
+    bgc_gecco_edgedistance: typing.Optional[int] = 0,
+    bgc_hmmsearch_engine: typing.Optional[str] = "hmmer",
+    arg_hamronization_summarizeformat: typing.Optional[str] = "tsv",
+    shards: int = 1,
 ) -> None:
-    try:
-        shared_dir = Path("/nf-workdir")
+    """
+    nf-core/funcscan
+
+    Sample Description
+    """
+
+    params = dict(locals())
+    shards = params.pop("shards")
+
+    pvc_name: str = initialize()
+    (
+        create_conditional_section("sharding")
+        .if_(shards > 1)
+        .then(nextflow_shards(pvc_name=pvc_name, shards=shards, **params))
+        .else_()
+        .then(nextflow_runtime(pvc_name=pvc_name, **params))
+    )
+
+
+pvc_name_input = inspect.Parameter(
+    "pvc_name", inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=str
+)
 
+
+def inputs_of(
+    source: typing.Callable,
+    *extra: inspect.Parameter,
+    exclude: typing.Collection[str] = (),
+):
+    """
+    Give a task the inputs of `source` without their defaults, after `extra`
+    and leaving out `exclude`, so that it can take all pipeline parameters
+    without repeating the signature.
+    """
+
+    def decorator(f):
+        hints = typing.get_type_hints(source, include_extras=True)
+        inputs = [
+            p.replace(default=inspect.Parameter.empty)
+            for p in inspect.signature(source).parameters.values()
+            if p.name not in exclude
+        ]
+        f.__signature__ = inspect.Signature([*extra, *inputs], return_annotation=None)
+        f.__annotations__ = {
+            **{p.name: p.annotation for p in extra},
+            **{p.name: hints[p.name] for p in inputs},
+            "return": None,
+        }
+        return f
+
+    return decorator
+
+
+@nextflow_runtime_task(cpu=4, memory=8, storage_gib=100)
+@inputs_of(nf_nf_core_funcscan, pvc_name_input, exclude={"shards"})
+def nextflow_runtime(**params) -> None:
+    pvc_name = params.pop("pvc_name")
+    outdir = params["outdir"]
+
+    from latch.ldata.path import LPath
+    from latch_cli.nextflow.utils import _get_execution_name
+    from latch_cli.utils import urljoins
+
+    from wf.log_streaming import LogStreamer
+    from wf.sharding import shard_name
+    from wf.trace_summary import write_trace_summary
+
+    streamer = None
+    log_dir = None
+    name = _get_execution_name()
+    if name is not None:
+        log_dir = urljoins("latch:///your_log_dir/nf_nf_core_funcscan", name)
+        # The runtimes of a sharded execution share the execution name
+        shard = shard_name(outdir.remote_path)
+        if shard is not None:
+            log_dir = urljoins(log_dir, shard)
+
+    shared_dir = Path("/nf-workdir")
+    pipeline_info = shared_dir / "pipeline_info"
+
+    try:
         ignore_list = [
             "latch",
             ".latch",
@@ -214,167 +372,7 @@ def nextflow_runtime(
             "docker",
             "-c",
             "latch.config",
-            *get_flag("input", input),
-            *get_flag("outdir", outdir),
-            *get_flag("email", email),
-            *get_flag("multiqc_title", multiqc_title),
-            *get_flag("run_amp_screening", run_amp_screening),
-            *get_flag("run_arg_screening", run_arg_screening),
-            *get_flag("run_bgc_screening", run_bgc_screening),
-            *get_flag("annotation_tool", annotation_tool),
-            *get_flag("save_annotations", save_annotations),
-            *get_flag("annotation_bakta_db_localpath", annotation_bakta_db_localpath),
-            *get_flag(
-                "annotation_bakta_db_downloadtype", annotation_bakta_db_downloadtype
-            ),
-            *get_flag("annotation_bakta_mincontiglen", annotation_bakta_mincontiglen),
-            *get_flag(
-                "annotation_bakta_translationtable", annotation_bakta_translationtable
-            ),
-            *get_flag("annotation_bakta_gram", annotation_bakta_gram),
-            *get_flag("annotation_bakta_complete", annotation_bakta_complete),
-            *get_flag(
-                "annotation_bakta_renamecontigheaders",
-                annotation_bakta_renamecontigheaders,
-            ),
-            *get_flag("annotation_bakta_compliant", annotation_bakta_compliant),
-            *get_flag("annotation_bakta_trna", annotation_bakta_trna),
-            *get_flag("annotation_bakta_tmrna", annotation_bakta_tmrna),
-            *get_flag("annotation_bakta_rrna", annotation_bakta_rrna),
-            *get_flag("annotation_bakta_ncrna", annotation_bakta_ncrna),
-            *get_flag("annotation_bakta_ncrnaregion", annotation_bakta_ncrnaregion),
-            *get_flag("annotation_bakta_crispr", annotation_bakta_crispr),
-            *get_flag("annotation_bakta_skipcds", annotation_bakta_skipcds),
-            *get_flag("annotation_bakta_pseudo", annotation_bakta_pseudo),
-            *get_flag("annotation_bakta_skipsorf", annotation_bakta_skipsorf),
-            *get_flag("annotation_bakta_gap", annotation_bakta_gap),
-            *get_flag("annotation_bakta_ori", annotation_bakta_ori),
-            *get_flag("annotation_bakta_activate_plot", annotation_bakta_activate_plot),
-            *get_flag("annotation_prokka_singlemode", annotation_prokka_singlemode),
-            *get_flag("annotation_prokka_rawproduct", annotation_prokka_rawproduct),
-            *get_flag("annotation_prokka_kingdom", annotation_prokka_kingdom),
-            *get_flag("annotation_prokka_gcode", annotation_prokka_gcode),
-            *get_flag("annotation_prokka_mincontiglen", annotation_prokka_mincontiglen),
-            *get_flag("annotation_prokka_evalue", annotation_prokka_evalue),
-            *get_flag("annotation_prokka_coverage", annotation_prokka_coverage),
-            *get_flag("annotation_prokka_cdsrnaolap", annotation_prokka_cdsrnaolap),
-            *get_flag("annotation_prokka_rnammer", annotation_prokka_rnammer),
-            *get_flag("annotation_prokka_compliant", annotation_prokka_compliant),
-            *get_flag("annotation_prokka_addgenes", annotation_prokka_addgenes),
-            *get_flag(
-                "annotation_prokka_retaincontigheaders",
-                annotation_prokka_retaincontigheaders,
-            ),
-            *get_flag("annotation_prodigal_singlemode", annotation_prodigal_singlemode),
-            *get_flag("annotation_prodigal_closed", annotation_prodigal_closed),
-            *get_flag("annotation_prodigal_transtable", annotation_prodigal_transtable),
-            *get_flag("annotation_prodigal_forcenonsd", annotation_prodigal_forcenonsd),
-            *get_flag(
-                "annotation_pyrodigal_singlemode", annotation_pyrodigal_singlemode
-            ),
-            *get_flag("annotation_pyrodigal_closed", annotation_pyrodigal_closed),
-            *get_flag(
-                "annotation_pyrodigal_transtable", annotation_pyrodigal_transtable
-            ),
-            *get_flag(
-                "annotation_pyrodigal_forcenonsd", annotation_pyrodigal_forcenonsd
-            ),
-            *get_flag("save_databases", save_databases),
-            *get_flag("amp_skip_amplify", amp_skip_amplify),
-            *get_flag("amp_skip_ampir", amp_skip_ampir),
-            *get_flag("amp_ampir_model", amp_ampir_model),
-            *get_flag("amp_ampir_minlength", amp_ampir_minlength),
-            *get_flag("amp_skip_hmmsearch", amp_skip_hmmsearch),
-            *get_flag("amp_hmmsearch_models", amp_hmmsearch_models),
-            *get_flag("amp_hmmsearch_savealignments", amp_hmmsearch_savealignments),
-            *get_flag("amp_hmmsearch_savetargets", amp_hmmsearch_savetargets),
-            *get_flag("amp_hmmsearch_savedomains", amp_hmmsearch_savedomains),
-            *get_flag("amp_skip_macrel", amp_skip_macrel),
-            *get_flag("amp_ampcombi_db", amp_ampcombi_db),
-            *get_flag("amp_ampcombi_cutoff", amp_ampcombi_cutoff),
-            *get_flag("arg_skip_amrfinderplus", arg_skip_amrfinderplus),
-            *get_flag("arg_amrfinderplus_db", arg_amrfinderplus_db),
-            *get_flag("arg_amrfinderplus_identmin", arg_amrfinderplus_identmin),
-            *get_flag("arg_amrfinderplus_coveragemin", arg_amrfinderplus_coveragemin),
-            *get_flag(
-                "arg_amrfinderplus_translationtable", arg_amrfinderplus_translationtable
-            ),
-            *get_flag("arg_amrfinderplus_plus", arg_amrfinderplus_plus),
-            *get_flag("arg_amrfinderplus_name", arg_amrfinderplus_name),
-            *get_flag("arg_skip_deeparg", arg_skip_deeparg),
-            *get_flag("arg_deeparg_data", arg_deeparg_data),
-            *get_flag("arg_deeparg_data_version", arg_deeparg_data_version),
-            *get_flag("arg_deeparg_model", arg_deeparg_model),
-            *get_flag("arg_deeparg_minprob", arg_deeparg_minprob),
-            *get_flag("arg_deeparg_alignmentevalue", arg_deeparg_alignmentevalue),
-            *get_flag("arg_deeparg_alignmentidentity", arg_deeparg_alignmentidentity),
-            *get_flag("arg_deeparg_alignmentoverlap", arg_deeparg_alignmentoverlap),
-            *get_flag(
-                "arg_deeparg_numalignmentsperentry", arg_deeparg_numalignmentsperentry
-            ),
-            *get_flag("arg_skip_fargene", arg_skip_fargene),
-            *get_flag("arg_fargene_hmmmodel", arg_fargene_hmmmodel),
-            *get_flag("arg_fargene_savetmpfiles", arg_fargene_savetmpfiles),
-            *get_flag("arg_fargene_score", arg_fargene_score),
-            *get_flag("arg_fargene_minorflength", arg_fargene_minorflength),
-            *get_flag("arg_fargene_orffinder", arg_fargene_orffinder),
-            *get_flag("arg_fargene_translationformat", arg_fargene_translationformat),
-            *get_flag("arg_skip_rgi", arg_skip_rgi),
-            *get_flag("arg_rgi_savejson", arg_rgi_savejson),
-            *get_flag("arg_rgi_savetmpfiles", arg_rgi_savetmpfiles),
-            *get_flag("arg_rgi_alignmenttool", arg_rgi_alignmenttool),
-            *get_flag("arg_rgi_includeloose", arg_rgi_includeloose),
-            *get_flag("arg_rgi_excludenudge", arg_rgi_excludenudge),
-            *get_flag("arg_rgi_lowquality", arg_rgi_lowquality),
-            *get_flag("arg_rgi_data", arg_rgi_data),
-            *get_flag("arg_skip_abricate", arg_skip_abricate),
-            *get_flag("arg_abricate_db", arg_abricate_db),
-            *get_flag("arg_abricate_minid", arg_abricate_minid),
-            *get_flag("arg_abricate_mincov", arg_abricate_mincov),
-            *get_flag("bgc_skip_antismash", bgc_skip_antismash),
-            *get_flag("bgc_antismash_databases", bgc_antismash_databases),
-            *get_flag(
-                "bgc_antismash_installationdirectory",
-                bgc_antismash_installationdirectory,
-            ),
-            *get_flag("bgc_antismash_sampleminlength", bgc_antismash_sampleminlength),
-            *get_flag("bgc_antismash_contigminlength", bgc_antismash_contigminlength),
-            *get_flag("bgc_antismash_cbgeneral", bgc_antismash_cbgeneral),
-            *get_flag("bgc_antismash_cbknownclusters", bgc_antismash_cbknownclusters),
-            *get_flag("bgc_antismash_cbsubclusters", bgc_antismash_cbsubclusters),
-            *get_flag("bgc_antismash_ccmibig", bgc_antismash_ccmibig),
-            *get_flag("bgc_antismash_smcogtrees", bgc_antismash_smcogtrees),
-            *get_flag(
-                "bgc_antismash_hmmdetectionstrictness",
-                bgc_antismash_hmmdetectionstrictness,
-            ),
-            *get_flag("bgc_antismash_taxon", bgc_antismash_taxon),
-            *get_flag("bgc_skip_deepbgc", bgc_skip_deepbgc),
-            *get_flag("bgc_deepbgc_database", bgc_deepbgc_database),
-            *get_flag("bgc_deepbgc_score", bgc_deepbgc_score),
-            *get_flag("bgc_deepbgc_prodigalsinglemode", bgc_deepbgc_prodigalsinglemode),
-            *get_flag("bgc_deepbgc_mergemaxproteingap", bgc_deepbgc_mergemaxproteingap),
-            *get_flag("bgc_deepbgc_mergemaxnuclgap", bgc_deepbgc_mergemaxnuclgap),
-            *get_flag("bgc_deepbgc_minnucl", bgc_deepbgc_minnucl),
-            *get_flag("bgc_deepbgc_minproteins", bgc_deepbgc_minproteins),
-            *get_flag("bgc_deepbgc_mindomains", bgc_deepbgc_mindomains),
-            *get_flag("bgc_deepbgc_minbiodomains", bgc_deepbgc_minbiodomains),
-            *get_flag("bgc_deepbgc_classifierscore", bgc_deepbgc_classifierscore),
-            *get_flag("bgc_skip_gecco", bgc_skip_gecco),
-            *get_flag("bgc_gecco_mask", bgc_gecco_mask),
-            *get_flag("bgc_gecco_cds", bgc_gecco_cds),
-            *get_flag("bgc_gecco_pfilter", bgc_gecco_pfilter),
-            *get_flag("bgc_gecco_threshold", bgc_gecco_threshold),
-            *get_flag("bgc_gecco_edgedistance", bgc_gecco_edgedistance),
-            *get_flag("bgc_skip_hmmsearch", bgc_skip_hmmsearch),
-            *get_flag("bgc_hmmsearch_models", bgc_hmmsearch_models),
-            *get_flag("bgc_hmmsearch_savealignments", bgc_hmmsearch_savealignments),
-            *get_flag("bgc_hmmsearch_savetargets", bgc_hmmsearch_savetargets),
-            *get_flag("bgc_hmmsearch_savedomains", bgc_hmmsearch_savedomains),
-            *get_flag(
-                "arg_hamronization_summarizeformat", arg_hamronization_summarizeformat
-            ),
-            *get_flag("multiqc_methods_description", multiqc_methods_description),
+            *nextflow_flags(params),
         ]
 
         print("Launching Nextflow Runtime")
@@ -388,6 +386,18 @@ def nextflow_runtime(
             "K8S_STORAGE_CLAIM_NAME": pvc_name,
             "NXF_DISABLE_CHECK_LATEST": "true",
         }
+
+        if log_dir is not None:
+            streamer = LogStreamer(
+                log_dir,
+                [
+                    shared_dir / ".nextflow.log",
+                    pipeline_info / "execution_trace.txt",
+                    pipeline_info / "execution_timeline.html",
+                ],
+            )
+            streamer.start()
+
         subprocess.run(
             cmd,
             env=env,
@@ -397,301 +407,126 @@ def nextflow_runtime(
     finally:
         print()
 
+        if streamer is not None:
+            streamer.stop()
+
+        try:
+            write_trace_summary(
+                pipeline_info / "execution_trace.txt", shared_dir, pipeline_info
+            )
+        except Exception as e:
+            print(f"Failed to summarize execution trace: {e}")
+
+        if pipeline_info.exists() and outdir.remote_path is not None:
+            for report in sorted(pipeline_info.iterdir()):
+                remote = LPath(
+                    urljoins(outdir.remote_path, "pipeline_info", report.name)
+                )
+                print(f"Uploading {report.name} to {remote.path}")
+                remote.upload_from(report)
+
         nextflow_log = shared_dir / ".nextflow.log"
         if nextflow_log.exists():
-            name = _get_execution_name()
-            if name is None:
+            if log_dir is None:
                 print("Skipping logs upload, failed to get execution name")
             else:
-                remote = LPath(
-                    urljoins(
-                        "latch:///your_log_dir/nf_nf_core_funcscan",
-                        name,
-                        "nextflow.log",
-                    )
-                )
+                remote = LPath(urljoins(log_dir, "nextflow.log"))
                 print(f"Uploading .nextflow.log to {remote.path}")
                 remote.upload_from(nextflow_log)
 
 
-@workflow(metadata._nextflow_metadata)
-def nf_nf_core_funcscan(
-    input: LatchFile,
-    outdir: typing_extensions.Annotated[LatchDir, FlyteAnnotation({"output": True})],
-    email: typing.Optional[str],
-    multiqc_title: typing.Optional[str],
-    run_amp_screening: typing.Optional[bool],
-    run_arg_screening: typing.Optional[bool],
-    run_bgc_screening: typing.Optional[bool],
-    save_annotations: typing.Optional[bool],
-    annotation_bakta_db_localpath: typing.Optional[str],
-    annotation_bakta_db_downloadtype: typing.Optional[str],
-    annotation_bakta_complete: typing.Optional[bool],
-    annotation_bakta_renamecontigheaders: typing.Optional[bool],
-    annotation_bakta_compliant: typing.Optional[bool],
-    annotation_bakta_trna: typing.Optional[bool],
-    annotation_bakta_tmrna: typing.Optional[bool],
-    annotation_bakta_rrna: typing.Optional[bool],
-    annotation_bakta_ncrna: typing.Optional[bool],
-    annotation_bakta_ncrnaregion: typing.Optional[bool],
-    annotation_bakta_crispr: typing.Optional[bool],
-    annotation_bakta_skipcds: typing.Optional[bool],
-    annotation_bakta_pseudo: typing.Optional[bool],
-    annotation_bakta_skipsorf: typing.Optional[bool],
-    annotation_bakta_gap: typing.Optional[bool],
-    annotation_bakta_ori: typing.Optional[bool],
-    annotation_bakta_activate_plot: typing.Optional[bool],
-    annotation_prokka_singlemode: typing.Optional[bool],
-    annotation_prokka_rawproduct: typing.Optional[bool],
-    annotation_prokka_cdsrnaolap: typing.Optional[bool],
-    annotation_prokka_rnammer: typing.Optional[bool],
-    annotation_prokka_compliant: typing.Optional[bool],
-    annotation_prokka_addgenes: typing.Optional[bool],
-    annotation_prokka_retaincontigheaders: typing.Optional[bool],
-    annotation_prodigal_singlemode: typing.Optional[bool],
-    annotation_prodigal_closed: typing.Optional[bool],
-    annotation_prodigal_forcenonsd: typing.Optional[bool],
-    annotation_pyrodigal_singlemode: typing.Optional[bool],
-    annotation_pyrodigal_closed: typing.Optional[bool],
-    annotation_pyrodigal_forcenonsd: typing.Optional[bool],
-    save_databases: typing.Optional[bool],
-    amp_skip_amplify: typing.Optional[bool],
-    amp_skip_ampir: typing.Optional[bool],
-    amp_skip_hmmsearch: typing.Optional[bool],
-    amp_hmmsearch_models: typing.Optional[str],
-    amp_hmmsearch_savealignments: typing.Optional[bool],
-    amp_hmmsearch_savetargets: typing.Optional[bool],
-    amp_hmmsearch_savedomains: typing.Optional[bool],
-    amp_skip_macrel: typing.Optional[bool],
-    amp_ampcombi_db: typing.Optional[str],
-    arg_skip_amrfinderplus: typing.Optional[bool],
-    arg_amrfinderplus_db: typing.Optional[str],
-    arg_amrfinderplus_plus: typing.Optional[bool],
-    arg_amrfinderplus_name: typing.Optional[bool],
-    arg_skip_deeparg: typing.Optional[bool],
-    arg_deeparg_data: typing.Optional[str],
-    arg_skip_fargene: typing.Optional[bool],
-    arg_fargene_savetmpfiles: typing.Optional[bool],
-    arg_fargene_score: typing.Optional[float],
-    arg_fargene_orffinder: typing.Optional[bool],
-    arg_skip_rgi: typing.Optional[bool],
-    arg_rgi_savejson: typing.Optional[bool],
-    arg_rgi_savetmpfiles: typing.Optional[bool],
-    arg_rgi_lowquality: typing.Optional[bool],
-    arg_skip_abricate: typing.Optional[bool],
-    bgc_skip_antismash: typing.Optional[bool],
-    bgc_antismash_databases: typing.Optional[str],
-    bgc_antismash_installationdirectory: typing.Optional[str],
-    bgc_antismash_cbgeneral: typing.Optional[bool],
-    bgc_antismash_cbknownclusters: typing.Optional[bool],
-    bgc_antismash_cbsubclusters: typing.Optional[bool],
-    bgc_antismash_ccmibig: typing.Optional[bool],
-    bgc_antismash_smcogtrees: typing.Optional[bool],
-    bgc_skip_deepbgc: typing.Optional[bool],
-    bgc_deepbgc_database: typing.Optional[str],
-    bgc_deepbgc_prodigalsinglemode: typing.Optional[bool],
-    bgc_skip_gecco: typing.Optional[bool],
-    bgc_gecco_mask: typing.Optional[bool],
-    bgc_skip_hmmsearch: typing.Optional[bool],
-    bgc_hmmsearch_models: typing.Optional[str],
-    bgc_hmmsearch_savealignments: typing.Optional[bool],
-    bgc_hmmsearch_savetargets: typing.Optional[bool],
-    bgc_hmmsearch_savedomains: typing.Optional[bool],
-    multiqc_methods_description: typing.Optional[str],
-    annotation_tool: typing.Optional[str] = "pyrodigal",
-    annotation_bakta_mincontiglen: typing.Optional[int] = 1,
-    annotation_bakta_translationtable: typing.Optional[int] = 11,
-    annotation_bakta_gram: typing.Optional[str] = "?",
-    annotation_prokka_kingdom: typing.Optional[str] = "Bacteria",
-    annotation_prokka_gcode: typing.Optional[int] = 11,
-    annotation_prokka_mincontiglen: typing.Optional[int] = 1,
-    annotation_prokka_evalue: typing.Optional[float] = 1e-06,
-    annotation_prokka_coverage: typing.Optional[int] = 80,
-    annotation_prodigal_transtable: typing.Optional[int] = 11,
-    annotation_pyrodigal_transtable: typing.Optional[int] = 11,
-    amp_ampir_model: typing.Optional[str] = "precursor",
-    amp_ampir_minlength: typing.Optional[int] = 10,
-    amp_ampcombi_cutoff: typing.Optional[float] = 0.4,
-    arg_amrfinderplus_identmin: typing.Optional[float] = -1.0,
-    arg_amrfinderplus_coveragemin: typing.Optional[float] = 0.5,
-    arg_amrfinderplus_translationtable: typing.Optional[int] = 11,
-    arg_deeparg_data_version: typing.Optional[int] = 2,
-    arg_deeparg_model: typing.Optional[str] = "LS",
-    arg_deeparg_minprob: typing.Optional[float] = 0.8,
-    arg_deeparg_alignmentevalue: typing.Optional[float] = 1e-10,
-    arg_deeparg_alignmentidentity: typing.Optional[int] = 50,
-    arg_deeparg_alignmentoverlap: typing.Optional[float] = 0.8,
-    arg_deeparg_numalignmentsperentry: typing.Optional[int] = 1000,
-    arg_fargene_hmmmodel: typing.Optional[
-        str
-    ] = "class_a,class_b_1_2,class_b_3,class_c,class_d_1,class_d_2,qnr,tet_efflux,tet_rpg,tet_enzyme",
-    arg_fargene_minorflength: typing.Optional[int] = 90,
-    arg_fargene_translationformat: typing.Optional[str] = "pearson",
-    arg_rgi_alignmenttool: typing.Optional[str] = "BLAST",
-    arg_rgi_includeloose: typing.Optional[bool] = True,
-    arg_rgi_excludenudge: typing.Optional[bool] = True,
-    arg_rgi_data: typing.Optional[str] = "NA",
-    arg_abricate_db: typing.Optional[str] = "ncbi",
-    arg_abricate_minid: typing.Optional[int] = 80,
-    arg_abricate_mincov: typing.Optional[int] = 80,
-    bgc_antismash_sampleminlength: typing.Optional[int] = 1000,
-    bgc_antismash_contigminlength: typing.Optional[int] = 1000,
-    bgc_antismash_hmmdetectionstrictness: typing.Optional[str] = "relaxed",
-    bgc_antismash_taxon: typing.Optional[str] = "bacteria",
-    bgc_deepbgc_score: typing.Optional[float] = 0.5,
-    bgc_deepbgc_mergemaxproteingap: typing.Optional[int] = 0,
-    bgc_deepbgc_mergemaxnuclgap: typing.Optional[int] = 0,
-    bgc_deepbgc_minnucl: typing.Optional[int] = 1,
-    bgc_deepbgc_minproteins: typing.Optional[int] = 1,
-    bgc_deepbgc_mindomains: typing.Optional[int] = 1,
-    bgc_deepbgc_minbiodomains: typing.Optional[int] = 0,
-    bgc_deepbgc_classifierscore: typing.Optional[float] = 0.5,
-    bgc_gecco_cds: typing.Optional[int] = 3,
-    bgc_gecco_pfilter: typing.Optional[float] = 1e-09,
-    bgc_gecco_threshold: typing.Optional[float] = 0.8,
-    bgc_gecco_edgedistance: typing.Optional[int] = 0,
-    arg_hamronization_summarizeformat: typing.Optional[str] = "tsv",
+# Fail at registration rather than at run time if a parameter is not forwarded
+if not executing_task:
+    check_parameters(nextflow_runtime.python_interface.inputs.keys() - {"pvc_name"})
+
+
+@custom_task(cpu=4, memory=16, storage_gib=200)
+def merge_shards(
+    outdir: LatchDir, shard_outdirs: typing.List[str], hamronization_format: str
 ) -> None:
-    """
-    nf-core/funcscan
+    from latch.ldata.path import LPath
+    from latch.ldata.type import LatchPathError
+    from latch_cli.utils import urljoins
 
-    Sample Description
+    from wf.sharding import merge_summaries, summary_paths
+
+    work_dir = Path("/root/shard_merge")
+
+    shard_dirs = []
+    for shard_outdir in shard_outdirs:
+        local_dir = work_dir / Path(shard_outdir).name
+        for relative in summary_paths(hamronization_format):
+            remote = LPath(urljoins(shard_outdir, str(relative)))
+            local = local_dir / relative
+            local.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                remote.download(local)
+            except LatchPathError:
+                # Screening type not run, or no results in this shard
+                print(f"Skipping {remote.path}, not found")
+        shard_dirs.append(local_dir)
+
+    merged_dir = work_dir / "merged"
+    for relative in merge_summaries(shard_dirs, merged_dir, hamronization_format):
+        remote = LPath(urljoins(outdir.remote_path, str(relative)))
+        print(f"Uploading {relative} to {remote.path}")
+        remote.upload_from(merged_dir / relative)
+
+
+@custom_task(cpu=1, memory=2, storage_gib=10)(
+    execution_mode=PythonFunctionTask.ExecutionBehavior.DYNAMIC
+)
+@inputs_of(nf_nf_core_funcscan, pvc_name_input)
+def nextflow_shards(**params) -> None:
+    """
+    Split the samplesheet into shards balanced by total FASTA size and run one
+    Nextflow runtime per shard, each on its own storage volume and with its
+    own output directory `<outdir>/shards/shard_<n>`, then merge the cohort
+    summaries of all shards into `<outdir>/reports`.
     """
 
-    pvc_name: str = initialize()
-    nextflow_runtime(
-        pvc_name=pvc_name,
-        input=input,
+    import tempfile
+
+    from latch.ldata.path import LPath
+    from latch_cli.utils import urljoins
+
+    from wf.sharding import shard_samplesheets
+
+    pvc_name = params.pop("pvc_name")
+    shards = params.pop("shards")
+    outdir = params["outdir"]
+
+    sheets = shard_samplesheets(Path(params["input"].local_path), shards)
+
+    runtimes = []
+    shard_outdirs = []
+    for i, sheet in enumerate(sheets, start=1):
+        shard_outdir = urljoins(outdir.remote_path, "shards", f"shard_{i}")
+        samplesheet = Path(tempfile.mkdtemp()) / "samplesheet.csv"
+        samplesheet.write_text(sheet)
+        remote = LPath(urljoins(shard_outdir, "samplesheet.csv"))
+        remote.upload_from(samplesheet)
+
+        # The first shard runs on the volume provisioned by the workflow
+        runtimes.append(
+            nextflow_runtime(
+                pvc_name=pvc_name if i == 1 else initialize(),
+                **{
+                    **params,
+                    "input": LatchFile(remote.path),
+                    "outdir": LatchDir(shard_outdir),
+                },
+            )
+        )
+        shard_outdirs.append(shard_outdir)
+
+    merged = merge_shards(
         outdir=outdir,
-        email=email,
-        multiqc_title=multiqc_title,
-        run_amp_screening=run_amp_screening,
-        run_arg_screening=run_arg_screening,
-        run_bgc_screening=run_bgc_screening,
-        annotation_tool=annotation_tool,
-        save_annotations=save_annotations,
-        annotation_bakta_db_localpath=annotation_bakta_db_localpath,
-        annotation_bakta_db_downloadtype=annotation_bakta_db_downloadtype,
-        annotation_bakta_mincontiglen=annotation_bakta_mincontiglen,
-        annotation_bakta_translationtable=annotation_bakta_translationtable,
-        annotation_bakta_gram=annotation_bakta_gram,
-        annotation_bakta_complete=annotation_bakta_complete,
-        annotation_bakta_renamecontigheaders=annotation_bakta_renamecontigheaders,
-        annotation_bakta_compliant=annotation_bakta_compliant,
-        annotation_bakta_trna=annotation_bakta_trna,
-        annotation_bakta_tmrna=annotation_bakta_tmrna,
-        annotation_bakta_rrna=annotation_bakta_rrna,
-        annotation_bakta_ncrna=annotation_bakta_ncrna,
-        annotation_bakta_ncrnaregion=annotation_bakta_ncrnaregion,
-        annotation_bakta_crispr=annotation_bakta_crispr,
-        annotation_bakta_skipcds=annotation_bakta_skipcds,
-        annotation_bakta_pseudo=annotation_bakta_pseudo,
-        annotation_bakta_skipsorf=annotation_bakta_skipsorf,
-        annotation_bakta_gap=annotation_bakta_gap,
-        annotation_bakta_ori=annotation_bakta_ori,
-        annotation_bakta_activate_plot=annotation_bakta_activate_plot,
-        annotation_prokka_singlemode=annotation_prokka_singlemode,
-        annotation_prokka_rawproduct=annotation_prokka_rawproduct,
-        annotation_prokka_kingdom=annotation_prokka_kingdom,
-        annotation_prokka_gcode=annotation_prokka_gcode,
-        annotation_prokka_mincontiglen=annotation_prokka_mincontiglen,
-        annotation_prokka_evalue=annotation_prokka_evalue,
-        annotation_prokka_coverage=annotation_prokka_coverage,
-        annotation_prokka_cdsrnaolap=annotation_prokka_cdsrnaolap,
-        annotation_prokka_rnammer=annotation_prokka_rnammer,
-        annotation_prokka_compliant=annotation_prokka_compliant,
-        annotation_prokka_addgenes=annotation_prokka_addgenes,
-        annotation_prokka_retaincontigheaders=annotation_prokka_retaincontigheaders,
-        annotation_prodigal_singlemode=annotation_prodigal_singlemode,
-        annotation_prodigal_closed=annotation_prodigal_closed,
-        annotation_prodigal_transtable=annotation_prodigal_transtable,
-        annotation_prodigal_forcenonsd=annotation_prodigal_forcenonsd,
-        annotation_pyrodigal_singlemode=annotation_pyrodigal_singlemode,
-        annotation_pyrodigal_closed=annotation_pyrodigal_closed,
-        annotation_pyrodigal_transtable=annotation_pyrodigal_transtable,
-        annotation_pyrodigal_forcenonsd=annotation_pyrodigal_forcenonsd,
-        save_databases=save_databases,
-        amp_skip_amplify=amp_skip_amplify,
-        amp_skip_ampir=amp_skip_ampir,
-        amp_ampir_model=amp_ampir_model,
-        amp_ampir_minlength=amp_ampir_minlength,
-        amp_skip_hmmsearch=amp_skip_hmmsearch,
-        amp_hmmsearch_models=amp_hmmsearch_models,
-        amp_hmmsearch_savealignments=amp_hmmsearch_savealignments,
-        amp_hmmsearch_savetargets=amp_hmmsearch_savetargets,
-        amp_hmmsearch_savedomains=amp_hmmsearch_savedomains,
-        amp_skip_macrel=amp_skip_macrel,
-        amp_ampcombi_db=amp_ampcombi_db,
-        amp_ampcombi_cutoff=amp_ampcombi_cutoff,
-        arg_skip_amrfinderplus=arg_skip_amrfinderplus,
-        arg_amrfinderplus_db=arg_amrfinderplus_db,
-        arg_amrfinderplus_identmin=arg_amrfinderplus_identmin,
-        arg_amrfinderplus_coveragemin=arg_amrfinderplus_coveragemin,
-        arg_amrfinderplus_translationtable=arg_amrfinderplus_translationtable,
-        arg_amrfinderplus_plus=arg_amrfinderplus_plus,
-        arg_amrfinderplus_name=arg_amrfinderplus_name,
-        arg_skip_deeparg=arg_skip_deeparg,
-        arg_deeparg_data=arg_deeparg_data,
-        arg_deeparg_data_version=arg_deeparg_data_version,
-        arg_deeparg_model=arg_deeparg_model,
-        arg_deeparg_minprob=arg_deeparg_minprob,
-        arg_deeparg_alignmentevalue=arg_deeparg_alignmentevalue,
-        arg_deeparg_alignmentidentity=arg_deeparg_alignmentidentity,
-        arg_deeparg_alignmentoverlap=arg_deeparg_alignmentoverlap,
-        arg_deeparg_numalignmentsperentry=arg_deeparg_numalignmentsperentry,
-        arg_skip_fargene=arg_skip_fargene,
-        arg_fargene_hmmmodel=arg_fargene_hmmmodel,
-        arg_fargene_savetmpfiles=arg_fargene_savetmpfiles,
-        arg_fargene_score=arg_fargene_score,
-        arg_fargene_minorflength=arg_fargene_minorflength,
-        arg_fargene_orffinder=arg_fargene_orffinder,
-        arg_fargene_translationformat=arg_fargene_translationformat,
-        arg_skip_rgi=arg_skip_rgi,
-        arg_rgi_savejson=arg_rgi_savejson,
-        arg_rgi_savetmpfiles=arg_rgi_savetmpfiles,
-        arg_rgi_alignmenttool=arg_rgi_alignmenttool,
-        arg_rgi_includeloose=arg_rgi_includeloose,
-        arg_rgi_excludenudge=arg_rgi_excludenudge,
-        arg_rgi_lowquality=arg_rgi_lowquality,
-        arg_rgi_data=arg_rgi_data,
-        arg_skip_abricate=arg_skip_abricate,
-        arg_abricate_db=arg_abricate_db,
-        arg_abricate_minid=arg_abricate_minid,
-        arg_abricate_mincov=arg_abricate_mincov,
-        bgc_skip_antismash=bgc_skip_antismash,
-        bgc_antismash_databases=bgc_antismash_databases,
-        bgc_antismash_installationdirectory=bgc_antismash_installationdirectory,
-        bgc_antismash_sampleminlength=bgc_antismash_sampleminlength,
-        bgc_antismash_contigminlength=bgc_antismash_contigminlength,
-        bgc_antismash_cbgeneral=bgc_antismash_cbgeneral,
-        bgc_antismash_cbknownclusters=bgc_antismash_cbknownclusters,
-        bgc_antismash_cbsubclusters=bgc_antismash_cbsubclusters,
-        bgc_antismash_ccmibig=bgc_antismash_ccmibig,
-        bgc_antismash_smcogtrees=bgc_antismash_smcogtrees,
-        bgc_antismash_hmmdetectionstrictness=bgc_antismash_hmmdetectionstrictness,
-        bgc_antismash_taxon=bgc_antismash_taxon,
-        bgc_skip_deepbgc=bgc_skip_deepbgc,
-        bgc_deepbgc_database=bgc_deepbgc_database,
-        bgc_deepbgc_score=bgc_deepbgc_score,
-        bgc_deepbgc_prodigalsinglemode=bgc_deepbgc_prodigalsinglemode,
-        bgc_deepbgc_mergemaxproteingap=bgc_deepbgc_mergemaxproteingap,
-        bgc_deepbgc_mergemaxnuclgap=bgc_deepbgc_mergemaxnuclgap,
-        bgc_deepbgc_minnucl=bgc_deepbgc_minnucl,
-        bgc_deepbgc_minproteins=bgc_deepbgc_minproteins,
-        bgc_deepbgc_mindomains=bgc_deepbgc_mindomains,
-        bgc_deepbgc_minbiodomains=bgc_deepbgc_minbiodomains,
-        bgc_deepbgc_classifierscore=bgc_deepbgc_classifierscore,
-        bgc_skip_gecco=bgc_skip_gecco,
-        bgc_gecco_mask=bgc_gecco_mask,
-        bgc_gecco_cds=bgc_gecco_cds,
-        bgc_gecco_pfilter=bgc_gecco_pfilter,
-        bgc_gecco_threshold=bgc_gecco_threshold,
-        bgc_gecco_edgedistance=bgc_gecco_edgedistance,
-        bgc_skip_hmmsearch=bgc_skip_hmmsearch,
-        bgc_hmmsearch_models=bgc_hmmsearch_models,
-        bgc_hmmsearch_savealignments=bgc_hmmsearch_savealignments,
-        bgc_hmmsearch_savetargets=bgc_hmmsearch_savetargets,
-        bgc_hmmsearch_savedomains=bgc_hmmsearch_savedomains,
-        arg_hamronization_summarizeformat=arg_hamronization_summarizeformat,
-        multiqc_methods_description=multiqc_methods_description,
+        shard_outdirs=shard_outdirs,
+        hamronization_format=params["arg_hamronization_summarizeformat"] or "tsv",
     )
+    for runtime in runtimes:
+        runtime >> merged
+
+
+nf_nf_core_funcscan = workflow_decorator()(nf_nf_core_funcscan)
@@ -0,0 +1,121 @@
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from latch.ldata.path import LPath
+from latch_cli.utils import urljoins
+
+# Seconds between two upload rounds and the largest slice of a file held in
+# memory at once. Both can be tuned per deployment through the environment.
+upload_interval = float(os.environ.get("FUNCSCAN_LOG_UPLOAD_INTERVAL", 120))
+max_chunk_bytes = int(
+    os.environ.get("FUNCSCAN_LOG_UPLOAD_CHUNK_BYTES", 8 * 1024 * 1024)
+)
+max_retries = int(os.environ.get("FUNCSCAN_LOG_UPLOAD_RETRIES", 3))
+
+
+class LogStreamer(threading.Thread):
+    """
+    Tail a set of local files and push newly appended bytes to a Latch
+    directory as numbered chunks (`<file name>.parts/000_000000`, `000_000001`,
+    ...). The first number is the generation of the file, which is bumped when
+    the file is truncated or replaced and the chunks start again from 0.
+
+    Concatenating the chunks of the latest generation of a file in order
+    reproduces the file as it was at the time of the last upload round.
+    """
+
+    def __init__(
+        self,
+        remote_dir: str,
+        paths: List[Path],
+        interval: float = upload_interval,
+        chunk_bytes: int = max_chunk_bytes,
+        retries: int = max_retries,
+    ):
+        super().__init__(name="nextflow-log-streamer", daemon=True)
+
+        self.remote_dir = remote_dir
+        self.paths = paths
+        self.interval = interval
+        self.chunk_bytes = chunk_bytes
+        self.retries = retries
+
+        self._offsets: Dict[Path, int] = {path: 0 for path in paths}
+        self._chunks: Dict[Path, int] = {path: 0 for path in paths}
+        self._generations: Dict[Path, int] = {path: 0 for path in paths}
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.flush()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
+        self.flush()
+
+    def flush(self) -> None:
+        for path in self.paths:
+            try:
+                self._flush_file(path)
+            except Exception as e:
+                print(
+                    f"Failed to stream {path.name} to {self.remote_dir}: {e}",
+                    flush=True,
+                )
+
+    def _flush_file(self, path: Path) -> None:
+        if not path.exists():
+            return
+
+        size = path.stat().st_size
+        if size < self._offsets[path]:
+            # The file was truncated or replaced, re-send it from the beginning
+            # as a new generation so that its chunks are not appended to the old ones
+            self._offsets[path] = 0
+            self._chunks[path] = 0
+            self._generations[path] += 1
+
+        while self._offsets[path] < size:
+            with path.open("rb") as f:
+                f.seek(self._offsets[path])
+                data = f.read(min(self.chunk_bytes, size - self._offsets[path]))
+
+            if not data:
+                return
+
+            remote = urljoins(
+                self.remote_dir,
+                f"{path.name}.parts",
+                f"{self._generations[path]:03d}_{self._chunks[path]:06d}",
+            )
+            if not self._upload(data, remote):
+                # Keep the offset, the same bytes are retried on the next round
+                return
+
+            self._offsets[path] += len(data)
+            self._chunks[path] += 1
+
+    def _upload(self, data: bytes, remote: str) -> bool:
+        with tempfile.NamedTemporaryFile(prefix="nf-log-chunk-") as tmp:
+            tmp.write(data)
+            tmp.flush()
+
+            for attempt in range(1, self.retries + 1):
+                try:
+                    LPath(remote).upload_from(Path(tmp.name))
+                    return True
+                except Exception as e:
+                    print(
+                        f"Upload of {remote} failed (attempt {attempt}/{self.retries}): {e}",
+                        flush=True,
+                    )
+                    if attempt < self.retries:
+                        time.sleep(2**attempt)
+
+        return False
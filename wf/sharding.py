@@ -0,0 +1,293 @@
+import csv
+import heapq
+import importlib.util
+import io
+import os
+import re
+import statistics
+import sys
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Cohort summaries merged across shards, relative to the output directory of a
+# run. The hAMRonization summary is named after the summary format.
+combgc_summary = Path("reports/combgc/combgc_complete_summary.tsv")
+ampcombi_summary = Path("reports/ampcombi/ampcombi_complete_summary.csv.gz")
+ampcombi_index = Path("reports/ampcombi/ampcombi_complete_summary.index.tsv")
+hamronization_dir = Path("reports/hamronization_summarize")
+
+# The interactive (html) hAMRonization report cannot be merged, it is kept per shard
+mergeable_hamronization_formats = {"tsv", "json", "jsonl"}
+
+bin_dir = Path(__file__).resolve().parent.parent / "bin"
+
+
+def load_bin_script(name: str):
+    """
+    Import a script bundled with the pipeline in bin/, so that shards are
+    merged with the same code as the pipeline modules use.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.spec_from_file_location(name, bin_dir / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+
+    return module
+
+
+def hamronization_summary(summary_format: str) -> Path:
+    return hamronization_dir / f"hamronization_combined_report.{summary_format}"
+
+
+def shard_name(outdir: Optional[str]) -> Optional[str]:
+    """
+    `shard_<n>` if outdir is the output directory of a shard, else None.
+    """
+    if outdir is None:
+        return None
+    match = re.search(r"/shards/(shard_\d+)/?$", outdir)
+    return match.group(1) if match else None
+
+
+def summary_paths(summary_format: str) -> List[Path]:
+    paths = [combgc_summary, ampcombi_summary, ampcombi_index]
+    if summary_format in mergeable_hamronization_formats:
+        paths.append(hamronization_summary(summary_format))
+    return paths
+
+
+########################
+# SAMPLESHEET SHARDING
+########################
+
+
+def read_samplesheet(path: Path) -> Tuple[List[str], List[Dict[str, str]]]:
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        rows = [
+            row
+            for row in reader
+            if any(value.strip() for value in row.values() if value)
+        ]
+        return list(reader.fieldnames or []), rows
+
+
+def fasta_size(path: str) -> Optional[int]:
+    """
+    Size in bytes of an input FASTA file (compressed size for gzipped files),
+    None if it cannot be determined.
+    """
+    try:
+        if path.startswith("latch://"):
+            from latch.ldata.path import LPath
+
+            return LPath(path).size()
+        if path.startswith(("http://", "https://")):
+            request = urllib.request.Request(path, method="HEAD")
+            with urllib.request.urlopen(request, timeout=60) as response:
+                length = response.headers.get("Content-Length")
+                return int(length) if length is not None else None
+        return os.path.getsize(path)
+    except Exception as e:
+        print(f"Failed to get the size of {path}: {e}")
+        return None
+
+
+def assign_shards(sizes: Sequence[Optional[int]], n_shards: int) -> List[List[int]]:
+    """
+    Indices of the samples of each shard. Samples are assigned greedily,
+    largest first, to the shard with the fewest bytes so far, as contigs in
+    bin/shard_contigs.py. Samples of unknown size count as the median size.
+    """
+    known = [size for size in sizes if size is not None]
+    fallback = statistics.median(known) if known else 1
+    weights = [fallback if size is None else size for size in sizes]
+
+    n_shards = max(1, min(n_shards, len(weights)))
+    heap = [(0, shard) for shard in range(n_shards)]
+    shards: List[List[int]] = [[] for _ in range(n_shards)]
+    for i in sorted(range(len(weights)), key=lambda i: (-weights[i], i)):
+        total, shard = heapq.heappop(heap)
+        shards[shard].append(i)
+        heapq.heappush(heap, (total + weights[i], shard))
+
+    # Keep the samplesheet order within shards
+    return [sorted(shard) for shard in shards]
+
+
+def shard_samplesheets(path: Path, n_shards: int) -> List[str]:
+    """
+    Split a samplesheet into at most n_shards samplesheets balanced by total
+    FASTA size, returned as CSV text.
+    """
+    fieldnames, rows = read_samplesheet(path)
+    if not rows:
+        raise RuntimeError(f"Samplesheet {path} has no samples")
+
+    sizes = [fasta_size(row["fasta"]) for row in rows]
+    sheets = []
+    for shard, indices in enumerate(assign_shards(sizes, n_shards), start=1):
+        total = sum(sizes[i] or 0 for i in indices)
+        print(
+            f"Shard {shard}: {len(indices)} samples, {total / 1024**3:.2f} GiB of FASTA"
+        )
+
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=fieldnames, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows[i] for i in indices)
+        sheets.append(out.getvalue())
+
+    return sheets
+
+
+########################
+# SUMMARY MERGING
+########################
+
+
+def merge_combgc(summaries: List[Path], output: Path) -> None:
+    """
+    Concatenate comBGC summaries, which hold disjoint samples, with one header.
+    """
+    header = None
+    with open(output, "w") as out:
+        for summary in summaries:
+            with open(summary) as f:
+                first = f.readline()
+                if not first:
+                    continue
+                if header is None:
+                    header = first
+                    out.write(header)
+                elif first != header:
+                    raise RuntimeError(
+                        f"Header of {summary} differs from the first comBGC summary"
+                    )
+                for line in f:
+                    if line.strip():
+                        out.write(line if line.endswith("\n") else line + "\n")
+
+
+def merge_ampcombi(
+    summaries: List[Path], indexes: List[Path], output: Path, index: Path
+) -> None:
+    """
+    Merge BGZF AMPcombi summaries and their per-sample indexes into one
+    summary sorted by sample, with a new index.
+    """
+    ampcombi_merge = load_bin_script("ampcombi_merge")
+
+    entries = []
+    for summary, summary_index in zip(summaries, indexes):
+        with open(summary_index) as f:
+            cols = f.readline().rstrip("\n").split("\t")
+            for line in f:
+                entries.append(
+                    (summary, dict(zip(cols, line.rstrip("\n").split("\t"))))
+                )
+    entries.sort(key=lambda entry: entry[1]["sample"])
+
+    merged = []
+    with open(output, "wb") as handle:
+        writer = ampcombi_merge.BgzfWriter(handle)
+        if entries:
+            # The header blocks of a summary precede its first sample
+            summary = entries[0][0]
+            first_start = min(
+                int(entry["start"]) for path, entry in entries if path == summary
+            )
+            writer.write(ampcombi_merge.read_range(summary, 0, first_start))
+            writer.flush()
+        for summary, entry in entries:
+            start = writer.offset
+            writer.write(
+                ampcombi_merge.read_range(
+                    summary, int(entry["start"]), int(entry["end"])
+                )
+            )
+            writer.flush()
+            merged.append(
+                [entry["sample"], entry["rows"], start, writer.offset, start << 16]
+            )
+        writer.close()
+
+    with open(index, "w") as f:
+        f.write("\t".join(ampcombi_merge.index_cols) + "\n")
+        for entry in merged:
+            f.write("\t".join(str(value) for value in entry) + "\n")
+
+
+def merge_hamronization(
+    summaries: List[Path], output: Path, summary_format: str
+) -> None:
+    hamronization_merge = load_bin_script("hamronization_merge")
+    hamronization_merge.merge(
+        [str(summary) for summary in summaries],
+        str(output),
+        summary_format,
+        None,
+        threads=os.cpu_count() or 1,
+        buffer_rows=500000,
+        window=1024,
+    )
+
+
+def merge_summaries(
+    shard_dirs: List[Path], merged_dir: Path, summary_format: str
+) -> List[Path]:
+    """
+    Merge the cohort summaries of the shard output directories into
+    merged_dir and return the merged paths, relative to merged_dir.
+    """
+
+    def existing(relative: Path) -> List[Path]:
+        return [shard / relative for shard in shard_dirs if (shard / relative).exists()]
+
+    written = []
+
+    combgc = existing(combgc_summary)
+    if combgc:
+        (merged_dir / combgc_summary).parent.mkdir(parents=True, exist_ok=True)
+        merge_combgc(combgc, merged_dir / combgc_summary)
+        written.append(combgc_summary)
+
+    ampcombi = [
+        shard
+        for shard in shard_dirs
+        if (shard / ampcombi_summary).exists() and (shard / ampcombi_index).exists()
+    ]
+    if ampcombi:
+        (merged_dir / ampcombi_summary).parent.mkdir(parents=True, exist_ok=True)
+        merge_ampcombi(
+            [shard / ampcombi_summary for shard in ampcombi],
+            [shard / ampcombi_index for shard in ampcombi],
+            merged_dir / ampcombi_summary,
+            merged_dir / ampcombi_index,
+        )
+        written += [ampcombi_summary, ampcombi_index]
+
+    if summary_format in mergeable_hamronization_formats:
+        hamronization = existing(hamronization_summary(summary_format))
+        if hamronization:
+            (merged_dir / hamronization_dir).mkdir(parents=True, exist_ok=True)
+            merge_hamronization(
+                hamronization,
+                merged_dir / hamronization_summary(summary_format),
+                summary_format,
+            )
+            written.append(hamronization_summary(summary_format))
+    else:
+        print(
+            f"The {summary_format} hAMRonization report cannot be merged,"
+            " it is kept in the output directory of every shard"
+        )
+
+    for relative in written:
+        print(f"Merged {relative} of {len(shard_dirs)} shards")
+
+    return written
@@ -0,0 +1,276 @@
+import csv
+import json
+import re
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# A resource selector is flagged as over-provisioned when even its most
+# demanding task stays below these fractions of what was requested.
+overprovisioned_memory_fraction = 0.25
+overprovisioned_cpu_fraction = 0.25
+
+summary_cols = [
+    "process",
+    "resource_selector",
+    "tasks",
+    "failed",
+    "retries",
+    "cpu_hours",
+    "wall_hours",
+    "requested_cpus",
+    "requested_memory_gb",
+    "peak_rss_gb",
+    "max_cpu_usage",
+    "read_gb",
+    "written_gb",
+]
+
+_gb = 1024**3
+_mem_units = {"KB": 1 / 1024**2, "MB": 1 / 1024, "GB": 1, "TB": 1024}
+
+
+@dataclass
+class ProcessSummary:
+    process: str
+    resource_selector: str = "NA"
+    tasks: int = 0
+    failed: int = 0
+    retries: int = 0
+    cpu_hours: float = 0.0
+    wall_hours: float = 0.0
+    requested_cpus: int = 0
+    requested_memory_gb: float = 0.0
+    peak_rss_gb: float = 0.0
+    max_cpu_usage: float = 0.0
+    read_gb: float = 0.0
+    written_gb: float = 0.0
+
+
+@dataclass
+class SelectorSummary:
+    resource_selector: str
+    base_cpus: Optional[int]
+    base_memory_gb: Optional[float]
+    processes: List[str] = field(default_factory=list)
+    peak_rss_gb: float = 0.0
+    max_cpus_used: float = 0.0
+    overprovisioned: bool = False
+
+
+def _number(value: Optional[str]) -> float:
+    # Raw trace files report missing values as "-"
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_base_config(path: Path) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    Read the first-attempt cpus/memory of every `withLabel`/`withName` block.
+    """
+
+    selectors = {}
+    text = path.read_text()
+    for kind, name, body in re.findall(
+        r"(withLabel|withName)\s*:\s*['\"]?([\w|]+)['\"]?\s*\{(.*?)\n\s*\}",
+        text,
+        re.DOTALL,
+    ):
+        cpus = re.search(r"cpus\s*=\s*(?:\{\s*check_max\(\s*)?(\d+)", body)
+        # Input size scaled requests give their fallback as the last argument
+        # of scale_resource( task, meta, 'memory', <n>.GB )
+        memory = re.search(
+            r"memory\s*=\s*(?:\{\s*check_max\(\s*)?"
+            r"(?:scale_resource\([^)]*?,\s*)?([\d.]+)\s*\.\s*([KMGT]B)",
+            body,
+        )
+        selectors[f"{kind}:{name}"] = {
+            "cpus": int(cpus.group(1)) if cpus else None,
+            "memory_gb": (
+                float(memory.group(1)) * _mem_units[memory.group(2)] if memory else None
+            ),
+        }
+    return selectors
+
+
+def parse_process_labels(project_dir: Path) -> Dict[str, str]:
+    """
+    Map every process name, including `include { X as Y }` aliases, to the
+    `process_*` label declared in its module.
+    """
+
+    labels = {}
+    for module in [
+        *project_dir.glob("modules/**/main.nf"),
+        *project_dir.glob("modules/local/*.nf"),
+    ]:
+        text = module.read_text()
+        process = re.search(r"^process\s+(\w+)\s*\{", text, re.MULTILINE)
+        label = re.search(r"^\s*label\s+['\"](process_\w+)['\"]", text, re.MULTILINE)
+        if process and label:
+            labels[process.group(1)] = label.group(1)
+
+    for workflow in [
+        *project_dir.glob("workflows/*.nf"),
+        *project_dir.glob("subworkflows/local/*.nf"),
+    ]:
+        for names, _ in re.findall(
+            r"include\s*\{(.*?)\}\s*from\s*['\"]([^'\"]+)['\"]", workflow.read_text()
+        ):
+            for include in names.split(";"):
+                parts = include.split()
+                if len(parts) == 3 and parts[1] == "as" and parts[0] in labels:
+                    labels[parts[2]] = labels[parts[0]]
+    return labels
+
+
+def resolve_selector(
+    process: str, selectors: Dict[str, dict], labels: Dict[str, str]
+) -> str:
+    # `withName` takes precedence over `withLabel`, as in Nextflow itself.
+    # Selectors such as 'A|B' are patterns matching the whole process name.
+    name = process.split(":")[-1]
+    if f"withName:{name}" in selectors:
+        return f"withName:{name}"
+    for selector in selectors:
+        kind, pattern = selector.split(":", 1)
+        if kind == "withName" and re.fullmatch(pattern, name):
+            return selector
+    if name in labels:
+        return f"withLabel:{labels[name]}"
+    return "NA"
+
+
+def summarize_trace(
+    trace_path: Path, selectors: Dict[str, dict], labels: Dict[str, str]
+) -> List[ProcessSummary]:
+    """
+    Aggregate a raw Nextflow trace file (`trace.raw = true`) per process.
+    """
+
+    summaries: Dict[str, ProcessSummary] = {}
+
+    with trace_path.open() as f:
+        for row in csv.DictReader(f, delimiter="\t"):
+            process = row.get("process") or row["name"].split(" (")[0]
+            if row.get("status") == "CACHED":
+                continue
+
+            summary = summaries.get(process)
+            if summary is None:
+                summary = ProcessSummary(
+                    process=process,
+                    resource_selector=resolve_selector(process, selectors, labels),
+                )
+                summaries[process] = summary
+
+            realtime_hours = _number(row.get("realtime")) / 3_600_000
+            cpu_usage = _number(row.get("%cpu")) / 100
+
+            summary.tasks += 1
+            if row.get("status") != "COMPLETED":
+                summary.failed += 1
+            if _number(row.get("attempt")) > 1:
+                summary.retries += 1
+            summary.cpu_hours += realtime_hours * cpu_usage
+            summary.wall_hours += realtime_hours
+            summary.requested_cpus = max(
+                summary.requested_cpus, int(_number(row.get("cpus")))
+            )
+            summary.requested_memory_gb = max(
+                summary.requested_memory_gb, _number(row.get("memory")) / _gb
+            )
+            summary.peak_rss_gb = max(
+                summary.peak_rss_gb, _number(row.get("peak_rss")) / _gb
+            )
+            summary.max_cpu_usage = max(summary.max_cpu_usage, cpu_usage)
+            summary.read_gb += _number(row.get("rchar")) / _gb
+            summary.written_gb += _number(row.get("wchar")) / _gb
+
+    return sorted(summaries.values(), key=lambda s: s.cpu_hours, reverse=True)
+
+
+def summarize_selectors(
+    processes: List[ProcessSummary], selectors: Dict[str, dict]
+) -> List[SelectorSummary]:
+    by_selector: Dict[str, List[ProcessSummary]] = defaultdict(list)
+    for process in processes:
+        if process.resource_selector in selectors:
+            by_selector[process.resource_selector].append(process)
+
+    out = []
+    for selector, members in by_selector.items():
+        summary = SelectorSummary(
+            resource_selector=selector,
+            base_cpus=selectors[selector]["cpus"],
+            base_memory_gb=selectors[selector]["memory_gb"],
+            processes=[p.process.split(":")[-1] for p in members],
+            peak_rss_gb=max(p.peak_rss_gb for p in members),
+            max_cpus_used=max(p.max_cpu_usage for p in members),
+        )
+        memory_gb = max(p.requested_memory_gb for p in members)
+        cpus = max(p.requested_cpus for p in members)
+        summary.overprovisioned = (
+            memory_gb > 0
+            and summary.peak_rss_gb < overprovisioned_memory_fraction * memory_gb
+        ) or (cpus > 1 and summary.max_cpus_used < overprovisioned_cpu_fraction * cpus)
+        out.append(summary)
+    return sorted(out, key=lambda s: s.resource_selector)
+
+
+def write_trace_summary(
+    trace_path: Path, project_dir: Path, out_dir: Path
+) -> List[Path]:
+    """
+    Write `execution_summary.{json,tsv}` for a finished run and return their
+    paths. Nothing is written if the trace file does not exist.
+    """
+
+    if not trace_path.exists():
+        return []
+
+    selectors = parse_base_config(project_dir / "conf" / "base.config")
+    labels = parse_process_labels(project_dir)
+
+    processes = summarize_trace(trace_path, selectors, labels)
+    resource_selectors = summarize_selectors(processes, selectors)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    json_path = out_dir / "execution_summary.json"
+    tsv_path = out_dir / "execution_summary.tsv"
+
+    with json_path.open("w") as f:
+        json.dump(
+            {
+                "processes": [asdict(p) for p in processes],
+                "resource_selectors": [asdict(s) for s in resource_selectors],
+                "overprovisioned": [
+                    s.resource_selector for s in resource_selectors if s.overprovisioned
+                ],
+            },
+            f,
+            indent=4,
+        )
+
+    with tsv_path.open("w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=summary_cols, delimiter="\t")
+        writer.writeheader()
+        for process in processes:
+            row = asdict(process)
+            writer.writerow(
+                {k: round(v, 4) if isinstance(v, float) else v for k, v in row.items()}
+            )
+
+    for selector in resource_selectors:
+        if selector.overprovisioned:
+            print(
+                f"Resource selector {selector.resource_selector} looks over-provisioned:"
+                f" peak RSS {selector.peak_rss_gb:.2f} GB,"
+                f" at most {selector.max_cpus_used:.2f} CPUs used"
+                f" ({', '.join(selector.processes)})"
+            )
+
+    return [json_path, tsv_path]
@@ -65,6 +65,15 @@ ch_multiqc_custom_methods_description = params.multiqc_methods_description ? fil
 include { AMP } from '../subworkflows/local/amp'
 include { ARG } from '../subworkflows/local/arg'
 include { BGC } from '../subworkflows/local/bgc'
+include { ANNOTATION_DEDUP } from '../subworkflows/local/annotation_dedup'
+
+//
+// MODULE: Local to the pipeline
+//
+include { CONTIG_STATS } from '../modules/local/contig_stats'
+include { ANNOTATION_CACHE_LOOKUP } from '../modules/local/annotation_cache_lookup'
+include { ANNOTATION_CACHE_STORE } from '../modules/local/annotation_cache_store'
+include { SUMMARY_STORE } from '../modules/local/summary_store'
 
 /*
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -77,18 +86,11 @@ include { BGC } from '../subworkflows/local/bgc'
 //
 include { MULTIQC                           } from '../modules/nf-core/multiqc/main'
 include { CUSTOM_DUMPSOFTWAREVERSIONS       } from '../modules/nf-core/custom/dumpsoftwareversions/main'
-include { GUNZIP as GUNZIP_FASTA_PREP       } from '../modules/nf-core/gunzip/main'
-include { GUNZIP as GUNZIP_PRODIGAL_FNA     } from '../modules/nf-core/gunzip/main'
-include { GUNZIP as GUNZIP_PRODIGAL_FAA     } from '../modules/nf-core/gunzip/main'
-include { GUNZIP as GUNZIP_PRODIGAL_GFF     } from '../modules/nf-core/gunzip/main'
-include { GUNZIP as GUNZIP_PYRODIGAL_FNA    } from '../modules/nf-core/gunzip/main'
-include { GUNZIP as GUNZIP_PYRODIGAL_FAA    } from '../modules/nf-core/gunzip/main'
-include { GUNZIP as GUNZIP_PYRODIGAL_GFF    } from '../modules/nf-core/gunzip/main'
-include { BIOAWK                            } from '../modules/nf-core/bioawk/main'
 include { PROKKA                            } from '../modules/nf-core/prokka/main'
 include { PRODIGAL as PRODIGAL_GFF          } from '../modules/nf-core/prodigal/main'
 include { PRODIGAL as PRODIGAL_GBK          } from '../modules/nf-core/prodigal/main'
 include { PYRODIGAL                         } from '../modules/nf-core/pyrodigal/main'
+include { PYRODIGAL_GENES                   } from '../modules/local/pyrodigal_genes'
 include { BAKTA_BAKTADBDOWNLOAD             } from '../modules/nf-core/bakta/baktadbdownload/main'
 include { BAKTA_BAKTA                       } from '../modules/nf-core/bakta/bakta/main'
 
@@ -108,32 +110,45 @@ workflow FUNCSCAN {
 
     ch_input = Channel.fromSamplesheet("input")
 
-    // Some tools require uncompressed input
-    fasta_prep = ch_input
-        .branch {
-            compressed: it[1].toString().endsWith('.gz')
-            uncompressed: it[1]
-        }
-
-    GUNZIP_FASTA_PREP ( fasta_prep.compressed )
-    ch_versions = ch_versions.mix(GUNZIP_FASTA_PREP.out.versions)
-
-    // Merge all the already uncompressed and newly compressed FASTAs here into
-    // a single input channel for downstream
-    ch_prepped_fastas = GUNZIP_FASTA_PREP.out.gunzip
-                        .mix(fasta_prep.uncompressed)
-
-    // Add to meta the length of longest contig for downstream filtering
-    BIOAWK ( ch_prepped_fastas )
-    ch_versions = ch_versions.mix(BIOAWK.out.versions)
+    // Add contig statistics to meta for downstream filtering and resource sizing.
+    // The same streaming pass decompresses gzipped input and, with --preprocessing_mincontiglen,
+    // drops short contigs, writing the uncompressed FASTA that all downstream subworkflows read.
+    CONTIG_STATS ( ch_input, params.preprocessing_mincontiglen )
+    ch_versions = ch_versions.mix(CONTIG_STATS.out.versions)
+
+    // Merge the FASTAs written by CONTIG_STATS and the already uncompressed, unfiltered inputs
+    // into a single input channel for downstream
+    ch_prepped_fastas = CONTIG_STATS.out.fasta
+                        .mix(
+                            ch_input.filter {
+                                meta, fasta ->
+                                    !params.preprocessing_mincontiglen && !fasta.toString().endsWith('.gz')
+                            }
+                        )
+
+    ch_contig_stats = CONTIG_STATS.out.stats
+                        .map {
+                            meta, tsv ->
+                                def stats = tsv.splitCsv( header: true, sep: '\t' )[0]
+                            [ meta, stats ]
+                        }
 
     ch_prepped_input = ch_prepped_fastas
-                        .join( BIOAWK.out.longest )
+                        .join( ch_contig_stats )
                         .map{
-                            meta, fasta, length ->
-                                def meta_new = meta.clone()
-                                meta['longest_contig'] = Integer.parseInt(length)
-                            [ meta, fasta ]
+                            meta, fasta, stats ->
+                                def meta_new = meta + [
+                                    longest_contig: stats.longest_contig as Long,
+                                    total_length:   stats.total_length as Long,
+                                    n_contigs:      stats.contigs as Long,
+                                    n50:            stats.n50 as Long
+                                ]
+                            [ meta_new, fasta ]
+                        }
+                        .filter {
+                            meta, fasta ->
+                                if ( meta.n_contigs == 0 ) log.warn("[nf-core/funcscan] No contig of the following sample reaches the minimum length of --preprocessing_mincontiglen ${params.preprocessing_mincontiglen}. The sample will not be screened: ${meta.id}")
+                                meta.n_contigs > 0
                         }
 
     /*
@@ -142,36 +157,77 @@ workflow FUNCSCAN {
 
     // Some tools require annotated FASTAs
     // For prodigal: run twice, once for gff and once for gbk generation, (for parity with PROKKA which produces both)
+    if ( params.annotation_dedup && ( params.annotation_tool in [ 'prokka', 'bakta' ] || ( params.annotation_tool == 'prodigal' && params.annotation_prodigal_singlemode ) || ( params.annotation_tool == 'pyrodigal' && params.annotation_pyrodigal_singlemode ) ) ) {
+        log.warn("[nf-core/funcscan] --annotation_dedup only applies to Prodigal and Pyrodigal in metagenome mode, where every contig is annotated independently. Samples will be annotated separately.")
+    }
+
     if ( ( params.run_arg_screening && !params.arg_skip_deeparg ) || ( params.run_amp_screening && ( !params.amp_skip_hmmsearch || !params.amp_skip_amplify || !params.amp_skip_ampir ) ) || ( params.run_bgc_screening && ( !params.bgc_skip_hmmsearch || !params.bgc_skip_antismash ) ) ) {
 
+        // Samples found in the persistent annotation cache are restored, only the others are annotated
+        ch_annotation_input = ch_prepped_input
+        if ( params.annotation_cache_dir ) {
+            annotation_cache_settings = WorkflowFuncscan.annotationCacheSettings(params)
+            annotation_cache_dir      = file(params.annotation_cache_dir).toString()
+
+            ANNOTATION_CACHE_LOOKUP ( ch_prepped_input, annotation_cache_settings, annotation_cache_dir )
+            ch_versions         = ch_versions.mix(ANNOTATION_CACHE_LOOKUP.out.versions)
+            ch_annotation_input = ANNOTATION_CACHE_LOOKUP.out.miss.map { meta, fasta, report -> [ meta, fasta ] }
+
+            ANNOTATION_CACHE_LOOKUP.out.report
+                .map { meta, report -> report.splitCsv( header: true, sep: '\t' )[0] }
+                .toList()
+                .subscribe { reports ->
+                    def hits = reports.findAll { it.status == 'hit' }
+                    log.info "[nf-core/funcscan] Annotation cache: ${hits.size()} hits, ${reports.size() - hits.size()} misses" + ( hits ? " (restored: ${hits.collect { it.sample }.join(', ')})" : "" )
+                }
+        }
+
         if ( params.annotation_tool == "prodigal" ) {
-            PRODIGAL_GFF ( ch_prepped_input, "gff" )
-            GUNZIP_PRODIGAL_FAA ( PRODIGAL_GFF.out.amino_acid_fasta )
-            GUNZIP_PRODIGAL_FNA ( PRODIGAL_GFF.out.nucleotide_fasta)
-            GUNZIP_PRODIGAL_GFF ( PRODIGAL_GFF.out.gene_annotations )
-            ch_versions              = ch_versions.mix(PRODIGAL_GFF.out.versions)
-            ch_annotation_faa        = GUNZIP_PRODIGAL_FAA.out.gunzip
-            ch_annotation_fna        = GUNZIP_PRODIGAL_FNA.out.gunzip
-            ch_annotation_gff        = GUNZIP_PRODIGAL_GFF.out.gunzip
+            // Outputs stay gzipped, consuming tools decompress them in their own task where needed
+            if ( params.annotation_dedup && !params.annotation_prodigal_singlemode ) {
+                ANNOTATION_DEDUP ( ch_annotation_input )
+                ch_versions              = ch_versions.mix(ANNOTATION_DEDUP.out.versions)
+                ch_annotation_faa        = ANNOTATION_DEDUP.out.faa
+                ch_annotation_fna        = ANNOTATION_DEDUP.out.fna
+                ch_annotation_gff        = ANNOTATION_DEDUP.out.gff
+            } else {
+                PRODIGAL_GFF ( ch_annotation_input, "gff" )
+                ch_versions              = ch_versions.mix(PRODIGAL_GFF.out.versions)
+                ch_annotation_faa        = PRODIGAL_GFF.out.amino_acid_fasta
+                ch_annotation_fna        = PRODIGAL_GFF.out.nucleotide_fasta
+                ch_annotation_gff        = PRODIGAL_GFF.out.gene_annotations
+            }
             ch_annotation_gbk        = Channel.empty() // Prodigal GBK and GFF output are mutually exclusive
 
             if ( params.save_annotations == true ) {
-                PRODIGAL_GBK ( ch_prepped_input, "gbk" )
+                PRODIGAL_GBK ( ch_annotation_input, "gbk" )
                 ch_versions              = ch_versions.mix(PRODIGAL_GBK.out.versions)
                 ch_annotation_gbk        = PRODIGAL_GBK.out.gene_annotations // Prodigal GBK output stays zipped because it is currently not used by any downstream subworkflow.
             }
         } else if ( params.annotation_tool == "pyrodigal" ) {
-            PYRODIGAL ( ch_prepped_input )
-            GUNZIP_PYRODIGAL_FAA ( PYRODIGAL.out.faa )
-            GUNZIP_PYRODIGAL_FNA ( PYRODIGAL.out.fna)
-            GUNZIP_PYRODIGAL_GFF ( PYRODIGAL.out.gff )
-            ch_versions              = ch_versions.mix(PYRODIGAL.out.versions)
-            ch_annotation_faa        = GUNZIP_PYRODIGAL_FAA.out.gunzip
-            ch_annotation_fna        = GUNZIP_PYRODIGAL_FNA.out.gunzip
-            ch_annotation_gff        = GUNZIP_PYRODIGAL_GFF.out.gunzip
+            // Outputs stay gzipped, consuming tools decompress them in their own task where needed
+            if ( params.annotation_dedup && !params.annotation_pyrodigal_singlemode ) {
+                ANNOTATION_DEDUP ( ch_annotation_input )
+                ch_versions              = ch_versions.mix(ANNOTATION_DEDUP.out.versions)
+                ch_annotation_faa        = ANNOTATION_DEDUP.out.faa
+                ch_annotation_fna        = ANNOTATION_DEDUP.out.fna
+                ch_annotation_gff        = ANNOTATION_DEDUP.out.gff
+            } else if ( params.annotation_pyrodigal_multithreaded ) {
+                PYRODIGAL_GENES ( ch_annotation_input )
+                ch_versions              = ch_versions.mix(PYRODIGAL_GENES.out.versions)
+                ch_annotation_faa        = PYRODIGAL_GENES.out.faa
+                ch_annotation_fna        = PYRODIGAL_GENES.out.fna
+                ch_annotation_gff        = PYRODIGAL_GENES.out.gff
+            } else {
+                PYRODIGAL ( ch_annotation_input )
+                ch_versions              = ch_versions.mix(PYRODIGAL.out.versions)
+                ch_annotation_faa        = PYRODIGAL.out.faa
+                ch_annotation_fna        = PYRODIGAL.out.fna
+                ch_annotation_gff        = PYRODIGAL.out.gff
+            }
             ch_annotation_gbk        = Channel.empty() // Pyrodigal doesn't produce GBK
         }  else if ( params.annotation_tool == "prokka" ) {
-            PROKKA ( ch_prepped_input, [], [] )
+            PROKKA ( ch_annotation_input, [], [] )
             ch_versions              = ch_versions.mix(PROKKA.out.versions)
             ch_annotation_faa        = PROKKA.out.faa
             ch_annotation_fna        = PROKKA.out.fna
@@ -180,9 +236,10 @@ workflow FUNCSCAN {
         }   else if ( params.annotation_tool == "bakta" ) {
 
             // BAKTA prepare download
-            if ( params.annotation_bakta_db_localpath ) {
+            def bakta_db = WorkflowFuncscan.databasePath(params, 'annotation_bakta_db_localpath')
+            if ( bakta_db ) {
                 ch_bakta_db = Channel
-                    .fromPath( params.annotation_bakta_db_localpath )
+                    .fromPath( bakta_db )
                     .first()
             } else {
                 BAKTA_BAKTADBDOWNLOAD ( )
@@ -190,7 +247,7 @@ workflow FUNCSCAN {
                 ch_bakta_db = ( BAKTA_BAKTADBDOWNLOAD.out.db )
             }
 
-            BAKTA_BAKTA ( ch_prepped_input, ch_bakta_db, [], [] )
+            BAKTA_BAKTA ( ch_annotation_input, ch_bakta_db, [], [] )
             ch_versions              = ch_versions.mix(BAKTA_BAKTA.out.versions)
             ch_annotation_faa        = BAKTA_BAKTA.out.faa
             ch_annotation_fna        = BAKTA_BAKTA.out.fna
@@ -198,6 +255,25 @@ workflow FUNCSCAN {
             ch_annotation_gbk        = BAKTA_BAKTA.out.gbff
         }
 
+        if ( params.annotation_cache_dir ) {
+            // Cache newly annotated samples, then add restored samples to the annotation channels.
+            // A sample is stored as soon as all of its annotation outputs exist, not at the end of the annotation.
+            def annotation_outputs    = [ prodigal: params.save_annotations ? 4 : 3, pyrodigal: 3, prokka: 4, bakta: 4 ][params.annotation_tool]
+            ch_annotation_cache_store = ch_annotation_faa
+                                            .mix( ch_annotation_fna, ch_annotation_gff, ch_annotation_gbk )
+                                            .groupTuple( size: annotation_outputs, remainder: true )
+                                            .join( ANNOTATION_CACHE_LOOKUP.out.miss.map { meta, fasta, report -> [ meta, report ] } )
+                                            .map { meta, files, report -> [ meta, report, files ] }
+
+            ANNOTATION_CACHE_STORE ( ch_annotation_cache_store, annotation_cache_settings, annotation_cache_dir, params.annotation_cache_maxsize )
+            ch_versions       = ch_versions.mix(ANNOTATION_CACHE_STORE.out.versions)
+
+            ch_annotation_faa = ch_annotation_faa.mix( ANNOTATION_CACHE_LOOKUP.out.faa )
+            ch_annotation_fna = ch_annotation_fna.mix( ANNOTATION_CACHE_LOOKUP.out.fna )
+            ch_annotation_gff = ch_annotation_gff.mix( ANNOTATION_CACHE_LOOKUP.out.gff )
+            ch_annotation_gbk = ch_annotation_gbk.mix( ANNOTATION_CACHE_LOOKUP.out.gbk )
+        }
+
     } else {
 
         ch_annotation_faa        = Channel.empty()
@@ -220,8 +296,8 @@ workflow FUNCSCAN {
             ch_annotation_faa
                 .filter {
                     meta, file ->
-                        if ( file.isEmpty() ) log.warn("Annotation of following sample produced produced an empty FAA file. AMP screening tools requiring this file will not be executed: ${meta.id}")
-                        !file.isEmpty()
+                        if ( WorkflowFuncscan.isEmptyFile(file) ) log.warn("Annotation of following sample produced produced an empty FAA file. AMP screening tools requiring this file will not be executed: ${meta.id}")
+                        !WorkflowFuncscan.isEmptyFile(file)
                 }
         )
         ch_versions = ch_versions.mix(AMP.out.versions)
@@ -239,8 +315,8 @@ workflow FUNCSCAN {
                 ch_annotation_faa
                     .filter {
                         meta, file ->
-                        if ( file.isEmpty() ) log.warn("Annotation of following sample produced produced an empty FAA file. AMP screening tools requiring this file will not be executed: ${meta.id}")
-                            !file.isEmpty()
+                        if ( WorkflowFuncscan.isEmptyFile(file) ) log.warn("Annotation of following sample produced produced an empty FAA file. AMP screening tools requiring this file will not be executed: ${meta.id}")
+                            !WorkflowFuncscan.isEmptyFile(file)
                     }
             )
         }
@@ -256,25 +332,40 @@ workflow FUNCSCAN {
             ch_annotation_gff
                 .filter {
                     meta, file ->
-                        if ( file.isEmpty() ) log.warn("Annotation of following sample produced produced an empty GFF file. AMP screening tools requiring this file will not be executed: ${meta.id}")
-                        !file.isEmpty()
+                        if ( WorkflowFuncscan.isEmptyFile(file) ) log.warn("Annotation of following sample produced produced an empty GFF file. AMP screening tools requiring this file will not be executed: ${meta.id}")
+                        !WorkflowFuncscan.isEmptyFile(file)
                 },
             ch_annotation_faa
                 .filter {
                     meta, file ->
-                        if ( file.isEmpty() ) log.warn("Annotation of following sample produced produced an empty FAA file. AMP screening tools requiring this file will not be executed: ${meta.id}")
-                        !file.isEmpty()
+                        if ( WorkflowFuncscan.isEmptyFile(file) ) log.warn("Annotation of following sample produced produced an empty FAA file. AMP screening tools requiring this file will not be executed: ${meta.id}")
+                        !WorkflowFuncscan.isEmptyFile(file)
                 },
             ch_annotation_gbk
                 .filter {
                     meta, file ->
-                        if ( file.isEmpty() ) log.warn("Annotation of following sample produced produced an empty GBK file. AMP screening tools requiring this file will not be executed: ${meta.id}")
-                        !file.isEmpty()
+                        if ( WorkflowFuncscan.isEmptyFile(file) ) log.warn("Annotation of following sample produced produced an empty GBK file. AMP screening tools requiring this file will not be executed: ${meta.id}")
+                        !WorkflowFuncscan.isEmptyFile(file)
                 }
         )
         ch_versions = ch_versions.mix(BGC.out.versions)
     }
 
+    /*
+        SUMMARY STORE
+    */
+    if ( params.run_summary_store && ( params.run_amp_screening || params.run_arg_screening || params.run_bgc_screening ) ) {
+        if ( params.run_arg_screening && params.arg_hamronization_summarizeformat == 'interactive' ) log.warn("[nf-core/funcscan] The interactive hAMRonization summary cannot be loaded into the summary store, use --arg_hamronization_summarizeformat tsv or json to include ARGs.")
+
+        SUMMARY_STORE (
+            params.run_amp_screening ? AMP.out.summary.ifEmpty([]) : [],
+            params.run_arg_screening ? ARG.out.summary.ifEmpty([]) : [],
+            params.run_bgc_screening ? BGC.out.summary.ifEmpty([]) : [],
+            ch_prepped_input.map { meta, fasta -> meta.id }.toSortedList()
+        )
+        ch_versions = ch_versions.mix(SUMMARY_STORE.out.versions)
+    }
+
     CUSTOM_DUMPSOFTWAREVERSIONS (
         ch_versions.unique().collectFile(name: 'collated_versions.yml')
     )